@@ -1,14 +1,46 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_admin, get_db_session
 from app.models.user import User
 from app.schemas.admin import (
+    ApplicationBulkModeration,
+    AssignmentProposalRead,
+    BulkModerationResult,
+    EligibleCandidateRow,
+    HotelAnswerIssueRow,
+    QualityAnalyticsGroup,
+    ReportBulkModeration,
+    ReportSearchHit,
     ReportModerationRow,
     SecretGuestApplicationRow,
     SecretGuestStatsRow,
 )
-from app.services import admin_service
+from app.schemas.report import ReportRead, ReportStatus, ReportStatusUpdate
+from app.schemas.job import JobCreate, JobMetrics, JobRead
+from app.schemas.scoring import RescoreReport, ScoringRuleSetCreate, ScoringRuleSetRead
+from app.services import (
+    admin_service,
+    analytics_service,
+    application_service,
+    assignment_service,
+    eligibility_service,
+    export_service,
+    job_service,
+    moderation_feed,
+    report_answers_service,
+    report_search_service,
+    report_service,
+    scoring_rules_service,
+)
+from app.services.admin_service import ReportModerationError
+from app.services.assignment_service import AssignmentError
+from app.services.report_answers_service import FilterableField
+from app.services.reservation_service import ReservationError, SlotNotFoundError
+from app.services.scoring_rules_service import ScoringRulesError
 
 router = APIRouter()
 
@@ -17,13 +49,30 @@ router = APIRouter()
     "/secret-guests/applications",
     response_model=list[SecretGuestApplicationRow],
     summary="Активные заявки секретных гостей",
-    description="Возвращает список одобренных кандидатов с их баллами",
+    description=(
+        "Возвращает список одобренных кандидатов с их баллами. "
+        "Поддерживает фильтр по диапазону баллов, сортировку и пагинацию."
+    ),
 )
 def list_secret_guest_applications(
+    min_score: int | None = Query(default=None, description="Минимальный итоговый балл"),
+    max_score: int | None = Query(default=None, description="Максимальный итоговый балл"),
+    sort_by: Literal["created_at", "score"] = Query(default="created_at", description="Поле сортировки"),
+    order: Literal["asc", "desc"] = Query(default="desc", description="Направление сортировки"),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
     _: User = Depends(get_current_admin),
     db: Session = Depends(get_db_session),
 ) -> list[SecretGuestApplicationRow]:
-    return admin_service.list_secret_guest_applications(db)
+    return admin_service.list_secret_guest_applications(
+        db,
+        min_score=min_score,
+        max_score=max_score,
+        sort_by=sort_by,
+        descending=order == "desc",
+        limit=limit,
+        offset=offset,
+    )
 
 
 @router.get(
@@ -39,13 +88,386 @@ def list_secret_guest_stats(
     return admin_service.list_secret_guest_stats(db)
 
 
+@router.get(
+    "/candidates/eligible",
+    response_model=list[EligibleCandidateRow],
+    summary="Кандидаты, допущенные к подаче заявки",
+    description="Выборка для рассылок: кандидаты, которые на текущий момент могут подать заявку.",
+)
+def list_eligible_candidates(
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[EligibleCandidateRow]:
+    return eligibility_service.list_eligible_candidates(db, limit=limit, offset=offset)
+
+
 @router.get(
     "/reports/moderation",
     response_model=list[ReportModerationRow],
     summary="Очередь модерации отчетов",
 )
 def list_reports_on_moderation(
+    response: Response,
     _: User = Depends(get_current_admin),
     db: Session = Depends(get_db_session),
 ) -> list[ReportModerationRow]:
+    # Курсор ленты берется до чтения очереди: изменения после него придут через /feed
+    response.headers["X-Moderation-Cursor"] = str(moderation_feed.head_event_id(db))
     return admin_service.list_reports_on_moderation(db)
+
+
+@router.get(
+    "/reports/moderation/feed",
+    summary="Лента изменений очереди модерации",
+    description=(
+        "Server-Sent Events: `enqueued` при отправке отчета на модерацию и `removed` при выходе из нее. "
+        "Для возобновления передайте id последнего события в `Last-Event-ID` или `after` "
+        "(начальное значение — заголовок `X-Moderation-Cursor` списка очереди). "
+        "Событие `reset` означает, что очередь нужно перечитать целиком."
+    ),
+    response_class=StreamingResponse,
+)
+async def moderation_feed_stream(
+    request: Request,
+    after: int | None = Query(default=None, ge=0, description="Id последнего полученного события"),
+    last_event_id: int | None = Header(default=None, ge=0),
+    _: User = Depends(get_current_admin),
+) -> StreamingResponse:
+    after_id = last_event_id if last_event_id is not None else after
+    return StreamingResponse(
+        moderation_feed.stream_events(request, after_id=after_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.patch(
+    "/reports/{report_id}/status",
+    response_model=ReportRead,
+    summary="Модерация отчета",
+    description="Одобряет или отклоняет отчет. При одобрении сохраняется готовая карточка для страницы отеля.",
+)
+def update_report_status(
+    report_id: str,
+    payload: ReportStatusUpdate,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> ReportRead:
+    report = report_service.get_report(db, report_id)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Отчет не найден")
+
+    try:
+        updated = admin_service.update_report_status(db, report=report, status=payload.status)
+    except ReportModerationError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+    return report_service.serialize_report(updated)
+
+
+@router.post(
+    "/reports/moderation/bulk",
+    response_model=list[BulkModerationResult],
+    summary="Пакетная модерация отчетов",
+    description="Одобряет или отклоняет до 500 отчетов за запрос. Результат возвращается по каждому id.",
+)
+def bulk_update_report_status(
+    payload: ReportBulkModeration,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[BulkModerationResult]:
+    try:
+        return admin_service.bulk_update_report_status(db, report_ids=payload.report_ids, status=payload.status)
+    except ReportModerationError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
+@router.post(
+    "/applications/moderation/bulk",
+    response_model=list[BulkModerationResult],
+    summary="Пакетная смена статуса заявок",
+    description="Меняет статус до 500 заявок за запрос. Результат возвращается по каждому id.",
+)
+def bulk_update_application_status(
+    payload: ApplicationBulkModeration,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[BulkModerationResult]:
+    return admin_service.bulk_update_application_status(
+        db,
+        application_ids=payload.application_ids,
+        status=payload.status,
+        reviewer_comment=payload.reviewer_comment,
+    )
+
+
+@router.get(
+    "/scoring-rules",
+    response_model=list[ScoringRuleSetRead],
+    summary="Версии правил подсчета баллов анкеты",
+)
+def list_scoring_rule_sets(
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[ScoringRuleSetRead]:
+    return scoring_rules_service.list_rule_sets(db)
+
+
+@router.post(
+    "/scoring-rules",
+    response_model=ScoringRuleSetRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Новая версия правил подсчета баллов",
+    description="Сохраняет правила как новую неактивную версию. Новые заявки оцениваются по ней после активации.",
+)
+def create_scoring_rule_set(
+    payload: ScoringRuleSetCreate,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> ScoringRuleSetRead:
+    try:
+        return scoring_rules_service.create_rule_set(
+            db,
+            rules=payload.rules,
+            reject_max_score=payload.reject_max_score,
+            review_max_score=payload.review_max_score,
+            comment=payload.comment,
+        )
+    except ScoringRulesError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+def _get_rule_set_or_404(db: Session, rule_set_id: int):
+    rule_set = scoring_rules_service.get_rule_set(db, rule_set_id)
+    if rule_set is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Версия правил не найдена")
+    return rule_set
+
+
+@router.post(
+    "/scoring-rules/{rule_set_id}/activate",
+    response_model=ScoringRuleSetRead,
+    summary="Активация версии правил подсчета баллов",
+)
+def activate_scoring_rule_set(
+    rule_set_id: int,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> ScoringRuleSetRead:
+    rule_set = _get_rule_set_or_404(db, rule_set_id)
+    return scoring_rules_service.activate_rule_set(db, rule_set)
+
+
+@router.get(
+    "/scoring-rules/{rule_set_id}/rescore",
+    response_model=RescoreReport,
+    summary="Пробный пересчет заявок по версии правил",
+    description=(
+        "Оценивает все отправленные заявки по выбранной версии правил и возвращает те, "
+        "чей статус изменился бы. Данные заявок не меняются."
+    ),
+)
+def rescore_applications(
+    rule_set_id: int,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> RescoreReport:
+    rule_set = _get_rule_set_or_404(db, rule_set_id)
+    return application_service.rescore_applications(
+        db, rule_set=scoring_rules_service.compile_rule_set(rule_set)
+    )
+
+
+@router.get(
+    "/reports/search",
+    response_model=list[ReportSearchHit],
+    summary="Поиск по текстам отчетов",
+    description=(
+        "Полнотекстовый поиск по комментариям шага 1 и отзывам шага 6. "
+        "Результаты отсортированы по релевантности."
+    ),
+)
+def search_reports(
+    q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос"),
+    status_filter: ReportStatus | None = Query(default=None, alias="status", description="Фильтр по статусу отчета"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[ReportSearchHit]:
+    return report_search_service.search_reports(db, query=q, status=status_filter, limit=limit, offset=offset)
+
+
+@router.get(
+    "/analytics/quality",
+    response_model=list[QualityAnalyticsGroup],
+    summary="Аналитика качества отелей",
+    description=(
+        "Распределения оценок и ответов одобренных отчетов по отелям или городам: "
+        "средние и перцентили оценок, частоты вариантов Wi-Fi, ожидания, кухни и кондиционера, "
+        "помесячная динамика. Данные обновляются раз в минуту или по `refresh=true`."
+    ),
+)
+def get_quality_analytics(
+    group_by: Literal["hotel", "city"] = Query(default="hotel", description="Группировка"),
+    hotel_id: int | None = Query(default=None, ge=1),
+    city: str | None = Query(default=None),
+    refresh: bool = Query(default=False, description="Догрузить изменения немедленно"),
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[QualityAnalyticsGroup]:
+    return analytics_service.get_quality_analytics(
+        db,
+        group_by=group_by,
+        hotel_id=hotel_id,
+        city=city,
+        force_refresh=refresh,
+    )
+
+
+@router.get(
+    "/analytics/hotel-issues",
+    response_model=list[HotelAnswerIssueRow],
+    summary="Отели по ответу в отчетах",
+    description=(
+        "Отели, в одобренных отчетах которых поле ответа принимало заданное значение "
+        "за последние `days` дней, например `field=wifi_quality&value=absent`."
+    ),
+)
+def list_hotels_by_answer(
+    field: FilterableField = Query(..., description="Поле ответа"),
+    value: str = Query(..., min_length=1, description="Значение поля"),
+    days: int = Query(default=30, ge=1, le=3650),
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[HotelAnswerIssueRow]:
+    return report_answers_service.list_hotels_by_answer(db, field=field, value=value, days=days)
+
+
+_EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@router.post(
+    "/jobs",
+    response_model=JobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Запуск служебной фоновой задачи",
+    description=(
+        "Ставит в очередь служебную задачу: `rebuild_search_index`, `backfill_card_snapshots`, "
+        "`recount_photo_counts`, `backfill_answer_tables`, `backfill_application_scores`, "
+        "`refresh_eligibility`, `propose_assignments`. Повтор с тем же `idempotency_key` возвращает существующую задачу."
+    ),
+)
+def enqueue_job(
+    payload: JobCreate,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> JobRead:
+    if payload.kind not in job_service.manual_job_kinds():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Неизвестный тип задачи: {payload.kind}")
+    job = job_service.enqueue(db, payload.kind, idempotency_key=payload.idempotency_key)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@router.get(
+    "/jobs/metrics",
+    response_model=JobMetrics,
+    summary="Метрики фоновых задач",
+    description="Число задач по типам и статусам, самая старая ожидающая задача и счетчики воркеров процесса.",
+)
+def get_job_metrics(
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> JobMetrics:
+    return job_service.job_metrics(db)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobRead,
+    summary="Состояние фоновой задачи",
+)
+def get_job(
+    job_id: int,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> JobRead:
+    job = job_service.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+    return job
+
+
+@router.get(
+    "/assignments",
+    response_model=list[AssignmentProposalRead],
+    summary="Предложения пакетного распределения гостей",
+    description="Результат задачи `propose_assignments`: пары «гость — слот» с их стоимостью.",
+)
+def list_assignment_proposals(
+    proposal_status: Literal["proposed", "applied"] | None = Query(default="proposed", alias="status"),
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> list[AssignmentProposalRead]:
+    return assignment_service.list_proposals(db, status=proposal_status, limit=limit, offset=offset)
+
+
+@router.post(
+    "/assignments/{proposal_id}/apply",
+    response_model=ReportRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Применение предложения распределения",
+    description="Бронирует предложенный слот за гостем, как обычная бронь: создается черновик отчета.",
+)
+def apply_assignment_proposal(
+    proposal_id: int,
+    _: User = Depends(get_current_admin),
+    db: Session = Depends(get_db_session),
+) -> ReportRead:
+    proposal = assignment_service.get_proposal(db, proposal_id)
+    if proposal is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Предложение не найдено")
+
+    try:
+        report = assignment_service.apply_proposal(db, proposal)
+    except SlotNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except (AssignmentError, ReservationError) as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+    return report_service.serialize_report(report)
+
+
+@router.get(
+    "/exports/{dataset}",
+    summary="Выгрузка данных",
+    description=(
+        "Потоковая выгрузка `reports` (ответы разложены по колонкам), `report_photos` "
+        "или `program_applications` (с баллами) в CSV или Parquet."
+    ),
+    response_class=StreamingResponse,
+)
+def export_dataset(
+    dataset: Literal["reports", "report_photos", "program_applications"],
+    export_format: Literal["csv", "parquet"] = Query(default="csv", alias="format"),
+    _: User = Depends(get_current_admin),
+) -> StreamingResponse:
+    try:
+        content = export_service.stream_export(dataset, export_format)
+    except export_service.ExportError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return StreamingResponse(
+        content,
+        media_type=_EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{export_format}"'},
+    )
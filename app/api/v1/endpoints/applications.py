@@ -1,5 +1,5 @@
-from typing import Sequence
-from fastapi import APIRouter, Depends, HTTPException, Query, status, File, UploadFile
+from typing import Literal, Sequence
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, File, UploadFile
 from sqlalchemy.orm import Session
 
 from app.api.deps import (
@@ -12,10 +12,11 @@ from app.models.program_application import ProgramApplicationStatus
 from app.models.user import User
 from app.schemas.application import (
     ApplicationCreate,
+    ApplicationLease,
     ApplicationRead,
     ApplicationStatusUpdate,
 )
-from app.services import application_service
+from app.services import application_service, review_queue_service
 from app.services.upload_utils import gather_incoming_uploads
 
 router = APIRouter()
@@ -80,11 +81,80 @@ def list_applications(
         alias="status",
         description="Фильтр по статусу заявки",
     ),
+    min_score: int | None = Query(None, description="Минимальный итоговый балл"),
+    max_score: int | None = Query(None, description="Максимальный итоговый балл"),
+    sort_by: Literal["created_at", "score"] = Query("created_at", description="Поле сортировки"),
+    order: Literal["asc", "desc"] = Query("desc", description="Направление сортировки"),
+    limit: int | None = Query(None, ge=1, le=500),
+    offset: int = Query(0, ge=0),
 ):
-    applications = application_service.list_applications(db, status=status_filter)
+    applications = application_service.list_applications(
+        db,
+        status=status_filter,
+        min_score=min_score,
+        max_score=max_score,
+        sort_by=sort_by,
+        descending=order == "desc",
+        limit=limit,
+        offset=offset,
+    )
     return applications
 
 
+@router.post(
+    "/review-queue/claim",
+    response_model=ApplicationLease,
+    summary="Взять следующую заявку на рассмотрение",
+    description=(
+        "Арендует следующую свободную заявку в статусе `in_review` (по убыванию балла, затем по возрасту) "
+        "на ограниченное время. Если у администратора уже есть арендованная заявка, она возвращается с продлением. "
+        "Пустая очередь — ответ 204."
+    ),
+    responses={204: {"description": "Свободных заявок нет"}},
+)
+def claim_next_application(
+    db: Session = Depends(get_db_session),
+    current_admin: User = Depends(get_current_admin),
+):
+    application = review_queue_service.claim_next(db, reviewer_id=current_admin.id)
+    if application is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return ApplicationLease(application=application, lease_expires_at=application.lease_expires_at)
+
+
+@router.post(
+    "/{application_id}/lease",
+    response_model=ApplicationLease,
+    summary="Продление аренды заявки",
+)
+def renew_application_lease(
+    application_id: int,
+    db: Session = Depends(get_db_session),
+    current_admin: User = Depends(get_current_admin),
+):
+    try:
+        application = review_queue_service.renew_lease(
+            db, application_id=application_id, reviewer_id=current_admin.id
+        )
+    except review_queue_service.ReviewLeaseError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return ApplicationLease(application=application, lease_expires_at=application.lease_expires_at)
+
+
+@router.delete(
+    "/{application_id}/lease",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Возврат заявки в очередь",
+)
+def release_application_lease(
+    application_id: int,
+    db: Session = Depends(get_db_session),
+    current_admin: User = Depends(get_current_admin),
+):
+    review_queue_service.release_lease(db, application_id=application_id, reviewer_id=current_admin.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
 @router.get(
     "/{application_id}",
     response_model=ApplicationRead,
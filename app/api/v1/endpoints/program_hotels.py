@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_admin, get_current_user, get_db_session
@@ -8,14 +10,24 @@ from app.schemas.program_hotel import (
     ProgramHotelAvailableDate,
     ProgramHotelCreate,
     ProgramHotelRead,
+    ProgramHotelScheduleCreate,
+    ProgramHotelScheduleResult,
     ProgramHotelUpdate,
+    SlotHoldRead,
 )
-from app.services import hotel_service, program_hotel_service
+from app.schemas.report import ReportRead
+from app.services import hotel_service, program_hotel_service, report_service, reservation_service
 from app.services.program_hotel_service import (
     ProgramHotelCreationError,
     ProgramHotelSelectionError,
     ProgramHotelUpdateError,
 )
+from app.services.reservation_service import (
+    DuplicateReservationError,
+    SlotHoldNotFoundError,
+    SlotNotFoundError,
+    SlotSoldOutError,
+)
 
 router = APIRouter()
 
@@ -50,6 +62,29 @@ def create_program_hotel(
 
     return program_hotel
 
+@router.post(
+    "/schedule",
+    response_model=ProgramHotelScheduleResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Расписание слотов программы",
+    description=(
+        "Создает слоты для одного или нескольких отелей на период: заезд каждые cadence_days дней, "
+        "проживание stay_nights ночей с выездом не позже end_date. Слоты с уже существующими датами "
+        "пропускаются. Доступно только администраторам."
+    ),
+)
+def schedule_program_hotels(
+    payload: ProgramHotelScheduleCreate,
+    db: Session = Depends(get_db_session),
+    _: User = Depends(get_current_admin),
+):
+    try:
+        created, skipped = program_hotel_service.schedule_program_hotels(db, **payload.model_dump())
+    except ProgramHotelCreationError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return ProgramHotelScheduleResult(created=created, skipped_existing=skipped)
+
 @router.get(
     "/",
     response_model=list[ProgramHotelRead],
@@ -71,10 +106,19 @@ def list_program_hotels(
     response_model=list[ProgramHotelAvailabilityRead],
     summary="Доступные отели программы",
     description=(
-        "Возвращает список отелей, которые доступны для проверки гостем"
+        "Возвращает список отелей, которые доступны для проверки гостем: опубликованные слоты "
+        "со свободными местами и будущей датой заезда, пересекающиеся с окном date_from–date_to"
     ),
 )
 def list_available_program_hotels_for_user(
+    date_from: date | None = Query(
+        default=None,
+        description="Начало окна проживания: слоты с выездом позже этой даты",
+    ),
+    date_to: date | None = Query(
+        default=None,
+        description="Конец окна проживания включительно: слоты с заездом не позже этой даты",
+    ),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db_session),
 ):
@@ -88,6 +132,8 @@ def list_available_program_hotels_for_user(
             db,
             user=user,
             limit=MAX_HOTELS_RETURNED,
+            date_from=date_from,
+            date_to=date_to,
         )
     except ProgramHotelSelectionError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
@@ -103,6 +149,38 @@ def list_available_program_hotels_for_user(
         for hotel_info in program_hotels
     ]
 
+@router.get(
+    "/availability",
+    response_model=dict[int, bool],
+    summary="Доступность нескольких отелей для гостя",
+    description=(
+        "Для каждого hotel_ids сообщает, есть ли у отеля слот, доступный гостю по тем же правилам, "
+        "что и подбор: опубликованный, со свободными местами, будущим заездом и в окне date_from–date_to. "
+        f"Не больше {program_hotel_service.MAX_AVAILABILITY_BATCH} отелей за запрос."
+    ),
+)
+def get_hotels_availability_for_user(
+    hotel_ids: list[int] = Query(
+        default=[],
+        max_length=program_hotel_service.MAX_AVAILABILITY_BATCH,
+        description="Id отелей, параметр повторяется: ?hotel_ids=1&hotel_ids=2",
+    ),
+    date_from: date | None = Query(default=None, description="Начало окна проживания"),
+    date_to: date | None = Query(default=None, description="Конец окна проживания включительно"),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db_session),
+):
+    try:
+        return program_hotel_service.hotels_available_for_user(
+            db,
+            hotel_ids=hotel_ids,
+            user=user,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    except ProgramHotelSelectionError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
 @router.patch(
     "/{program_hotel_id}",
     response_model=ProgramHotelRead,
@@ -130,4 +208,70 @@ def update_program_hotel(
     except ProgramHotelUpdateError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    return updated_program_hotel
\ No newline at end of file
+    return updated_program_hotel
+
+
+@router.post(
+    "/{program_hotel_id}/reservations",
+    response_model=ReportRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Бронирование слота",
+    description=(
+        "Списывает одно место в слоте и создает черновик отчета гостя. "
+        "Если мест не осталось, возвращает 409."
+    ),
+)
+def reserve_program_hotel_slot(
+    program_hotel_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db_session),
+) -> ReportRead:
+    try:
+        report = reservation_service.reserve_slot(db, program_hotel_id=program_hotel_id, user=user)
+    except SlotNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except (SlotSoldOutError, DuplicateReservationError) as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+    return report_service.serialize_report(report)
+
+
+@router.post(
+    "/{program_hotel_id}/holds",
+    response_model=SlotHoldRead,
+    status_code=status.HTTP_201_CREATED,
+    summary="Удержание места в слоте",
+    description=(
+        "Удерживает место за гостем на время подтверждения. Повторный запрос продлевает удержание. "
+        "Бронирование слота забирает удержанное место."
+    ),
+)
+def hold_program_hotel_slot(
+    program_hotel_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db_session),
+):
+    try:
+        return reservation_service.hold_slot(db, program_hotel_id=program_hotel_id, user=user)
+    except SlotNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except (SlotSoldOutError, DuplicateReservationError) as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+
+
+@router.delete(
+    "/{program_hotel_id}/holds",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Отмена удержания",
+    description="Снимает удержание гостя и возвращает место в слот.",
+)
+def release_program_hotel_slot_hold(
+    program_hotel_id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db_session),
+) -> Response:
+    try:
+        reservation_service.release_hold(db, program_hotel_id=program_hotel_id, user=user)
+    except SlotHoldNotFoundError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
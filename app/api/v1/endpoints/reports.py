@@ -1,6 +1,7 @@
 from typing import Sequence
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile, status
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db_session
@@ -9,9 +10,9 @@ from app.schemas.report import (
     ReportCreate,
     ReportPhotoRead,
     ReportRead,
-    ReportStep1Payload,
-    ReportStep2Payload,
-    ReportStep6Payload,
+    ReportStep1Draft,
+    ReportStep2Draft,
+    ReportStep6Draft,
 )
 
 from app.services import report_service
@@ -55,59 +56,105 @@ def create_report(payload: ReportCreate, db: Session = Depends(get_db_session))
     "/{report_id}",
     response_model=ReportRead,
     summary="Получение отчета",
-    description="Возвращает данные отчета о пребывании",
+    description="Возвращает данные отчета о пребывании. Версия отчета передается в заголовке ETag.",
 )
-def get_report(report_id: str, db: Session = Depends(get_db_session)) -> ReportRead:
+def get_report(report_id: str, response: Response, db: Session = Depends(get_db_session)) -> ReportRead:
     report = _get_report_or_404(db, report_id)
-    return report_service.serialize_report(report)
+    serialized = report_service.serialize_report(report)
+    _set_etag(response, serialized)
+    return serialized
+
+
+def _set_etag(response: Response, report: ReportRead) -> None:
+    response.headers["ETag"] = f'"{report.version}"'
+
+
+def _parse_if_match(if_match: str | None) -> int | None:
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip().removeprefix("W/").strip('"')
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный заголовок If-Match",
+        ) from exc
+
+
+def _save_step(
+    db: Session,
+    response: Response,
+    *,
+    report_id: str,
+    step: str,
+    payload: BaseModel,
+    if_match: str | None,
+) -> ReportRead:
+    expected_version = _parse_if_match(if_match)
+    report = _get_report_or_404(db, report_id)
+    report_service.ensure_report_editable(report)
+    # Явно переданные null остаются в патче и удаляют поле
+    patch = payload.model_dump(mode="json", exclude_unset=True)
+    updated = report_service.save_step(db, report, step, patch, expected_version=expected_version)
+    serialized = report_service.serialize_report(updated)
+    _set_etag(response, serialized)
+    return serialized
+
+
+_MERGE_PATCH_DESCRIPTION = (
+    "Тело запроса — JSON Merge Patch (RFC 7386) поверх {model}: переданные поля "
+    "заменяются, null удаляет поле. Заголовок If-Match с ETag отчета включает "
+    "проверку версии, при расхождении возвращается 412."
+)
 
 
 @router.patch(
     "/{report_id}/step1",
     response_model=ReportRead,
     summary="Сохранение шага 1",
+    description=_MERGE_PATCH_DESCRIPTION.format(model="ReportStep1Payload"),
 )
 def save_step1(
     report_id: str,
-    payload: ReportStep1Payload,
+    response: Response,
+    payload: ReportStep1Draft,
+    if_match: str | None = Header(default=None),
     db: Session = Depends(get_db_session),
 ) -> ReportRead:
-    report = _get_report_or_404(db, report_id)
-    report_service.ensure_report_editable(report)
-    updated = report_service.save_step(db, report, "step1", payload.model_dump())
-    return report_service.serialize_report(updated)
+    return _save_step(db, response, report_id=report_id, step="step1", payload=payload, if_match=if_match)
 
 
 @router.patch(
     "/{report_id}/step2",
     response_model=ReportRead,
     summary="Сохранение шага 2",
+    description=_MERGE_PATCH_DESCRIPTION.format(model="ReportStep2Payload"),
 )
 def save_step2(
     report_id: str,
-    payload: ReportStep2Payload,
+    response: Response,
+    payload: ReportStep2Draft,
+    if_match: str | None = Header(default=None),
     db: Session = Depends(get_db_session),
 ) -> ReportRead:
-    report = _get_report_or_404(db, report_id)
-    report_service.ensure_report_editable(report)
-    updated = report_service.save_step(db, report, "step2", payload.model_dump())
-    return report_service.serialize_report(updated)
+    return _save_step(db, response, report_id=report_id, step="step2", payload=payload, if_match=if_match)
 
 
 @router.patch(
     "/{report_id}/step6",
     response_model=ReportRead,
     summary="Сохранение шага 6",
+    description=_MERGE_PATCH_DESCRIPTION.format(model="ReportStep6Payload"),
 )
 def save_step6(
     report_id: str,
-    payload: ReportStep6Payload,
+    response: Response,
+    payload: ReportStep6Draft,
+    if_match: str | None = Header(default=None),
     db: Session = Depends(get_db_session),
 ) -> ReportRead:
-    report = _get_report_or_404(db, report_id)
-    report_service.ensure_report_editable(report)
-    updated = report_service.save_step(db, report, "step6", payload.model_dump())
-    return report_service.serialize_report(updated)
+    return _save_step(db, response, report_id=report_id, step="step6", payload=payload, if_match=if_match)
 
 
 @router.post(
@@ -147,6 +194,20 @@ def list_photos(
     return [ReportPhotoRead.model_validate(report_service.serialize_photo(photo)) for photo in photos]
 
 
+@router.delete(
+    "/{report_id}/photos/{photo_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Удаление фотографии",
+)
+def delete_photo(report_id: str, photo_id: int, db: Session = Depends(get_db_session)) -> None:
+    report = _get_report_or_404(db, report_id)
+    report_service.ensure_report_editable(report)
+    photo = report_service.get_photo(db, report=report, photo_id=photo_id)
+    if photo is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Фотография не найдена")
+    report_service.delete_photo(db, report=report, photo=photo)
+
+
 @router.post(
     "/{report_id}/submit",
     response_model=ReportRead,
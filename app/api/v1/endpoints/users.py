@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_active_user, get_db_session
@@ -50,13 +50,30 @@ def update_profile(
     "/me/dashboard",
     response_model=UserDashboard,
     summary="Личный кабинет секретного гостя",
-    description="Возвращает промокод, статус участия и рекомендации по проверкам.",
+    description=(
+        "Возвращает промокод, статус участия и рекомендации по проверкам. Ответ содержит ETag; "
+        "при совпадении заголовка If-None-Match возвращается 304 без тела."
+    ),
 )
 def get_dashboard(
+    response: Response,
+    if_none_match: str | None = Header(default=None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db_session),
-) -> UserDashboard:
-    return user_service.get_user_dashboard(db, user=current_user)
+):
+    cached = user_service.get_cached_user_dashboard(db, user=current_user)
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return cached.dashboard
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
 
 
 @router.get(
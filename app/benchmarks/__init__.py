@@ -0,0 +1 @@
+"""Нагрузочные замеры, запускаются через `python -m app.cli`."""
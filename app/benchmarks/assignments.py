@@ -0,0 +1,44 @@
+"""Пакетное распределение гостей по слотам на синтетических данных.
+
+Замер `assignment_service.solve_assignment` на наборе, близком к сезону
+программы: десятки тысяч принятых гостей, сотни тысяч слотов в нескольких
+десятках городов.
+"""
+
+import random
+
+from app.services.assignment_service import AssignmentResult, GuestDemand, SlotSupply, solve_assignment
+
+CITIES = tuple(f"Город {number}" for number in range(40))
+
+
+def synthetic_market(*, guests: int, slots: int, seed: int = 7) -> tuple[list[GuestDemand], list[SlotSupply]]:
+    rng = random.Random(seed)
+    # Популярность городов неравномерна: первые города востребованы сильнее
+    popularity = [1 / (rank + 1) for rank in range(len(CITIES))]
+    demand = [
+        GuestDemand(
+            user_id=user_id,
+            cities=tuple(rng.choices(CITIES, weights=popularity, k=rng.randint(0, 3))),
+            guests=rng.randint(1, 3),
+            rating=float(rng.randint(0, 10)),
+        )
+        for user_id in range(1, guests + 1)
+    ]
+    supply = [
+        SlotSupply(
+            program_hotel_id=slot_id,
+            city=rng.choice(CITIES),
+            rating=rng.randint(0, 5),
+            capacity=rng.randint(1, 4),
+            cost=rng.randint(1000, 20000),
+            seats=rng.randint(1, 2),
+        )
+        for slot_id in range(1, slots + 1)
+    ]
+    return demand, supply
+
+
+def run(*, guests: int, slots: int) -> AssignmentResult:
+    demand, supply = synthetic_market(guests=guests, slots=slots)
+    return solve_assignment(demand, supply)
@@ -0,0 +1,128 @@
+"""Отбор лучших отелей ранжированием рекомендаций.
+
+На синтетическом потоке слотов сравнивается отбор кучей размера `k`
+(`ranking_service.top_k_hotels`) с полной сортировкой всех отелей, для
+нескольких наборов весов. Для каждого набора показывается, насколько его
+выдача совпадает с выдачей весов по умолчанию.
+"""
+
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from types import SimpleNamespace
+
+from app.services.ranking_service import (
+    Candidate,
+    RankingContext,
+    RankingWeights,
+    top_k_hotels,
+    weighted_score,
+)
+
+WEIGHT_PROFILES = {
+    "default": RankingWeights(),
+    "cheap_first": RankingWeights(cost=4.0),
+    "soonest_first": RankingWeights(date_proximity=5.0),
+    "uncovered_first": RankingWeights(report_coverage=6.0),
+}
+
+
+@dataclass
+class RankingBenchmarkRow:
+    profile: str
+    heap_seconds: float
+    sort_seconds: float
+    same_result: bool
+    overlap_with_default: int
+
+
+def synthetic_candidates(*, candidates: int, hotels: int, seed: int = 42) -> list[Candidate]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    hotel_rows = [
+        SimpleNamespace(id=hotel_id, rating=rng.randint(0, 5), cost=rng.randint(1000, 30000))
+        for hotel_id in range(1, hotels + 1)
+    ]
+    report_counts = {hotel.id: rng.choice((0, 0, 1, 2, 5)) for hotel in hotel_rows}
+    rows = []
+    for program_hotel_id in range(1, candidates + 1):
+        hotel = rng.choice(hotel_rows)
+        check_in = now + timedelta(days=rng.randint(1, 120))
+        slots_total = rng.randint(1, 5)
+        rows.append(
+            Candidate(
+                program_hotel_id=program_hotel_id,
+                hotel=hotel,
+                check_in_date=check_in,
+                check_out_date=check_in + timedelta(days=2),
+                slots_available=rng.randint(1, slots_total),
+                slots_total=slots_total,
+                report_count=report_counts[hotel.id],
+            )
+        )
+    rows.sort(key=lambda candidate: candidate.hotel.id)
+    return rows
+
+
+def _sort_all(rows: list[Candidate], *, k: int, context: RankingContext, score) -> list[int]:
+    # Полная сортировка: записи со всеми датами строятся для каждого отеля, как без кучи
+    entries = []
+    for hotel_id, group in groupby(rows, key=lambda candidate: candidate.hotel.id):
+        scored = sorted(
+            ((score(candidate, context), candidate) for candidate in group),
+            key=lambda item: (-item[0], item[1].program_hotel_id),
+        )
+        entries.append(
+            {
+                "hotel_id": hotel_id,
+                "score": scored[0][0],
+                "available_dates": [
+                    {
+                        "check_in_date": candidate.check_in_date,
+                        "check_out_date": candidate.check_out_date,
+                        "slots_available": candidate.slots_available,
+                    }
+                    for _, candidate in scored
+                ],
+            }
+        )
+    entries.sort(key=lambda entry: (-entry["score"], entry["hotel_id"]))
+    return [entry["hotel_id"] for entry in entries[:k]]
+
+
+def run(*, candidates: int, hotels: int, k: int, user_rating: float = 7.0) -> list[RankingBenchmarkRow]:
+    rows = synthetic_candidates(candidates=candidates, hotels=hotels)
+    context = RankingContext(
+        now=datetime.now(timezone.utc),
+        target_hotel_rating=user_rating / 2,
+        cost_scale=5000.0,
+        horizon_days=14.0,
+    )
+
+    results = []
+    default_ids: list[int] = []
+    for profile, weights in WEIGHT_PROFILES.items():
+        score = weighted_score(weights)
+
+        began = time.perf_counter()
+        picked = [entry["hotel"].id for entry in top_k_hotels(iter(rows), k=k, context=context, score=score)]
+        heap_seconds = time.perf_counter() - began
+
+        began = time.perf_counter()
+        sorted_ids = _sort_all(rows, k=k, context=context, score=score)
+        sort_seconds = time.perf_counter() - began
+
+        if profile == "default":
+            default_ids = picked
+        results.append(
+            RankingBenchmarkRow(
+                profile=profile,
+                heap_seconds=heap_seconds,
+                sort_seconds=sort_seconds,
+                same_result=picked == sorted_ids,
+                overlap_with_default=len(set(picked) & set(default_ids)),
+            )
+        )
+    return results
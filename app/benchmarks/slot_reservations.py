@@ -0,0 +1,120 @@
+"""Конкурентное бронирование одного слота.
+
+Сотни гостей одновременно бронируют один слот программы через
+`reservation_service.reserve_slot`, каждый в своей сессии. Замер проверяет,
+что мест продано ровно столько, сколько было, и что каждой успешной брони
+соответствует черновик отчета.
+"""
+
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.hotel import Hotel
+from app.models.program_hotel import ProgramHotel
+from app.models.report import Report
+from app.models.user import User
+from app.services import reservation_service
+
+
+@dataclass
+class ReservationBenchmarkResult:
+    claimers: int
+    capacity: int
+    elapsed: float
+    outcomes: Counter = field(default_factory=Counter)
+    latencies: list[float] = field(default_factory=list)
+    slots_left: int = 0
+    reports_created: int = 0
+
+    @property
+    def oversold(self) -> bool:
+        reserved = self.outcomes["reserved"]
+        return reserved > self.capacity or reserved != self.reports_created or self.slots_left < 0
+
+    def percentile(self, share: float) -> float:
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def run(*, claimers: int, capacity: int, database_url: str | None = None) -> ReservationBenchmarkResult:
+    with tempfile.TemporaryDirectory() as workdir:
+        url = database_url or f"sqlite:///{Path(workdir) / 'bench.db'}"
+        connect_args = {"check_same_thread": False, "timeout": 60} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args, pool_size=claimers, max_overflow=0)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        with Session() as db:
+            hotel = Hotel(name="Нагрузочный отель", city="Москва", address="—", rating=5, cost=1, guests=2)
+            db.add(hotel)
+            db.flush()
+            check_in = datetime.now(timezone.utc) + timedelta(days=30)
+            slot = ProgramHotel(
+                hotel_id=hotel.id,
+                check_in_date=check_in,
+                check_out_date=check_in + timedelta(days=2),
+                slots_total=capacity,
+                slots_available=capacity,
+            )
+            stamp = time.time_ns()
+            guests = [
+                User(
+                    email=f"bench-{stamp}-{number}@example.com",
+                    hashed_password="-",
+                    first_name="Гость",
+                    last_name=str(number),
+                )
+                for number in range(claimers)
+            ]
+            db.add_all([slot, *guests])
+            db.commit()
+            slot_id = slot.id
+            guest_ids = [guest.id for guest in guests]
+
+        result = ReservationBenchmarkResult(claimers=claimers, capacity=capacity, elapsed=0.0)
+        lock = threading.Lock()
+        start = threading.Barrier(claimers + 1)
+
+        def claim(guest_id: int) -> None:
+            with Session() as db:
+                guest = db.get(User, guest_id)
+                start.wait()
+                began = time.perf_counter()
+                try:
+                    reservation_service.reserve_slot(db, program_hotel_id=slot_id, user=guest)
+                    outcome = "reserved"
+                except reservation_service.SlotSoldOutError:
+                    outcome = "sold_out"
+                except Exception as exc:  # noqa: BLE001 — ошибки БД тоже считаем исходом
+                    outcome = type(exc).__name__
+                with lock:
+                    result.outcomes[outcome] += 1
+                    result.latencies.append(time.perf_counter() - began)
+
+        threads = [threading.Thread(target=claim, args=(guest_id,)) for guest_id in guest_ids]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        result.elapsed = time.perf_counter() - began
+
+        with Session() as db:
+            result.slots_left = db.scalar(select(ProgramHotel.slots_available).where(ProgramHotel.id == slot_id))
+            result.reports_created = db.scalar(
+                select(func.count(Report.id)).where(Report.program_hotel_id == slot_id)
+            )
+        engine.dispose()
+        return result
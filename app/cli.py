@@ -0,0 +1,307 @@
+"""Служебные команды: `python -m app.cli <команда>`."""
+
+import argparse
+import csv
+import sys
+import time
+from datetime import timedelta
+
+from app.benchmarks import assignments, ranking, slot_reservations
+from app.db.base import Base
+from app.db.migrations import upgrade_schema
+from app.db.session import SessionLocal, engine
+from app.services import (
+    admin_service,
+    application_service,
+    assignment_service,
+    export_service,
+    job_service,
+    moderation_feed,
+    report_answers_service,
+    report_search_service,
+    report_service,
+    reservation_service,
+    scoring_rules_service,
+)
+
+
+def _backfill_card_snapshots(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        updated = admin_service.backfill_card_snapshots(db, batch_size=args.batch_size, force=args.force)
+    print(f"Обновлено карточек отчетов: {updated}")
+
+
+def _recount_photo_counts(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        updated = report_service.recount_photo_counts(db)
+    print(f"Пересчитаны счетчики фотографий для отчетов: {updated}")
+
+
+def _prune_moderation_events(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        removed = moderation_feed.prune_events(db, older_than=timedelta(days=args.days))
+    print(f"Удалено событий ленты модерации: {removed}")
+
+
+def _rebuild_search_index(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        processed = report_search_service.rebuild_index(db)
+    print(f"Переиндексировано отчетов: {processed}")
+
+
+def _backfill_answer_tables(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        processed = report_answers_service.backfill(db)
+    print(f"Перенесены ответы отчетов: {processed}")
+
+
+def _backfill_application_scores(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        updated = application_service.backfill_application_scores(
+            db, batch_size=args.batch_size, force=args.force
+        )
+    print(f"Сохранены баллы заявок: {updated}")
+
+
+def _refresh_eligibility(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        processed = application_service.refresh_all_eligibility(db)
+    print(f"Пересчитан допуск пользователей: {processed}")
+
+
+def _rescore_applications(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        if args.version is None:
+            rule_set = scoring_rules_service.get_active_rule_set(db)
+            db.commit()
+        else:
+            stored = scoring_rules_service.get_rule_set_by_version(db, args.version)
+            if stored is None:
+                raise SystemExit(f"Версия правил {args.version} не найдена")
+            rule_set = scoring_rules_service.compile_rule_set(stored)
+        report = application_service.rescore_applications(db, rule_set=rule_set, chunk_size=args.chunk_size)
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["application_id", "user_id", "old_score", "new_score", "old_status", "new_status"])
+    for row in report.changed:
+        writer.writerow(
+            [row.application_id, row.user_id, row.old_score, row.new_score, row.old_status.value, row.new_status.value]
+        )
+    print(
+        f"Версия правил {report.rule_set_version}: оценено {report.evaluated}, "
+        f"пропущено {report.skipped}, изменится статус у {len(report.changed)}",
+        file=sys.stderr,
+    )
+
+
+def _worker(args: argparse.Namespace) -> None:
+    pool = job_service.JobWorkerPool(args.concurrency)
+    pool.start()
+    print(f"Воркеры фоновых задач запущены: {pool.concurrency}. Остановка — Ctrl+C")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+def _prune_jobs(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        removed = job_service.prune_jobs(db, older_than=timedelta(days=args.days))
+    print(f"Удалено завершенных фоновых задач: {removed}")
+
+
+def _bench_slot_reservations(args: argparse.Namespace) -> None:
+    result = slot_reservations.run(claimers=args.claimers, capacity=args.capacity, database_url=args.database_url)
+    outcomes = ", ".join(f"{name}: {count}" for name, count in sorted(result.outcomes.items()))
+    print(f"Гостей: {result.claimers}, мест в слоте: {result.capacity}")
+    print(f"Исходы — {outcomes}")
+    print(f"Осталось мест: {result.slots_left}, черновиков отчетов: {result.reports_created}")
+    print(
+        f"Время: {result.elapsed:.3f} с, {result.claimers / result.elapsed:.0f} броней/с, "
+        f"p50 {result.percentile(0.5) * 1000:.1f} мс, p99 {result.percentile(0.99) * 1000:.1f} мс"
+    )
+    if result.oversold:
+        raise SystemExit("Продано больше мест, чем было в слоте")
+
+
+def _release_expired_holds(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        released = reservation_service.release_expired_holds(db, batch_size=args.batch_size)
+    print(f"Снято просроченных удержаний слотов: {released}")
+
+
+def _bench_ranking(args: argparse.Namespace) -> None:
+    rows = ranking.run(candidates=args.candidates, hotels=args.hotels, k=args.k)
+    print(f"Слотов: {args.candidates}, отелей: {args.hotels}, k = {args.k}")
+    for row in rows:
+        print(
+            f"{row.profile:<16} куча {row.heap_seconds * 1000:8.1f} мс  сортировка {row.sort_seconds * 1000:8.1f} мс  "
+            f"совпадает: {'да' if row.same_result else 'нет'}  общих с default: {row.overlap_with_default}/{args.k}"
+        )
+    if not all(row.same_result for row in rows):
+        raise SystemExit("Отбор кучей разошелся с полной сортировкой")
+
+
+def _propose_assignments(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        batch_id, result = assignment_service.propose_assignments(db)
+    print(f"Пакет {batch_id}: назначено {len(result.assignments)}, без слота {len(result.unassigned)}")
+    print(f"Суммарная стоимость: {result.total_cost:.2f}, время: {result.elapsed:.1f} с")
+
+
+def _bench_assignments(args: argparse.Namespace) -> None:
+    result = assignments.run(guests=args.guests, slots=args.slots)
+    print(f"Гостей: {args.guests}, слотов: {args.slots}")
+    print(f"Назначено: {len(result.assignments)}, без слота: {len(result.unassigned)}")
+    print(
+        f"Суммарная стоимость: {result.total_cost:.2f}, ставок: {result.bids}, фаз: {result.phases}, "
+        f"время: {result.elapsed:.1f} с"
+    )
+
+
+def _export(args: argparse.Namespace) -> None:
+    try:
+        chunks = export_service.stream_export(args.dataset, args.format)
+    except export_service.ExportError as exc:
+        raise SystemExit(str(exc)) from exc
+
+    if args.output == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        return
+
+    with open(args.output, "wb") as output:
+        for chunk in chunks:
+            output.write(chunk)
+    print(f"Выгрузка записана в {args.output}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    card_snapshots = subparsers.add_parser(
+        "backfill-card-snapshots",
+        help="Сохранить карточки для уже одобренных отчетов",
+    )
+    card_snapshots.add_argument("--batch-size", type=int, default=200)
+    card_snapshots.add_argument("--force", action="store_true", help="Перерендерить все карточки")
+    card_snapshots.set_defaults(handler=_backfill_card_snapshots)
+
+    photo_counts = subparsers.add_parser(
+        "recount-photo-counts",
+        help="Пересчитать счетчики фотографий по секциям",
+    )
+    photo_counts.set_defaults(handler=_recount_photo_counts)
+
+    moderation_events = subparsers.add_parser(
+        "prune-moderation-events",
+        help="Удалить старые события ленты модерации",
+    )
+    moderation_events.add_argument("--days", type=int, default=7)
+    moderation_events.set_defaults(handler=_prune_moderation_events)
+
+    search_index = subparsers.add_parser(
+        "rebuild-search-index",
+        help="Перестроить полнотекстовый индекс отчетов",
+    )
+    search_index.set_defaults(handler=_rebuild_search_index)
+
+    answer_tables = subparsers.add_parser(
+        "backfill-answer-tables",
+        help="Заполнить типизированные таблицы ответов отчетов",
+    )
+    answer_tables.set_defaults(handler=_backfill_answer_tables)
+
+    application_scores = subparsers.add_parser(
+        "backfill-application-scores",
+        help="Сохранить баллы уже отправленных заявок",
+    )
+    application_scores.add_argument("--batch-size", type=int, default=500)
+    application_scores.add_argument("--force", action="store_true", help="Пересчитать все заявки")
+    application_scores.set_defaults(handler=_backfill_application_scores)
+
+    eligibility = subparsers.add_parser(
+        "refresh-eligibility",
+        help="Пересчитать допуск пользователей к подаче заявки",
+    )
+    eligibility.set_defaults(handler=_refresh_eligibility)
+
+    rescore = subparsers.add_parser(
+        "rescore-applications",
+        help="Пробный пересчет заявок по версии правил: CSV заявок, чей статус изменится",
+    )
+    rescore.add_argument("--version", type=int, default=None, help="Версия правил, по умолчанию действующая")
+    rescore.add_argument("--chunk-size", type=int, default=application_service.RESCORE_CHUNK_SIZE)
+    rescore.set_defaults(handler=_rescore_applications)
+
+    worker = subparsers.add_parser("worker", help="Запустить воркеры фоновых задач")
+    worker.add_argument("--concurrency", type=int, default=2)
+    worker.set_defaults(handler=_worker)
+
+    prune_jobs = subparsers.add_parser("prune-jobs", help="Удалить завершенные фоновые задачи")
+    prune_jobs.add_argument("--days", type=int, default=14)
+    prune_jobs.set_defaults(handler=_prune_jobs)
+
+    expired_holds = subparsers.add_parser(
+        "release-expired-holds",
+        help="Снять просроченные удержания слотов и вернуть места",
+    )
+    expired_holds.add_argument("--batch-size", type=int, default=None)
+    expired_holds.set_defaults(handler=_release_expired_holds)
+
+    bench_reservations = subparsers.add_parser(
+        "bench-slot-reservations",
+        help="Замер конкурентного бронирования одного слота (по умолчанию во временной SQLite)",
+    )
+    bench_reservations.add_argument("--claimers", type=int, default=300)
+    bench_reservations.add_argument("--capacity", type=int, default=10)
+    bench_reservations.add_argument(
+        "--database-url", default=None, help="БД для замера; в нее будут записаны тестовые строки"
+    )
+    bench_reservations.set_defaults(handler=_bench_slot_reservations)
+
+    bench_ranking = subparsers.add_parser(
+        "bench-ranking",
+        help="Замер отбора лучших рекомендаций кучей против полной сортировки для наборов весов",
+    )
+    bench_ranking.add_argument("--candidates", type=int, default=200_000)
+    bench_ranking.add_argument("--hotels", type=int, default=20_000)
+    bench_ranking.add_argument("--k", type=int, default=5)
+    bench_ranking.set_defaults(handler=_bench_ranking)
+
+    propose = subparsers.add_parser(
+        "propose-assignments",
+        help="Распределить принятых гостей по свободным слотам и сохранить предложения",
+    )
+    propose.set_defaults(handler=_propose_assignments)
+
+    bench_assignments = subparsers.add_parser(
+        "bench-assignments",
+        help="Замер пакетного распределения гостей по слотам на синтетических данных",
+    )
+    bench_assignments.add_argument("--guests", type=int, default=50_000)
+    bench_assignments.add_argument("--slots", type=int, default=200_000)
+    bench_assignments.set_defaults(handler=_bench_assignments)
+
+    export = subparsers.add_parser("export", help="Выгрузить данные в CSV или Parquet")
+    export.add_argument("dataset", choices=sorted(export_service.DATASETS))
+    export.add_argument("--format", choices=export_service.EXPORT_FORMATS, default="csv")
+    export.add_argument("--output", default="-", help="Путь к файлу, '-' — stdout")
+    export.set_defaults(handler=_export)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+    with SessionLocal() as db:
+        scoring_rules_service.seed_default_rule_set(db)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
-from pydantic import Field
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
+# Имена весов ranking_service.RankingWeights: config не может импортировать сервис, который читает settings
+RECOMMENDATION_WEIGHT_NAMES = ("rating_fit", "cost", "date_proximity", "scarcity", "report_coverage")
+
 
 class Settings(BaseSettings):
     api_v1_prefix: str = Field(default="/api/v1")
@@ -13,6 +16,44 @@ class Settings(BaseSettings):
     static_url: str = Field(default="/static")
     application_photos_prefix: str = Field(default="applications")
     report_photos_prefix: str = Field(default="reports")
+    # Интервал опроса журнала модерации для доставки событий с других воркеров; 0 — только свой процесс
+    moderation_feed_poll_seconds: float = Field(default=0)
+    # Срок аренды заявки проверяющим в очереди рассмотрения
+    review_lease_seconds: int = Field(default=900)
+    # Воркеры фоновых задач внутри процесса API; 0 — задачи выполняет отдельный `python -m app.cli worker`
+    job_workers: int = Field(default=1)
+    job_poll_seconds: float = Field(default=1.0)
+    job_lease_seconds: int = Field(default=300)
+    # Подбор отелей программы по индексу в памяти; версия данных в БД сверяется не чаще раза в N секунд
+    availability_index_enabled: bool = Field(default=True)
+    availability_refresh_seconds: float = Field(default=5.0)
+    # Удержание места в слоте до подтверждения брони; просроченные удержания снимаются пачками
+    slot_hold_seconds: int = Field(default=600)
+    slot_hold_sweep_seconds: int = Field(default=60)
+    slot_hold_sweep_batch: int = Field(default=500)
+    # Веса признаков ранжирования рекомендаций (ranking_service.RankingWeights), например
+    # RECOMMENDATION_WEIGHTS='{"cost": 0, "date_proximity": 3}'
+    recommendation_weights: dict[str, float] = Field(default_factory=dict)
+    # Стоимость, при которой признак цены равен 0.5, и горизонт в днях для близости заезда
+    recommendation_cost_scale: float = Field(default=5000.0)
+    recommendation_horizon_days: float = Field(default=14.0)
+    # Кэш рекомендаций по профилю подбора: срок жизни записи и число профилей в памяти
+    recommendation_cache_seconds: float = Field(default=300.0)
+    recommendation_cache_size: int = Field(default=10000)
+    # Кэш собранного дашборда гостя: срок жизни записи и число пользователей в памяти
+    dashboard_cache_seconds: float = Field(default=300.0)
+    dashboard_cache_size: int = Field(default=10000)
+    # Фоновый прогрев кэша для активных пользователей; 0 — выключен
+    recommendation_warm_seconds: float = Field(default=0)
+    recommendation_warm_users: int = Field(default=1000)
+
+    @field_validator("recommendation_weights")
+    @classmethod
+    def validate_recommendation_weights(cls, value: dict[str, float]) -> dict[str, float]:
+        unknown = sorted(set(value) - set(RECOMMENDATION_WEIGHT_NAMES))
+        if unknown:
+            raise ValueError(f"Неизвестные веса ранжирования: {', '.join(unknown)}")
+        return value
 
     class Config:
         env_file = ".env"
@@ -4,6 +4,13 @@ from app.models.hotel import Hotel
 from app.models.program_application import ProgramApplication
 from app.models.program_hotel import ProgramHotel
 from app.models.report import Report, Photo
+from app.models.report_answers import ReportStep1Answers, ReportStep2Answers
+from app.models.moderation_event import ModerationEvent
+from app.models.scoring_rule_set import ScoringRuleSet
+from app.models.background_job import BackgroundJob
+from app.models.slot_hold import SlotHold
+from app.models.assignment_proposal import AssignmentProposal
+from app.models import report_search  # noqa: F401  DDL полнотекстового индекса
 
 __all__ = [
     "Base",
@@ -13,4 +20,11 @@ __all__ = [
     "ProgramHotel",
     "Report",
     "Photo",
+    "ReportStep1Answers",
+    "ReportStep2Answers",
+    "ModerationEvent",
+    "ScoringRuleSet",
+    "BackgroundJob",
+    "SlotHold",
+    "AssignmentProposal",
 ]
\ No newline at end of file
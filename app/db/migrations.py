@@ -0,0 +1,50 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import Column
+
+from app.db.base import Base
+
+
+def _default_sql(column: Column, engine: Engine) -> str | None:
+    server_default = column.server_default
+    if server_default is None:
+        return None
+    arg = getattr(server_default, "arg", None)
+    if isinstance(arg, str):
+        return "'" + arg.replace("'", "''") + "'"
+    if arg is not None:
+        return str(arg.compile(dialect=engine.dialect))
+    return None
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Досоздает колонки и индексы, появившиеся в моделях после создания таблиц.
+
+    `create_all` создает только отсутствующие таблицы, поэтому уже существующая
+    база не получает новых полей. Колонки добавляются без NOT NULL: значения
+    для старых строк заполняются server_default или командами backfill.
+    """
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            present_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                default_sql = _default_sql(column, engine)
+                if default_sql is not None:
+                    ddl += f" DEFAULT {default_sql}"
+                connection.execute(text(ddl))
+
+            present_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in present_indexes:
+                    index.create(connection)
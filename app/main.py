@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -7,7 +8,32 @@ from fastapi.staticfiles import StaticFiles
 from app.api.v1.router import api_router
 from app.core.config import settings
 from app.db.base import Base
-from app.db.session import engine
+from app.db.migrations import upgrade_schema
+from app.db.session import SessionLocal, engine
+from app.services import job_service, scoring_rules_service, user_service
+from app.services.recommendation_cache import RecommendationWarmer
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    pool = None
+    warmer = None
+    if settings.job_workers > 0:
+        pool = job_service.JobWorkerPool(settings.job_workers)
+        pool.start()
+    if settings.recommendation_warm_seconds > 0:
+        warmer = RecommendationWarmer(
+            lambda db, user, limit: user_service.compute_user_recommendations(db, user=user, limit=limit)
+        )
+        warmer.start()
+    try:
+        yield
+    finally:
+        if warmer is not None:
+            warmer.stop()
+        if pool is not None:
+            pool.stop()
+
 
 app = FastAPI(
     title=settings.project_name,
@@ -24,9 +50,13 @@ app = FastAPI(
         "docExpansion": "none",
         "defaultModelsExpandDepth": -1,
     },
+    lifespan=lifespan,
 )
 
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+with SessionLocal() as db:
+    scoring_rules_service.seed_default_rule_set(db)
 
 app.include_router(api_router, prefix=settings.api_v1_prefix)
 
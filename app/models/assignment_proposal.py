@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+PROPOSAL_STATUSES = ("proposed", "applied")
+
+
+# Предложение пакетного распределения: гость и слот, которые администратор может применить
+class AssignmentProposal(Base):
+    __tablename__ = "assignment_proposals"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    batch_id = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    program_hotel_id = Column(Integer, ForeignKey("program_hotels.id", ondelete="CASCADE"), nullable=False)
+    cost = Column(Float, nullable=False)
+    status = Column(String, nullable=False, default="proposed", server_default="proposed", index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
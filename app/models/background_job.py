@@ -0,0 +1,30 @@
+from sqlalchemy import Column, DateTime, Index, Integer, JSON, String, Text
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+
+# Фоновая задача: выполняется воркером, повторяется с нарастающей задержкой при ошибках
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        Index("ix_background_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False, index=True)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String, nullable=False, default="queued", server_default="queued")
+    idempotency_key = Column(String, nullable=True, unique=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=5, server_default="5")
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+MODERATION_EVENT_TYPES = ("enqueued", "removed")
+
+
+# Журнал изменений очереди модерации: id события служит токеном возобновления ленты
+class ModerationEvent(Base):
+    __tablename__ = "moderation_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    report_id = Column(String, nullable=False, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Integer, String, Text, JSON
+from sqlalchemy import Column, DateTime, Enum as SAEnum, ForeignKey, Index, Integer, String, Text, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -17,6 +17,10 @@ class ProgramApplicationStatus(str, enum.Enum):
 
 class ProgramApplication(Base):
     __tablename__ = "program_applications"
+    __table_args__ = (
+        Index("ix_program_applications_status_total_score", "status", "total_score"),
+        Index("ix_program_applications_lease_expires_at", "lease_expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
@@ -32,9 +36,19 @@ class ProgramApplication(Base):
         nullable=False,
     )
     reviewer_comment = Column(Text, nullable=True)
+    # Баллы фиксируются при отправке заявки; NULL — заявка еще не оценивалась
+    raw_score = Column(Integer, nullable=True)
+    user_bonus = Column(Integer, nullable=True)
+    total_score = Column(Integer, nullable=True)
+    # Аренда заявки проверяющим в очереди рассмотрения
+    lease_owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    scoring_rule_set_id = Column(
+        Integer, ForeignKey("scoring_rule_sets.id", ondelete="SET NULL"), nullable=True, index=True
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
 
-    user = relationship("User", back_populates="applications")
+    user = relationship("User", back_populates="applications", foreign_keys=[user_id])
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, ForeignKey
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -6,9 +6,13 @@ from app.db.base_class import Base
 # Модель для секретного гостя, основная логика программы будет с ней
 class ProgramHotel(Base):
     __tablename__ = "program_hotels"
+    __table_args__ = (
+        # Подбор по окну дат: диапазон по заезду среди опубликованных слотов, выезд проверяется по индексу
+        Index("ix_program_hotels_published_stay", "is_published", "check_in_date", "check_out_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False)
+    hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False, index=True)
     check_in_date = Column(DateTime(timezone=True), nullable=False)
     check_out_date = Column(DateTime(timezone=True), nullable=False)
     slots_total = Column(Integer, nullable=False)
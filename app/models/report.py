@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import CheckConstraint, Column, DateTime, Enum, Float, ForeignKey, Integer, String
+from sqlalchemy import CheckConstraint, Column, DateTime, Enum, Float, ForeignKey, Index, Integer, String, text
 from sqlalchemy.dialects.sqlite import JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -10,14 +10,30 @@ from app.db.base_class import Base
 
 REPORT_STATUSES = ("draft", "on_moderation", "approved", "rejected")
 PHOTO_SECTIONS = ("photos_match", "cleanliness", "food", "general")
+PHOTO_COUNT_COLUMNS = {section: f"{section}_photo_count" for section in PHOTO_SECTIONS}
 
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        # Один черновик на гостя в слоте: повторное бронирование, в том числе параллельное, отклоняется
+        Index(
+            "uq_reports_slot_user_draft",
+            "program_hotel_id",
+            "user_id",
+            unique=True,
+            sqlite_where=text("status = 'draft'"),
+            postgresql_where=text("status = 'draft'"),
+        ),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
     hotel_id = Column(Integer, ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Слот программы, бронированием которого создан черновик
+    program_hotel_id = Column(
+        Integer, ForeignKey("program_hotels.id", ondelete="SET NULL"), nullable=True, index=True
+    )
     checkout_date = Column(DateTime(timezone=True), nullable=False)
     status = Column(
         Enum(*REPORT_STATUSES, name="report_status"),
@@ -26,6 +42,15 @@ class Report(Base):
     )
     answers = Column(JSON, nullable=False, default=dict)
     overall_score = Column(Float, nullable=True)
+    # Версия строки для оптимистичной блокировки автосохранения (ETag / If-Match)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Готовая карточка отзыва для страницы отеля, рендерится при одобрении отчета
+    card_snapshot = Column(JSON, nullable=True)
+    # Счетчики фотографий по секциям, обновляются вместе с загрузкой и удалением фото
+    photos_match_photo_count = Column(Integer, nullable=False, default=0, server_default="0")
+    cleanliness_photo_count = Column(Integer, nullable=False, default=0, server_default="0")
+    food_photo_count = Column(Integer, nullable=False, default=0, server_default="0")
+    general_photo_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
         DateTime(timezone=True),
@@ -33,7 +58,7 @@ class Report(Base):
         onupdate=func.now(),
         nullable=False,
     )
-    submitted_at = Column(DateTime(timezone=True), nullable=True)
+    submitted_at = Column(DateTime(timezone=True), nullable=True, index=True)
 
     photos = relationship(
         "Photo",
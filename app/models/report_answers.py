@@ -0,0 +1,40 @@
+from sqlalchemy import Column, ForeignKey, Integer, String, Text
+
+from app.db.base_class import Base
+
+
+# Типизированные копии ответов шагов 1 и 2 для фильтрации и агрегации в SQL.
+# Заполняются в той же транзакции, что и Report.answers; JSON остается источником правды.
+class ReportStep1Answers(Base):
+    __tablename__ = "report_step1_answers"
+
+    report_id = Column(String, ForeignKey("reports.id", ondelete="CASCADE"), primary_key=True)
+    photo_match = Column(String, nullable=True, index=True)
+    photo_mismatch_text = Column(Text, nullable=True)
+    amenities_state = Column(String, nullable=True, index=True)
+    amenities_details = Column(Text, nullable=True)
+    room_cleanliness = Column(Integer, nullable=True, index=True)
+    bathroom_sanitation = Column(Integer, nullable=True)
+    linen_freshness = Column(Integer, nullable=True)
+    public_area_cleanliness = Column(Integer, nullable=True)
+
+
+class ReportStep2Answers(Base):
+    __tablename__ = "report_step2_answers"
+
+    report_id = Column(String, ForeignKey("reports.id", ondelete="CASCADE"), primary_key=True)
+    wait_time = Column(String, nullable=True, index=True)
+    politeness = Column(Integer, nullable=True)
+    informedness = Column(String, nullable=True)
+    response_speed = Column(Integer, nullable=True)
+    problem_resolution = Column(String, nullable=True)
+    wifi_quality = Column(String, nullable=True, index=True)
+    ac_state = Column(String, nullable=True, index=True)
+    plumbing_state = Column(String, nullable=True, index=True)
+    furniture_state = Column(String, nullable=True)
+    food_match = Column(String, nullable=True, index=True)
+    food_quality = Column(Integer, nullable=True)
+    food_assortment = Column(String, nullable=True)
+    fire_alarm = Column(String, nullable=True)
+    exits_state = Column(String, nullable=True)
+    safe_state = Column(String, nullable=True)
@@ -0,0 +1,62 @@
+from sqlalchemy import DDL, event
+
+from app.db.base_class import Base
+
+# Полнотекстовый индекс по текстовым ответам отчетов. Таблица не описывается ORM-моделью:
+# в SQLite это виртуальная FTS5-таблица, в Postgres — tsvector с русской конфигурацией и GIN-индексом.
+# Строковый id отчета в FTS5 не индексируется, поэтому строки индекса адресуются целым rowid,
+# который выдает таблица соответствия report_search_ids (rowid отчета нестабилен: VACUUM может его перенумеровать).
+REPORT_SEARCH_TABLE = "report_search"
+REPORT_SEARCH_IDS_TABLE = "report_search_ids"
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {REPORT_SEARCH_TABLE} "
+        "USING fts5(body, tokenize = 'unicode61 remove_diacritics 2')"
+    ).execute_if(dialect="sqlite"),
+)
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        f"CREATE TABLE IF NOT EXISTS {REPORT_SEARCH_IDS_TABLE} ("
+        "search_rowid INTEGER PRIMARY KEY, "
+        "report_id VARCHAR NOT NULL UNIQUE)"
+    ).execute_if(dialect="sqlite"),
+)
+
+# Внешних ключей у FTS5 нет: строку индекса удаляет триггер, в том числе при каскадном удалении отчета
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        f"CREATE TRIGGER IF NOT EXISTS {REPORT_SEARCH_TABLE}_report_deleted AFTER DELETE ON reports BEGIN "
+        f"DELETE FROM {REPORT_SEARCH_TABLE} WHERE rowid = "
+        f"(SELECT search_rowid FROM {REPORT_SEARCH_IDS_TABLE} WHERE report_id = old.id); "
+        f"DELETE FROM {REPORT_SEARCH_IDS_TABLE} WHERE report_id = old.id; "
+        "END"
+    ).execute_if(dialect="sqlite"),
+)
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        f"CREATE TABLE IF NOT EXISTS {REPORT_SEARCH_TABLE} ("
+        "report_id VARCHAR PRIMARY KEY REFERENCES reports (id) ON DELETE CASCADE, "
+        "body TEXT NOT NULL, "
+        "document TSVECTOR NOT NULL)"
+    ).execute_if(dialect="postgresql"),
+)
+
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        f"CREATE INDEX IF NOT EXISTS ix_{REPORT_SEARCH_TABLE}_document "
+        f"ON {REPORT_SEARCH_TABLE} USING gin (document)"
+    ).execute_if(dialect="postgresql"),
+)
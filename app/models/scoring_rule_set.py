@@ -0,0 +1,18 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer, JSON, Text
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+# Версия правил подсчета баллов анкеты: баллы за ответы и пороги статусов
+class ScoringRuleSet(Base):
+    __tablename__ = "scoring_rule_sets"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    version = Column(Integer, nullable=False, unique=True)
+    rules = Column(JSON, nullable=False)
+    reject_max_score = Column(Integer, nullable=False)
+    review_max_score = Column(Integer, nullable=False)
+    is_active = Column(Boolean, nullable=False, default=False, server_default="0", index=True)
+    comment = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+# Временное удержание места в слоте программы: место уже списано из slots_available
+# и возвращается при отмене или по истечении expires_at
+class SlotHold(Base):
+    __tablename__ = "program_hotel_holds"
+    __table_args__ = (
+        UniqueConstraint("program_hotel_id", "user_id", name="uq_program_hotel_holds_slot_user"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    program_hotel_id = Column(Integer, ForeignKey("program_hotels.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, JSON, Date
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, JSON, Date
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -7,6 +7,9 @@ from sqlalchemy.ext.mutable import MutableList
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_eligible_from", "role", "eligible_from"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -28,6 +31,12 @@ class User(Base):
     guru_level = Column(Integer, default=0, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Допуск к подаче заявки, поддерживается eligibility_service
+    active_application_until = Column(DateTime(timezone=True), nullable=True)
+    eligibility_reason = Column(String, nullable=True)
+    eligible_from = Column(DateTime(timezone=True), nullable=True)
 
-    applications = relationship("ProgramApplication", back_populates="user")
+    applications = relationship(
+        "ProgramApplication", back_populates="user", foreign_keys="ProgramApplication.user_id"
+    )
     reports = relationship("Report", back_populates="user")
\ No newline at end of file
@@ -1,17 +1,20 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, ConfigDict, Field
 
 from app.models.program_application import ProgramApplicationStatus
 from app.schemas.report import ReportStatus
 
+BULK_MODERATION_MAX_ITEMS = 500
+
 
 class SecretGuestApplicationRow(BaseModel):
     application_id: int
     user_id: int | None
     full_name: str
     email: str | None = None
-    score: int = Field(ge=0)
+    score: int | None = None
     status: ProgramApplicationStatus
     submitted_at: datetime
 
@@ -64,3 +67,80 @@ class HotelCardReportList(BaseModel):
     total_reports: int
     average_score: float | None = None
     items: list[HotelCardReportEntry]
+
+
+class ReportBulkModeration(BaseModel):
+    report_ids: list[str] = Field(min_length=1, max_length=BULK_MODERATION_MAX_ITEMS)
+    status: ReportStatus
+
+
+class ApplicationBulkModeration(BaseModel):
+    application_ids: list[int] = Field(min_length=1, max_length=BULK_MODERATION_MAX_ITEMS)
+    status: ProgramApplicationStatus
+    reviewer_comment: str | None = None
+
+
+class BulkModerationResult(BaseModel):
+    id: str | int
+    success: bool
+    status: str | None = None
+    error: str | None = None
+
+
+class ReportSearchHit(BaseModel):
+    report_id: str
+    hotel_id: int
+    status: ReportStatus
+    overall_score: float | None = None
+    rank: float
+    snippet: str
+
+
+class ScoreSummary(BaseModel):
+    mean: float | None = None
+    p25: float | None = None
+    p50: float | None = None
+    p75: float | None = None
+    p90: float | None = None
+
+
+class QualityMonthlyPoint(BaseModel):
+    month: str
+    reports_count: int
+    overall_mean: float | None = None
+
+
+class QualityAnalyticsGroup(BaseModel):
+    hotel_id: int | None = None
+    city: str
+    reports_count: int
+    scores: dict[str, ScoreSummary] = Field(default_factory=dict)
+    distributions: dict[str, dict[str, int]] = Field(default_factory=dict)
+    monthly: list[QualityMonthlyPoint] = Field(default_factory=list)
+
+
+class HotelAnswerIssueRow(BaseModel):
+    hotel_id: int
+    hotel_name: str
+    city: str
+    reports_count: int
+    last_submitted_at: datetime | None = None
+
+
+class EligibleCandidateRow(BaseModel):
+    user_id: int
+    full_name: str
+    email: str
+    eligible_from: datetime
+
+
+class AssignmentProposalRead(BaseModel):
+    id: int
+    batch_id: str
+    user_id: int
+    program_hotel_id: int
+    cost: float
+    status: Literal["proposed", "applied"]
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
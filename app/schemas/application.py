@@ -31,6 +31,9 @@ class ApplicationRead(ApplicationBase):
     status: ProgramApplicationStatus
     reviewer_comment: str | None
     photos: list[str]
+    raw_score: int | None = None
+    user_bonus: int | None = None
+    total_score: int | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -44,3 +47,8 @@ class ApplicationStatusUpdate(BaseModel):
 
 class ApplicationFilter(BaseModel):
     status: ProgramApplicationStatus | None = None
+
+
+class ApplicationLease(BaseModel):
+    application: ApplicationRead
+    lease_expires_at: datetime
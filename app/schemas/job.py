@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class JobCreate(BaseModel):
+    kind: str
+    idempotency_key: str | None = Field(default=None, max_length=200)
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    payload: dict[str, Any] = Field(default_factory=dict)
+    status: str
+    idempotency_key: str | None = None
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    last_error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobKindMetrics(BaseModel):
+    kind: str
+    queued: int = 0
+    running: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    oldest_queued_at: datetime | None = None
+
+
+class JobWorkerMetrics(BaseModel):
+    workers: int = 0
+    succeeded: int = 0
+    retried: int = 0
+    failed: int = 0
+    average_duration_ms: float | None = None
+
+
+class JobMetrics(BaseModel):
+    kinds: list[JobKindMetrics] = Field(default_factory=list)
+    worker: JobWorkerMetrics = Field(default_factory=JobWorkerMetrics)
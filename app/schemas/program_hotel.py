@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime, time
 
-from pydantic import BaseModel, ConfigDict, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 from .hotel import HotelRead
 
@@ -56,4 +56,36 @@ class ProgramHotelAvailableDate(BaseModel):
 
 class ProgramHotelAvailabilityRead(BaseModel):
     hotel: HotelRead
-    available_dates: list[ProgramHotelAvailableDate]
\ No newline at end of file
+    available_dates: list[ProgramHotelAvailableDate]
+
+
+class SlotHoldRead(BaseModel):
+    id: int
+    program_hotel_id: int
+    expires_at: datetime
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProgramHotelScheduleCreate(BaseModel):
+    hotel_ids: list[int] = Field(min_length=1, max_length=5000)
+    start_date: date
+    end_date: date
+    stay_nights: int = Field(default=1, ge=1)
+    cadence_days: int = Field(default=1, ge=1)
+    slots_per_stay: int = Field(default=1, ge=1)
+    check_in_time: time = time(14, 0)
+    check_out_time: time = time(12, 0)
+    is_published: bool = True
+
+    @model_validator(mode="after")
+    def validate_period(self) -> "ProgramHotelScheduleCreate":
+        if self.start_date > self.end_date:
+            raise ValueError("Начало расписания должно быть не позже его окончания")
+        return self
+
+
+class ProgramHotelScheduleResult(BaseModel):
+    created: int
+    skipped_existing: int
@@ -2,7 +2,8 @@ from datetime import datetime
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, create_model, field_validator, model_validator
+from pydantic.fields import FieldInfo
 
 
 class ReportStatus(str, Enum):
@@ -25,12 +26,17 @@ class ReportCreate(BaseModel):
     user_id: int | None = Field(default=None, gt=0)
 
 
+class ReportStatusUpdate(BaseModel):
+    status: ReportStatus
+
+
 class ReportRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
     id: str
     user_id: int | None
     hotel_id: int
+    program_hotel_id: int | None = None
     checkout_date: datetime
     status: ReportStatus
     answers: dict[str, Any] = Field(default_factory=dict)
@@ -39,6 +45,8 @@ class ReportRead(BaseModel):
     updated_at: datetime
     submitted_at: datetime | None = None
     editing_enabled: bool
+    version: int = 1
+    photo_counts: dict[str, int] = Field(default_factory=dict)
 
 
 class PhotoMatch(str, Enum):
@@ -187,6 +195,35 @@ class ReportStep6Payload(BaseModel):
         return self
 
 
+def _draft_model(model: type[BaseModel], title: str) -> type[BaseModel]:
+    """Черновая версия модели шага: все поля необязательны, лишние ключи отбрасываются.
+
+    Ограничения полей и field-валидаторы сохраняются; проверки связей между полями
+    (model-валидаторы) выполняются только для заполненного шага.
+    """
+
+    fields = {
+        name: (info.annotation | None, FieldInfo.merge_field_infos(info, default=None))
+        for name, info in model.model_fields.items()
+    }
+    validators = {
+        name: field_validator(*decorator.info.fields, mode=decorator.info.mode)(classmethod(decorator.func.__func__))
+        for name, decorator in model.__pydantic_decorators__.field_validators.items()
+    }
+    return create_model(
+        title,
+        __config__=ConfigDict(extra="ignore"),
+        __validators__=validators,
+        **fields,
+    )
+
+
+# Черновики шагов: тело автосохранения (merge patch) до заполнения шага целиком
+ReportStep1Draft = _draft_model(ReportStep1Payload, "ReportStep1Draft")
+ReportStep2Draft = _draft_model(ReportStep2Payload, "ReportStep2Draft")
+ReportStep6Draft = _draft_model(ReportStep6Payload, "ReportStep6Draft")
+
+
 class ReportPhotoRead(BaseModel):
     id: int
     report_id: str
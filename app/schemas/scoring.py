@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.models.program_application import ProgramApplicationStatus
+
+
+class ScoringRuleSetCreate(BaseModel):
+    rules: dict[str, dict[str, int]] = Field(..., description="Баллы за варианты ответа по вопросам анкеты")
+    reject_max_score: int = Field(..., description="Итоговый балл, до которого заявка отклоняется")
+    review_max_score: int = Field(..., description="Итоговый балл, до которого заявка уходит на ручную проверку")
+    comment: str | None = None
+
+
+class ScoringRuleSetRead(BaseModel):
+    id: int
+    version: int
+    rules: dict[str, dict[str, int]]
+    reject_max_score: int
+    review_max_score: int
+    is_active: bool
+    comment: str | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RescoreDiffRow(BaseModel):
+    application_id: int
+    user_id: int | None = None
+    old_score: int | None = None
+    new_score: int
+    old_status: ProgramApplicationStatus
+    new_status: ProgramApplicationStatus
+
+
+class RescoreReport(BaseModel):
+    rule_set_id: int
+    rule_set_version: int
+    evaluated: int = 0
+    skipped: int = 0
+    changed: list[RescoreDiffRow] = Field(default_factory=list)
@@ -75,6 +75,7 @@ class UserDashboardRecommendation(BaseModel):
     rating: int
     cost: int
     guests: int
+    score: float | None = None
     available_dates: list[UserDashboardRecommendationDate] = Field(default_factory=list)
 
 
@@ -3,8 +3,8 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Iterable
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.core.config import settings
 from app.models.hotel import Hotel
@@ -12,6 +12,7 @@ from app.models.program_application import ProgramApplication, ProgramApplicatio
 from app.models.report import Photo, Report
 from app.models.user import User
 from app.schemas.admin import (
+    BulkModerationResult,
     HotelCardReportEntry,
     HotelCardReportList,
     HotelCardReportPhoto,
@@ -30,7 +31,7 @@ from app.schemas.report import (
     WaitTime,
     WifiQuality,
 )
-from app.services import application_service
+from app.services import application_service, job_service, moderation_feed
 
 
 def _full_name(user: User | None) -> str:
@@ -40,14 +41,26 @@ def _full_name(user: User | None) -> str:
     return " ".join(part for part in parts if part).strip() or (user.email or "")
 
 
-def list_secret_guest_applications(db: Session) -> list[SecretGuestApplicationRow]:
-    applications: Iterable[ProgramApplication] = (
-        db.query(ProgramApplication)
-        .options(joinedload(ProgramApplication.user))
-        .filter(ProgramApplication.status == ProgramApplicationStatus.accepted)
-        .order_by(ProgramApplication.created_at.desc())
-        .all()
-    )
+def list_secret_guest_applications(
+    db: Session,
+    *,
+    min_score: int | None = None,
+    max_score: int | None = None,
+    sort_by: str = "created_at",
+    descending: bool = True,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[SecretGuestApplicationRow]:
+    applications: Iterable[ProgramApplication] = application_service.filter_applications_query(
+        db.query(ProgramApplication).options(joinedload(ProgramApplication.user)),
+        status=ProgramApplicationStatus.accepted,
+        min_score=min_score,
+        max_score=max_score,
+        sort_by=sort_by,
+        descending=descending,
+        limit=limit,
+        offset=offset,
+    ).all()
 
     rows: list[SecretGuestApplicationRow] = []
     for application in applications:
@@ -58,7 +71,7 @@ def list_secret_guest_applications(db: Session) -> list[SecretGuestApplicationRo
                 user_id=user.id if user else None,
                 full_name=_full_name(user),
                 email=user.email if user else None,
-                score=application_service.calculate_application_score(application),
+                score=application.total_score,
                 status=application.status,
                 submitted_at=application.created_at,
             )
@@ -104,24 +117,23 @@ def list_reports_on_moderation(db: Session) -> list[ReportModerationRow]:
         .all()
     )
 
-    rows: list[ReportModerationRow] = []
-    for report in reports:
-        user = report.user
-        hotel = report.hotel
-        rows.append(
-            ReportModerationRow(
-                report_id=report.id,
-                user_id=user.id if user else None,
-                full_name=_full_name(user),
-                level=user.rating if user else None,
-                hotel_id=hotel.id if hotel else report.hotel_id,
-                hotel_name=hotel.name if hotel else "",
-                status=ReportStatus(report.status),
-                overall_score=report.overall_score,
-                submitted_at=report.submitted_at,
-            )
-        )
-    return rows
+    return [serialize_moderation_row(report) for report in reports]
+
+
+def serialize_moderation_row(report: Report) -> ReportModerationRow:
+    user = report.user
+    hotel = report.hotel
+    return ReportModerationRow(
+        report_id=report.id,
+        user_id=user.id if user else None,
+        full_name=_full_name(user),
+        level=user.rating if user else None,
+        hotel_id=hotel.id if hotel else report.hotel_id,
+        hotel_name=hotel.name if hotel else "",
+        status=ReportStatus(report.status),
+        overall_score=report.overall_score,
+        submitted_at=report.submitted_at,
+    )
 
 
 _WIFI_DESCRIPTIONS = {
@@ -258,6 +270,219 @@ def _serialize_card_entry(
     )
 
 
+def _parse_step(data: object, model):
+    if not data:
+        return None
+    try:
+        return model.model_validate(data)
+    except Exception:  # noqa: BLE001
+        return None
+
+
+def _render_card_entries(db: Session, reports: list[Report]) -> dict[str, HotelCardReportEntry]:
+    applications = _gather_user_applications(db, {report.user_id for report in reports})
+
+    entries: dict[str, HotelCardReportEntry] = {}
+    for report in reports:
+        answers = report.answers if isinstance(report.answers, dict) else {}
+        step1 = _parse_step(answers.get("step1"), ReportStep1Payload)
+        step2 = _parse_step(answers.get("step2"), ReportStep2Payload)
+        step6 = _parse_step(answers.get("step6"), ReportStep6Payload)
+
+        photos = sorted(report.photos, key=lambda photo: photo.id)
+        application = applications.get(report.user_id) if report.user_id else None
+
+        entries[report.id] = _serialize_card_entry(
+            report,
+            step1,
+            step2,
+            step6,
+            photos,
+            application,
+        )
+    return entries
+
+
+def render_card_snapshot(db: Session, report: Report) -> dict:
+    """Рендерит карточку отзыва для хранения в `Report.card_snapshot`."""
+
+    entry = _render_card_entries(db, [report])[report.id]
+    return entry.model_dump(mode="json")
+
+
+class ReportModerationError(ValueError):
+    """Ошибка при смене статуса отчета модератором."""
+
+
+_MODERATION_DECISIONS = {ReportStatus.APPROVED, ReportStatus.REJECTED}
+
+
+def update_report_status(db: Session, *, report: Report, status: ReportStatus) -> Report:
+    if status not in _MODERATION_DECISIONS:
+        raise ReportModerationError("Отчет можно только одобрить или отклонить")
+    if report.status == ReportStatus.DRAFT.value:
+        raise ReportModerationError("Черновик отчета нельзя модерировать")
+
+    if report.status == ReportStatus.ON_MODERATION.value:
+        moderation_feed.record_events(db, [(report.id, "removed", {"status": status.value})])
+
+    report.status = status.value
+    if status == ReportStatus.APPROVED:
+        report.card_snapshot = render_card_snapshot(db, report)
+    else:
+        report.card_snapshot = None
+
+    db.add(report)
+    db.commit()
+    db.refresh(report)
+    return report
+
+
+def bulk_update_report_status(
+    db: Session,
+    *,
+    report_ids: Iterable[str],
+    status: ReportStatus,
+) -> list[BulkModerationResult]:
+    """Модерирует пачку отчетов в одной транзакции и возвращает результат по каждому id."""
+
+    if status not in _MODERATION_DECISIONS:
+        raise ReportModerationError("Отчет можно только одобрить или отклонить")
+
+    ids = list(dict.fromkeys(report_ids))
+    current_statuses = dict(db.query(Report.id, Report.status).filter(Report.id.in_(ids)).all())
+
+    results: list[BulkModerationResult] = []
+    to_update: list[str] = []
+    for report_id in ids:
+        current_status = current_statuses.get(report_id)
+        if current_status is None:
+            results.append(BulkModerationResult(id=report_id, success=False, error="Отчет не найден"))
+        elif current_status == ReportStatus.DRAFT.value:
+            results.append(
+                BulkModerationResult(
+                    id=report_id,
+                    success=False,
+                    status=current_status,
+                    error="Черновик отчета нельзя модерировать",
+                )
+            )
+        else:
+            to_update.append(report_id)
+            results.append(BulkModerationResult(id=report_id, success=True, status=status.value))
+
+    if not to_update:
+        return results
+
+    moderation_feed.record_events(
+        db,
+        [
+            (report_id, "removed", {"status": status.value})
+            for report_id in to_update
+            if current_statuses[report_id] == ReportStatus.ON_MODERATION.value
+        ],
+    )
+
+    if status == ReportStatus.APPROVED:
+        reports = (
+            db.query(Report)
+            .options(selectinload(Report.photos))
+            .filter(Report.id.in_(to_update))
+            .all()
+        )
+        entries = _render_card_entries(db, reports)
+        db.execute(
+            update(Report),
+            [
+                {
+                    "id": report_id,
+                    "status": status.value,
+                    "card_snapshot": entries[report_id].model_dump(mode="json"),
+                }
+                for report_id in to_update
+            ],
+        )
+    else:
+        db.execute(
+            update(Report)
+            .where(Report.id.in_(to_update))
+            .values(status=status.value, card_snapshot=None)
+        )
+
+    db.commit()
+    return results
+
+
+def bulk_update_application_status(
+    db: Session,
+    *,
+    application_ids: Iterable[int],
+    status: ProgramApplicationStatus,
+    reviewer_comment: str | None = None,
+) -> list[BulkModerationResult]:
+    """Меняет статус пачки заявок одним UPDATE; принятых кандидатов повышает в той же транзакции."""
+
+    ids = list(dict.fromkeys(application_ids))
+    owners = dict(
+        db.query(ProgramApplication.id, ProgramApplication.user_id)
+        .filter(ProgramApplication.id.in_(ids))
+        .all()
+    )
+
+    results: list[BulkModerationResult] = []
+    for application_id in ids:
+        if application_id in owners:
+            results.append(BulkModerationResult(id=application_id, success=True, status=status.value))
+        else:
+            results.append(BulkModerationResult(id=application_id, success=False, error="Заявка не найдена"))
+
+    if not owners:
+        return results
+
+    db.execute(
+        update(ProgramApplication)
+        .where(ProgramApplication.id.in_(owners.keys()))
+        .values(status=status, reviewer_comment=reviewer_comment, lease_owner_id=None, lease_expires_at=None)
+    )
+    if status == ProgramApplicationStatus.accepted:
+        application_service.promote_applicants(db, owners.values())
+    application_service.refresh_eligibility(db, owners.values())
+
+    db.commit()
+    return results
+
+
+def backfill_card_snapshots(db: Session, *, batch_size: int = 200, force: bool = False) -> int:
+    """Заполняет карточки для уже одобренных отчетов. Возвращает число обновленных."""
+
+    query = (
+        db.query(Report)
+        .options(selectinload(Report.photos))
+        .filter(Report.status == ReportStatus.APPROVED.value)
+        .order_by(Report.id.asc())
+    )
+    if not force:
+        query = query.filter(Report.card_snapshot.is_(None))
+
+    updated = 0
+    last_id: str | None = None
+    while True:
+        batch_query = query if last_id is None else query.filter(Report.id > last_id)
+        reports = batch_query.limit(batch_size).all()
+        if not reports:
+            break
+
+        entries = _render_card_entries(db, reports)
+        for report in reports:
+            report.card_snapshot = entries[report.id].model_dump(mode="json")
+            db.add(report)
+        db.commit()
+
+        updated += len(reports)
+        last_id = reports[-1].id
+    return updated
+
+
 def get_hotel_card_reports(
     db: Session,
     *,
@@ -269,8 +494,7 @@ def get_hotel_card_reports(
         raise ValueError("Hotel not found")
 
     query = (
-        db.query(Report)
-        .options(joinedload(Report.photos), joinedload(Report.user))
+        db.query(Report.id, Report.overall_score, Report.card_snapshot)
         .filter(
             Report.hotel_id == hotel_id,
             Report.status == ReportStatus.APPROVED.value,
@@ -280,57 +504,32 @@ def get_hotel_card_reports(
     if limit:
         query = query.limit(limit)
 
-    reports = query.all()
-    user_ids = {report.user_id for report in reports if report.user_id is not None}
-    applications = _gather_user_applications(db, user_ids)
+    rows = query.all()
+
+    # Отчеты, одобренные до появления снапшотов, рендерим на лету до запуска backfill
+    missing_ids = [row.id for row in rows if not row.card_snapshot]
+    rendered: dict[str, HotelCardReportEntry] = {}
+    if missing_ids:
+        missing_reports = (
+            db.query(Report)
+            .options(selectinload(Report.photos))
+            .filter(Report.id.in_(missing_ids))
+            .all()
+        )
+        rendered = _render_card_entries(db, missing_reports)
 
-    scores = [report.overall_score for report in reports if report.overall_score is not None]
+    scores = [row.overall_score for row in rows if row.overall_score is not None]
     average_score = round(sum(scores) / len(scores), 1) if scores else None
 
-    items: list[HotelCardReportEntry] = []
-    for report in reports:
-        answers = report.answers or {}
-        step1_data = answers.get("step1") if isinstance(answers, dict) else None
-        step2_data = answers.get("step2") if isinstance(answers, dict) else None
-        step6_data = answers.get("step6") if isinstance(answers, dict) else None
-
-        step1 = None
-        if step1_data:
-            try:
-                step1 = ReportStep1Payload.model_validate(step1_data)
-            except Exception:  # noqa: BLE001
-                step1 = None
-        step2 = None
-        if step2_data:
-            try:
-                step2 = ReportStep2Payload.model_validate(step2_data)
-            except Exception:  # noqa: BLE001
-                step2 = None
-        step6 = None
-        if step6_data:
-            try:
-                step6 = ReportStep6Payload.model_validate(step6_data)
-            except Exception:  # noqa: BLE001
-                step6 = None
-
-        photos = sorted(report.photos, key=lambda photo: photo.id)
-        application = applications.get(report.user_id) if report.user_id else None
-
-        items.append(
-            _serialize_card_entry(
-                report,
-                step1,
-                step2,
-                step6,
-                photos,
-                application,
-            )
-        )
-
     return HotelCardReportList(
         hotel_id=hotel.id,
         hotel_name=hotel.name,
-        total_reports=len(reports),
+        total_reports=len(rows),
         average_score=average_score,
-        items=items,
+        items=[row.card_snapshot or rendered[row.id] for row in rows],
     )
+
+
+@job_service.register_job("backfill_card_snapshots", manual=True)
+def _backfill_card_snapshots_job(db: Session, payload: dict) -> None:
+    backfill_card_snapshots(db, force=bool(payload.get("force")))
@@ -0,0 +1,345 @@
+"""Аналитика качества отелей по одобренным отчетам.
+
+Ответы одобренных отчетов раскладываются в колонки (`array` фиксированного
+типа): оценки 1–10 и коды значений перечислений. Агрегаты считаются проходом
+по колонкам, перцентили оценок — по гистограмме из десяти корзин. Хранилище
+колонок живет в процессе и догружает только отчеты, изменившиеся после
+последнего обновления (по `Report.updated_at`).
+"""
+
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.hotel import Hotel
+from app.models.report import Report
+from app.schemas.admin import QualityAnalyticsGroup, QualityMonthlyPoint, ScoreSummary
+from app.schemas.report import AcState, FoodMatch, ReportStatus, WaitTime, WifiQuality
+
+SCORE_FIELDS: dict[str, tuple[str, ...]] = {
+    "step1": ("room_cleanliness", "bathroom_sanitation", "linen_freshness", "public_area_cleanliness"),
+    "step2": ("politeness", "response_speed", "food_quality"),
+}
+
+ENUM_FIELDS: dict[str, type[Enum]] = {
+    "wifi_quality": WifiQuality,
+    "wait_time": WaitTime,
+    "food_match": FoodMatch,
+    "ac_state": AcState,
+}
+
+PERCENTILES = (25, 50, 75, 90)
+REFRESH_INTERVAL_SECONDS = 60.0
+_LOAD_BATCH_SIZE = 1000
+_MISSING = -1
+
+
+def _month_code(value: datetime | None) -> int:
+    if value is None:
+        return _MISSING
+    return value.year * 12 + value.month - 1
+
+
+def _month_label(code: int) -> str:
+    return f"{code // 12:04d}-{code % 12 + 1:02d}"
+
+
+class ReportColumns:
+    """Колоночное представление одобренных отчетов с поддержкой догрузки изменений."""
+
+    def __init__(self) -> None:
+        self.positions: dict[str, int] = {}
+        self.alive = array("b")
+        self.hotel_id = array("l")
+        self.city_code = array("l")
+        self.month = array("l")
+        self.overall = array("d")
+        self.scores: dict[str, array] = {
+            field: array("b") for fields in SCORE_FIELDS.values() for field in fields
+        }
+        self.enums: dict[str, array] = {field: array("b") for field in ENUM_FIELDS}
+        self.cities: list[str] = []
+        self.city_codes: dict[str, int] = {}
+        self._enum_codes = {
+            field: {member.value: code for code, member in enumerate(enum_type)}
+            for field, enum_type in ENUM_FIELDS.items()
+        }
+        self.watermark: datetime | None = None
+        self.version = 0
+
+    def _city(self, city: str) -> int:
+        code = self.city_codes.get(city)
+        if code is None:
+            code = len(self.cities)
+            self.cities.append(city)
+            self.city_codes[city] = code
+        return code
+
+    def _append_empty(self) -> int:
+        position = len(self.alive)
+        self.alive.append(0)
+        self.hotel_id.append(0)
+        self.city_code.append(0)
+        self.month.append(_MISSING)
+        self.overall.append(float("nan"))
+        for column in self.scores.values():
+            column.append(_MISSING)
+        for column in self.enums.values():
+            column.append(_MISSING)
+        return position
+
+    def _snapshot(self, position: int) -> tuple:
+        overall = self.overall[position]
+        return (
+            self.alive[position],
+            self.hotel_id[position],
+            self.city_code[position],
+            self.month[position],
+            None if overall != overall else overall,
+            tuple(column[position] for column in self.scores.values()),
+            tuple(column[position] for column in self.enums.values()),
+        )
+
+    def upsert(self, report_id: str, hotel_id: int, city: str, checkout: datetime | None,
+               overall: float | None, answers: dict[str, Any]) -> bool:
+        """Записывает отчет в колонки. Возвращает True, если сохраненные значения изменились."""
+
+        position = self.positions.get(report_id)
+        if position is None:
+            position = self._append_empty()
+            self.positions[report_id] = position
+        before = self._snapshot(position)
+
+        self.alive[position] = 1
+        self.hotel_id[position] = hotel_id
+        self.city_code[position] = self._city(city)
+        self.month[position] = _month_code(checkout)
+        self.overall[position] = float("nan") if overall is None else float(overall)
+
+        for step, fields in SCORE_FIELDS.items():
+            step_data = answers.get(step) if isinstance(answers, dict) else None
+            step_data = step_data if isinstance(step_data, dict) else {}
+            for field in fields:
+                value = step_data.get(field)
+                self.scores[field][position] = value if isinstance(value, int) and 1 <= value <= 10 else _MISSING
+
+        step2 = answers.get("step2") if isinstance(answers, dict) else None
+        step2 = step2 if isinstance(step2, dict) else {}
+        for field, codes in self._enum_codes.items():
+            self.enums[field][position] = codes.get(step2.get(field), _MISSING)
+        return self._snapshot(position) != before
+
+    def remove(self, report_id: str) -> bool:
+        position = self.positions.get(report_id)
+        if position is None or not self.alive[position]:
+            return False
+        self.alive[position] = 0
+        return True
+
+    def refresh(self, db: Session) -> bool:
+        """Догружает отчеты, измененные после прошлого обновления. Возвращает True при изменениях."""
+
+        stmt = (
+            select(
+                Report.id,
+                Report.hotel_id,
+                Hotel.city,
+                Report.checkout_date,
+                Report.overall_score,
+                Report.status,
+                Report.answers,
+                Report.updated_at,
+            )
+            .join(Hotel, Hotel.id == Report.hotel_id)
+            .order_by(Report.updated_at.asc())
+            .execution_options(yield_per=_LOAD_BATCH_SIZE)
+        )
+        if self.watermark is None:
+            stmt = stmt.where(Report.status == ReportStatus.APPROVED.value)
+        else:
+            # >=, а не >: отчеты с тем же updated_at могли закоммититься после прошлой загрузки
+            if db.get_bind().dialect.name == "sqlite":
+                # SQLite хранит время строкой, func.now() — без микросекунд: сравниваем в одном формате
+                stmt = stmt.where(func.datetime(Report.updated_at) >= func.datetime(self.watermark))
+            else:
+                stmt = stmt.where(Report.updated_at >= self.watermark)
+
+        changed = False
+        for row in db.execute(stmt):
+            # Граничные отчеты с updated_at == watermark читаются повторно и версию не меняют
+            if row.status == ReportStatus.APPROVED.value:
+                changed |= self.upsert(
+                    row.id, row.hotel_id, row.city, row.checkout_date, row.overall_score, row.answers or {}
+                )
+            else:
+                changed |= self.remove(row.id)
+            if self.watermark is None or row.updated_at > self.watermark:
+                self.watermark = row.updated_at
+
+        if changed:
+            self.version += 1
+        return changed
+
+
+def _histogram_summary(column: array, indices: list[int]) -> ScoreSummary:
+    histogram = [0] * 11
+    for index in indices:
+        value = column[index]
+        if value != _MISSING:
+            histogram[value] += 1
+    total = sum(histogram)
+    if not total:
+        return ScoreSummary()
+
+    mean = sum(score * count for score, count in enumerate(histogram)) / total
+    percentiles: dict[str, float] = {}
+    targets = iter((p, max(1, -(-p * total // 100))) for p in PERCENTILES)
+    percentile, rank = next(targets)
+    cumulative = 0
+    for score, count in enumerate(histogram):
+        cumulative += count
+        while rank is not None and cumulative >= rank:
+            percentiles[f"p{percentile}"] = float(score)
+            percentile, rank = next(targets, (None, None))
+    return ScoreSummary(mean=round(mean, 2), **percentiles)
+
+
+def _float_summary(column: array, indices: list[int]) -> ScoreSummary:
+    values = sorted(column[index] for index in indices if column[index] == column[index])
+    if not values:
+        return ScoreSummary()
+    percentiles = {
+        f"p{p}": round(values[max(1, -(-p * len(values) // 100)) - 1], 2) for p in PERCENTILES
+    }
+    return ScoreSummary(mean=round(sum(values) / len(values), 2), **percentiles)
+
+
+class HotelQualityAnalytics:
+    """Кэш колонок и посчитанных групп; пересчет только при изменении данных."""
+
+    def __init__(self) -> None:
+        self._columns = ReportColumns()
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._results: dict[tuple, list[QualityAnalyticsGroup]] = {}
+        self._results_version = -1
+
+    def _ensure_fresh(self, db: Session, *, force: bool = False) -> None:
+        if not force and time.monotonic() - self._refreshed_at < REFRESH_INTERVAL_SECONDS:
+            return
+        self._columns.refresh(db)
+        self._refreshed_at = time.monotonic()
+
+    def groups(
+        self,
+        db: Session,
+        *,
+        group_by: str,
+        hotel_id: int | None = None,
+        city: str | None = None,
+        force_refresh: bool = False,
+    ) -> list[QualityAnalyticsGroup]:
+        with self._lock:
+            self._ensure_fresh(db, force=force_refresh)
+            columns = self._columns
+            if self._results_version != columns.version:
+                self._results.clear()
+                self._results_version = columns.version
+
+            key = (group_by, hotel_id, city)
+            cached = self._results.get(key)
+            if cached is None:
+                cached = self._compute(group_by=group_by, hotel_id=hotel_id, city=city)
+                self._results[key] = cached
+            return cached
+
+    def _compute(self, *, group_by: str, hotel_id: int | None, city: str | None) -> list[QualityAnalyticsGroup]:
+        columns = self._columns
+        city_code = columns.city_codes.get(city) if city is not None else None
+        if city is not None and city_code is None:
+            return []
+
+        buckets: dict[int, list[int]] = defaultdict(list)
+        key_column = columns.hotel_id if group_by == "hotel" else columns.city_code
+        for index, alive in enumerate(columns.alive):
+            if not alive:
+                continue
+            if hotel_id is not None and columns.hotel_id[index] != hotel_id:
+                continue
+            if city_code is not None and columns.city_code[index] != city_code:
+                continue
+            buckets[key_column[index]].append(index)
+
+        groups: list[QualityAnalyticsGroup] = []
+        for key, indices in buckets.items():
+            scores = {field: _histogram_summary(column, indices) for field, column in columns.scores.items()}
+            scores["overall"] = _float_summary(columns.overall, indices)
+
+            distributions: dict[str, dict[str, int]] = {}
+            for field, enum_type in ENUM_FIELDS.items():
+                members = list(enum_type)
+                counts = [0] * len(members)
+                column = columns.enums[field]
+                for index in indices:
+                    code = column[index]
+                    if code != _MISSING:
+                        counts[code] += 1
+                distributions[field] = {member.value: count for member, count in zip(members, counts)}
+
+            monthly: dict[int, list[float]] = defaultdict(list)
+            for index in indices:
+                month = columns.month[index]
+                if month != _MISSING:
+                    monthly[month].append(columns.overall[index])
+            trend = []
+            for month in sorted(monthly):
+                values = [value for value in monthly[month] if value == value]
+                trend.append(
+                    QualityMonthlyPoint(
+                        month=_month_label(month),
+                        reports_count=len(monthly[month]),
+                        overall_mean=round(sum(values) / len(values), 2) if values else None,
+                    )
+                )
+
+            first = indices[0]
+            groups.append(
+                QualityAnalyticsGroup(
+                    hotel_id=key if group_by == "hotel" else None,
+                    city=columns.cities[columns.city_code[first]],
+                    reports_count=len(indices),
+                    scores=scores,
+                    distributions=distributions,
+                    monthly=trend,
+                )
+            )
+
+        groups.sort(key=lambda group: (-group.reports_count, group.city, group.hotel_id or 0))
+        return groups
+
+
+hotel_quality_analytics = HotelQualityAnalytics()
+
+
+def get_quality_analytics(
+    db: Session,
+    *,
+    group_by: str = "hotel",
+    hotel_id: int | None = None,
+    city: str | None = None,
+    force_refresh: bool = False,
+) -> list[QualityAnalyticsGroup]:
+    return hotel_quality_analytics.groups(
+        db,
+        group_by=group_by,
+        hotel_id=hotel_id,
+        city=city,
+        force_refresh=force_refresh,
+    )
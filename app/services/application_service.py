@@ -1,23 +1,22 @@
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 import datetime
 from pathlib import Path
+from typing import Literal
 from uuid import uuid4
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, joinedload
 
 from app.core.config import settings
 from app.models.program_application import ProgramApplication, ProgramApplicationStatus
 from app.models.user import User
-
+from app.schemas.scoring import RescoreDiffRow, RescoreReport
+from app.services import eligibility_service, job_service, scoring_rules_service
+from app.services.scoring_rules_service import CompiledRuleSet
 from app.services.upload_utils import IncomingUpload
 
-RAW_SCORE_RULES: dict[str, dict[str, int]] = {
-    "q4": {"a": -1, "b": 1, "c": 0},
-    "q5": {"a": -1, "b": 1, "c": 0},
-    "q6": {"a": 0, "b": 1, "c": -1},
-    "q7": {"a": 0, "b": 1, "c": -1},
-    "q8": {"a": 1, "b": -1, "c": 0},
-}
+# Встроенные правила; действующие хранятся версиями в scoring_rule_sets
+RAW_SCORE_RULES = scoring_rules_service.DEFAULT_RAW_SCORE_RULES
 
 RAW_SCORE_MIN = -4
 RAW_SCORE_MAX = 5
@@ -36,20 +35,13 @@ ACTIVE_STATUSES = {
 }
 
 ACTIVE_APPLICATION_TTL_DAYS = 90
+RESCORE_CHUNK_SIZE = 1000
 
 _ACCEPTED_USER_ROLE = "accepted"
 
 
-def _calculate_raw_score(answers: dict[str, str]) -> int:
-    score = 0
-    for question, mapping in RAW_SCORE_RULES.items():
-        answer = answers.get(question)
-        if answer is None:
-            raise ValueError(f"Отсутствует ответ на вопрос {question}")
-        if answer not in mapping:
-            raise ValueError(f"Недопустимый ответ '{answer}' для вопроса {question}")
-        score += mapping[answer]
-    return score
+def _calculate_raw_score(answers: dict[str, str], rule_set: CompiledRuleSet | None = None) -> int:
+    return (rule_set or scoring_rules_service.DEFAULT_RULE_SET).raw_score(answers)
 
 
 def _calculate_user_bonus(user: User | None) -> int:
@@ -87,33 +79,146 @@ def normalize_score(raw_score: int) -> int:
     return max(0, min(normalized, NORMALIZED_SCORE_MAX))
 
 
-def determine_status_by_score(score: int) -> ProgramApplicationStatus:
-    if score <= 4:
-        return ProgramApplicationStatus.rejected
-    if score <= 8:
-        return ProgramApplicationStatus.in_review
-    return ProgramApplicationStatus.accepted
+def determine_status_by_score(score: int, rule_set: CompiledRuleSet | None = None) -> ProgramApplicationStatus:
+    return (rule_set or scoring_rules_service.DEFAULT_RULE_SET).status_for(score)
 
 
-def calculate_application_score(application: ProgramApplication) -> int:
-    raw_score = _calculate_raw_score(application.answers)
+def calculate_score_breakdown(
+    application: ProgramApplication,
+    rule_set: CompiledRuleSet | None = None,
+) -> tuple[int, int]:
+    """Возвращает (баллы анкеты, бонус пользователя)."""
+
+    raw_score = _calculate_raw_score(application.answers, rule_set)
     user_bonus = _calculate_user_bonus(getattr(application, "user", None))
+    return raw_score, user_bonus
+
+
+def calculate_application_score(application: ProgramApplication) -> int:
+    raw_score, user_bonus = calculate_score_breakdown(application)
     return raw_score + user_bonus
 
 
-def _promote_applicant(db: Session, application: ProgramApplication) -> None:
-    if not application.user_id:
-        return
+def apply_application_score(application: ProgramApplication, rule_set: CompiledRuleSet) -> int:
+    """Считает баллы заявки по правилам и сохраняет их в колонки. Возвращает итоговый балл."""
 
-    user: User | None = db.get(User, application.user_id)
-    if user is None:
-        return
+    raw_score, user_bonus = calculate_score_breakdown(application, rule_set)
+    application.raw_score = raw_score
+    application.user_bonus = user_bonus
+    application.total_score = raw_score + user_bonus
+    application.scoring_rule_set_id = rule_set.id
+    return application.total_score
 
-    if user.role in ("admin", _ACCEPTED_USER_ROLE):
+
+def backfill_application_scores(db: Session, *, batch_size: int = 500, force: bool = False) -> int:
+    """Заполняет баллы отправленных заявок. Возвращает число обновленных."""
+
+    query = (
+        db.query(ProgramApplication)
+        .options(joinedload(ProgramApplication.user))
+        .filter(ProgramApplication.status != ProgramApplicationStatus.draft)
+        .order_by(ProgramApplication.id.asc())
+    )
+    if not force:
+        query = query.filter(ProgramApplication.total_score.is_(None))
+
+    rule_set = scoring_rules_service.get_active_rule_set(db)
+    updated = 0
+    last_id = 0
+    while True:
+        applications = query.filter(ProgramApplication.id > last_id).limit(batch_size).all()
+        if not applications:
+            break
+        for application in applications:
+            try:
+                apply_application_score(application, rule_set)
+            except ValueError:
+                # Анкета без полного набора ответов остается без баллов
+                continue
+            updated += 1
+        db.commit()
+        last_id = applications[-1].id
+    return updated
+
+
+def rescore_applications(
+    db: Session,
+    *,
+    rule_set: CompiledRuleSet,
+    chunk_size: int = RESCORE_CHUNK_SIZE,
+) -> RescoreReport:
+    """Пересчитывает отправленные заявки по правилам, ничего не меняя в БД.
+
+    Возвращает заявки, статус которых изменился бы. Бонус пользователя берется
+    сохраненный при отправке, для старых заявок без него — считается заново.
+    """
+
+    report = RescoreReport(rule_set_id=rule_set.id or 0, rule_set_version=rule_set.version or 0)
+    stmt = (
+        select(
+            ProgramApplication.id,
+            ProgramApplication.user_id,
+            ProgramApplication.status,
+            ProgramApplication.answers,
+            ProgramApplication.user_bonus,
+            ProgramApplication.total_score,
+        )
+        .where(ProgramApplication.status != ProgramApplicationStatus.draft)
+        .order_by(ProgramApplication.id.asc())
+        .execution_options(yield_per=chunk_size)
+    )
+    for chunk in db.execute(stmt).partitions():
+        missing_bonus = {row.user_id for row in chunk if row.user_bonus is None and row.user_id}
+        bonuses: dict[int, int] = {}
+        if missing_bonus:
+            users = db.scalars(select(User).where(User.id.in_(missing_bonus)))
+            bonuses = {user.id: _calculate_user_bonus(user) for user in users}
+
+        raw_scores, invalid = rule_set.raw_scores([row.answers for row in chunk])
+        for row, raw_score, is_invalid in zip(chunk, raw_scores, invalid):
+            if is_invalid:
+                report.skipped += 1
+                continue
+            report.evaluated += 1
+            user_bonus = row.user_bonus if row.user_bonus is not None else bonuses.get(row.user_id, 0)
+            new_score = raw_score + user_bonus
+            new_status = rule_set.status_for(new_score)
+            if new_status != row.status:
+                report.changed.append(
+                    RescoreDiffRow(
+                        application_id=row.id,
+                        user_id=row.user_id,
+                        old_score=row.total_score,
+                        new_score=new_score,
+                        old_status=row.status,
+                        new_status=new_status,
+                    )
+                )
+    return report
+
+
+def promote_applicants(db: Session, user_ids: Iterable[int | None]) -> None:
+    """Одним UPDATE переводит кандидатов в accepted; администраторов не трогает."""
+
+    clean_ids = {user_id for user_id in user_ids if user_id}
+    if not clean_ids:
         return
 
-    user.role = _ACCEPTED_USER_ROLE
-    db.add(user)
+    db.execute(
+        update(User)
+        .where(User.id.in_(clean_ids), User.role.notin_(("admin", _ACCEPTED_USER_ROLE)))
+        .values(role=_ACCEPTED_USER_ROLE)
+    )
+
+
+@job_service.register_job("backfill_application_scores", manual=True)
+def _backfill_application_scores_job(db: Session, payload: dict) -> None:
+    backfill_application_scores(db)
+
+
+@job_service.register_job("refresh_eligibility", manual=True)
+def _refresh_eligibility_job(db: Session, payload: dict) -> None:
+    refresh_all_eligibility(db)
 
 
 def create_application(
@@ -136,19 +241,67 @@ def create_application(
         user_id=user_id,
     )
     db.add(application)
+    refresh_eligibility(db, [user_id])
     db.commit()
     db.refresh(application)
     return application
 
 
+def filter_applications_query(
+    query,
+    *,
+    status: ProgramApplicationStatus | None = None,
+    min_score: int | None = None,
+    max_score: int | None = None,
+    sort_by: Literal["created_at", "score"] = "created_at",
+    descending: bool = True,
+    limit: int | None = None,
+    offset: int = 0,
+):
+    """Фильтрация, сортировка и пагинация заявок по сохраненным баллам на стороне БД."""
+
+    if status is not None:
+        query = query.filter(ProgramApplication.status == status)
+    if min_score is not None:
+        query = query.filter(ProgramApplication.total_score >= min_score)
+    if max_score is not None:
+        query = query.filter(ProgramApplication.total_score <= max_score)
+
+    if sort_by == "score":
+        score = ProgramApplication.total_score.desc() if descending else ProgramApplication.total_score.asc()
+        query = query.order_by(score.nullslast(), ProgramApplication.id.desc())
+    else:
+        created = ProgramApplication.created_at.desc() if descending else ProgramApplication.created_at.asc()
+        query = query.order_by(created, ProgramApplication.id.desc())
+
+    if offset:
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
 def list_applications(
     db: Session,
     *,
     status: ProgramApplicationStatus | None = None,
+    min_score: int | None = None,
+    max_score: int | None = None,
+    sort_by: Literal["created_at", "score"] = "created_at",
+    descending: bool = True,
+    limit: int | None = None,
+    offset: int = 0,
 ) -> Sequence[ProgramApplication]:
-    query = db.query(ProgramApplication).order_by(ProgramApplication.created_at.desc())
-    if status is not None:
-        query = query.filter(ProgramApplication.status == status)
+    query = filter_applications_query(
+        db.query(ProgramApplication),
+        status=status,
+        min_score=min_score,
+        max_score=max_score,
+        sort_by=sort_by,
+        descending=descending,
+        limit=limit,
+        offset=offset,
+    )
     return query.all()
 
 
@@ -166,7 +319,7 @@ def get_active_application_by_user(db: Session, user_id: int) -> ProgramApplicat
         db.query(ProgramApplication)
         .filter(
             ProgramApplication.user_id == user_id,
-            ProgramApplication.status == ACTIVE_STATUSES,
+            ProgramApplication.status.in_(ACTIVE_STATUSES),
             ProgramApplication.created_at >= freshness_threshold,
         )
         .order_by(ProgramApplication.created_at.desc())
@@ -183,7 +336,12 @@ def update_application_status(
 ) -> ProgramApplication:
     application.status = status
     application.reviewer_comment = reviewer_comment
+    application.lease_owner_id = None
+    application.lease_expires_at = None
+    if status == ProgramApplicationStatus.accepted:
+        promote_applicants(db, [application.user_id])
     db.add(application)
+    refresh_eligibility(db, [application.user_id])
     db.commit()
     db.refresh(application)
     return application
@@ -213,16 +371,17 @@ def submit_application(
     *,
     application: ProgramApplication,
 ) -> ProgramApplication:
-    total_score = calculate_application_score(application)
-    target_status = determine_status_by_score(total_score)
+    rule_set = scoring_rules_service.get_active_rule_set(db)
+    total_score = apply_application_score(application, rule_set)
+    target_status = rule_set.status_for(total_score)
 
-    if total_score <= 4:
+    if target_status == ProgramApplicationStatus.rejected:
         reviewer_comment = (
             "На данном этапе мы ищем участников с большим вниманием к деталям в отзывах. "
             "Вы можете подать новую заявку через 3 месяца. А пока вы можете помочь другим "
             "путешественникам, оставляя обычные отзывы после своих поездок!"
         )
-    elif total_score <= 8:
+    elif target_status == ProgramApplicationStatus.in_review:
         reviewer_comment = "Спасибо за обращение, рассмотрим вашу заявку в течении 3 дней!"
     else:
         reviewer_comment = (
@@ -231,12 +390,12 @@ def submit_application(
 
     application.reviewer_comment = reviewer_comment
     application.status = target_status
-    application.score = total_score
 
     if target_status == ProgramApplicationStatus.accepted:
-        _promote_applicant(db, application)
+        promote_applicants(db, [application.user_id])
 
     db.add(application)
+    refresh_eligibility(db, [application.user_id])
     db.commit()
     db.refresh(application)
     return application
@@ -267,25 +426,52 @@ def store_application_photos(
     return stored_paths
 
 
-def is_user_eligible(user: User, db: Session) -> tuple[bool, str | None]:
-    active_application = get_active_application_by_user(db, user.id)
-    if active_application:
-        return False, "дождаться завершения текущей заявки/участия"
+def refresh_eligibility(db: Session, user_ids: Iterable[int | None]) -> None:
+    """Обновляет срок активной заявки и допуск пользователей в текущей транзакции."""
 
-    if not user.email_verified or not user.phone_verified:
-        return False, "подтвердить телефон и e-mail"
+    clean_ids = {user_id for user_id in user_ids if user_id}
+    if not clean_ids:
+        return
 
-    if user.completed_bookings_last_year < 4:
-        return False, "иметь не менее 4 завершённых бронирований с отзывами за 12 месяцев"
+    # Сессии создаются с autoflush=False: изменения заявок должны попасть в запрос ниже
+    db.flush()
+    latest_active = dict(
+        db.execute(
+            select(ProgramApplication.user_id, func.max(ProgramApplication.created_at))
+            .where(
+                ProgramApplication.user_id.in_(clean_ids),
+                ProgramApplication.status.in_(ACTIVE_STATUSES),
+            )
+            .group_by(ProgramApplication.user_id)
+        ).all()
+    )
+    ttl = datetime.timedelta(days=ACTIVE_APPLICATION_TTL_DAYS)
+    for user in db.scalars(select(User).where(User.id.in_(clean_ids))):
+        created_at = latest_active.get(user.id)
+        user.active_application_until = created_at + ttl if created_at is not None else None
+        eligibility_service.update_user_eligibility(user)
 
-    if not user.date_of_birth:
-        return False, "достичь 21 года"
 
-    today = datetime.date.today()
-    age = today.year - user.date_of_birth.year - (
-        (today.month, today.day) < (user.date_of_birth.month, user.date_of_birth.day)
-    )
-    if age < 21:
-        return False, "достичь 21 года"
+def refresh_all_eligibility(db: Session, *, batch_size: int = 500) -> int:
+    """Пересчитывает допуск всех пользователей. Возвращает число обработанных."""
+
+    processed = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            db.scalars(select(User.id).where(User.id > last_id).order_by(User.id.asc()).limit(batch_size))
+        )
+        if not user_ids:
+            break
+        refresh_eligibility(db, user_ids)
+        db.commit()
+        processed += len(user_ids)
+        last_id = user_ids[-1]
+    return processed
 
-    return True, None
+
+def is_user_eligible(user: User, db: Session) -> tuple[bool, str | None]:
+    if not eligibility_service.eligibility_computed(user):
+        refresh_eligibility(db, [user.id])
+        db.commit()
+    return eligibility_service.is_eligible(user)
@@ -0,0 +1,456 @@
+"""Пакетное распределение принятых гостей по слотам программы.
+
+Вместо того чтобы гости разбирали слоты по одному, задача `propose_assignments`
+раскладывает всех принятых гостей без текущей проверки по свободным местам
+так, чтобы суммарная стоимость была минимальной, и сохраняет результат как
+предложения для администратора.
+
+Стоимость пары «гость — слот» складывается из порядка города в списке гостя,
+лишней вместимости номера, отклонения рейтинга отеля от уровня гостя и цены
+отеля. Город, вместимость и рейтинг совпадают у всех слотов одной корзины
+(город, рейтинг, вместимость), поэтому матрица стоимостей не строится:
+стоимость — это стоимость корзины для профиля гостя плюс стоимость слота.
+Гость видит только корзины своих городов, подходящие по вместимости и
+полосе рейтинга, — это и есть разреженная структура задачи.
+
+Задача о назначениях решается аукционом с ε-масштабированием: места слотов —
+лоты с ценами, гость перебивает цену лучшего для себя места на разницу со
+вторым вариантом. Внутри корзины слоты лежат в куче по «стоимость + цена
+дешевейшего места», так что ставка стоит O(число корзин профиля · log).
+Отказ от назначения стоит `unassigned_penalty` и оформлен личным лотом гостя,
+а каждое место может занять его фантом — задача становится симметричной, и
+цены грубых фаз корректно переносятся в точные. Итог ε-оптимален.
+"""
+
+import heapq
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, exists, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.assignment_proposal import AssignmentProposal
+from app.models.hotel import Hotel
+from app.models.program_hotel import ProgramHotel
+from app.models.report import Report
+from app.models.user import User
+from app.services import job_service, program_hotel_service, reservation_service
+
+ACCEPTED_ROLE = "accepted"
+FREE = -1
+INF = float("inf")
+
+
+class AssignmentError(ValueError):
+    """Ошибка применения предложения распределения."""
+
+
+@dataclass(frozen=True, slots=True)
+class AssignmentWeights:
+    city_order: float = 1.0
+    spare_capacity: float = 0.5
+    rating_fit: float = 1.0
+    cost: float = 1.0
+    cost_scale: float = 5000.0
+    unassigned_penalty: float = 100.0
+    epsilon: float = 0.01
+
+
+@dataclass(frozen=True, slots=True)
+class GuestDemand:
+    user_id: int
+    cities: tuple[str, ...]
+    guests: int
+    rating: float
+
+
+@dataclass(frozen=True, slots=True)
+class SlotSupply:
+    program_hotel_id: int
+    city: str
+    rating: int
+    capacity: int
+    cost: int
+    seats: int
+
+
+@dataclass
+class AssignmentResult:
+    assignments: list[tuple[int, int, float]] = field(default_factory=list)
+    unassigned: list[int] = field(default_factory=list)
+    total_cost: float = 0.0
+    bids: int = 0
+    phases: int = 0
+    elapsed: float = 0.0
+
+
+def _profile_buckets(
+    guest: GuestDemand,
+    buckets_by_city: dict[str | None, list[tuple[int, int, int]]],
+    weights: AssignmentWeights,
+) -> list[tuple[float, int]]:
+    """Корзины, доступные профилю гостя, с их стоимостью, по возрастанию стоимости."""
+
+    max_rating = program_hotel_service.max_hotel_rating_for(guest.rating)
+    target_rating = min(max(guest.rating, 0.0), 10.0) / 2
+    # Без городов гостю подходит любой город, как и в подборе отелей
+    city_options = list(enumerate(dict.fromkeys(guest.cities))) if guest.cities else [(0, None)]
+
+    options = []
+    for city_rank, city in city_options:
+        for bucket, rating, capacity in buckets_by_city.get(city, ()):
+            if capacity < guest.guests or (max_rating is not None and rating > max_rating):
+                continue
+            options.append(
+                (
+                    city_rank * weights.city_order
+                    + (capacity - guest.guests) * weights.spare_capacity
+                    + abs(rating - target_rating) * weights.rating_fit,
+                    bucket,
+                )
+            )
+    options.sort()
+    return options
+
+
+def solve_assignment(
+    guests: list[GuestDemand],
+    slots: list[SlotSupply],
+    weights: AssignmentWeights | None = None,
+) -> AssignmentResult:
+    weights = weights or AssignmentWeights()
+    started = time.perf_counter()
+    result = AssignmentResult()
+    if not guests:
+        return result
+
+    # --- корзины слотов: по городу и общие для гостей без городов ---
+    bucket_ids: dict[tuple[str | None, int, int], int] = {}
+    slot_buckets: list[tuple[int, int]] = []
+    for slot in slots:
+        pair = []
+        for city in (slot.city, None):
+            key = (city, slot.rating, slot.capacity)
+            pair.append(bucket_ids.setdefault(key, len(bucket_ids)))
+        slot_buckets.append(tuple(pair))
+    buckets_by_city: dict[str | None, list[tuple[int, int, int]]] = defaultdict(list)
+    for (city, rating, capacity), bucket in bucket_ids.items():
+        buckets_by_city[city].append((bucket, rating, capacity))
+
+    slot_cost = [weights.cost * max(slot.cost, 0) / weights.cost_scale for slot in slots]
+    profiles: dict[tuple, list[tuple[float, int]]] = {}
+    guest_options = []
+    for guest in guests:
+        key = (tuple(dict.fromkeys(guest.cities)), guest.guests, guest.rating)
+        if key not in profiles:
+            profiles[key] = _profile_buckets(guest, buckets_by_city, weights)
+        guest_options.append(profiles[key])
+
+    # --- аукцион ---
+    # Задача дополняется до симметричной: у каждого гостя есть личный лот
+    # «без слота» стоимостью unassigned_penalty, а у каждого места — фантом,
+    # который даром занимает свое место или любой лот «без слота». В конце
+    # каждой фазы заняты все лоты, поэтому цены переносятся между фазами
+    # без потери оптимальности. Владелец: гость (>= 0), FREE или фантом (<= -2).
+    seat_prices = [[(0.0, FREE)] * max(slot.seats, 0) for slot in slots]
+    phantom_slot = [index for index, slot in enumerate(slots) for _ in range(max(slot.seats, 0))]
+    slot_key = list(slot_cost)
+    bucket_heaps: list[list[tuple[float, int]]] = [[] for _ in bucket_ids]
+    for index, pair in enumerate(slot_buckets):
+        if slots[index].seats <= 0:
+            continue
+        for bucket in pair:
+            bucket_heaps[bucket].append((slot_key[index], index))
+    for heap in bucket_heaps:
+        heapq.heapify(heap)
+
+    unassigned_cost = weights.unassigned_penalty
+    dummy_price = [0.0] * len(guests)
+    dummy_owner = [FREE] * len(guests)
+    dummy_heap = [(0.0, guest) for guest in range(len(guests))]
+    assigned_slot = [-1] * len(guests)
+    # Стоимость текущего выбора участника с ценой его лота — для проверки ε-условия
+    guest_value = [INF] * len(guests)
+    phantom_value = [INF] * len(phantom_slot)
+    phantom_dummy = [-1] * len(phantom_slot)
+
+    def top(bucket: int) -> tuple[float, int] | None:
+        heap = bucket_heaps[bucket]
+        while heap and heap[0][0] != slot_key[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def second(bucket: int) -> float:
+        heap = bucket_heaps[bucket]
+        first = heapq.heappop(heap)
+        following = top(bucket)
+        heapq.heappush(heap, first)
+        return following[0] if following is not None else INF
+
+    def top_dummy() -> tuple[float, int]:
+        while dummy_heap[0][0] != dummy_price[dummy_heap[0][1]]:
+            heapq.heappop(dummy_heap)
+        return dummy_heap[0]
+
+    def second_dummy() -> float:
+        first = heapq.heappop(dummy_heap)
+        following = top_dummy() if dummy_heap else None
+        heapq.heappush(dummy_heap, first)
+        return following[0] if following is not None else INF
+
+    def second_seat(seats: list[tuple[float, int]]) -> float:
+        if len(seats) < 2:
+            return INF
+        return seats[1][0] if len(seats) == 2 else min(seats[1][0], seats[2][0])
+
+    def take_seat(slot_index: int, price: float, bidder: int, queue: list[int]) -> None:
+        seats = seat_prices[slot_index]
+        _, owner = heapq.heapreplace(seats, (price, bidder))
+        if owner != FREE:
+            queue.append(owner)
+        slot_key[slot_index] = slot_cost[slot_index] + seats[0][0]
+        for bucket in slot_buckets[slot_index]:
+            heapq.heappush(bucket_heaps[bucket], (slot_key[slot_index], slot_index))
+
+    def take_dummy(guest: int, price: float, bidder: int, queue: list[int]) -> None:
+        if dummy_owner[guest] != FREE:
+            queue.append(dummy_owner[guest])
+        dummy_owner[guest] = bidder
+        dummy_price[guest] = price
+        heapq.heappush(dummy_heap, (price, guest))
+
+    def guest_bid(guest: int, epsilon: float, queue: list[int]) -> None:
+        best = unassigned_cost + dummy_price[guest]
+        best_slot = -1
+        best_bucket_cost = 0.0
+        best_in_bucket = -1
+        runner_up = INF
+        for bucket_cost, bucket in guest_options[guest]:
+            if bucket_cost >= runner_up:
+                break
+            entry = top(bucket)
+            if entry is None:
+                continue
+            value = bucket_cost + entry[0]
+            if value < best:
+                runner_up = best
+                best, best_slot, best_bucket_cost = value, entry[1], bucket_cost
+                best_in_bucket = bucket
+            elif value < runner_up:
+                runner_up = value
+
+        if best_slot < 0:
+            # Свой лот «без слота» нужен только самому гостю и фантомам
+            if runner_up == INF:
+                runner_up = best
+            assigned_slot[guest] = -1
+            guest_value[guest] = runner_up + epsilon
+            take_dummy(guest, dummy_price[guest] + runner_up - best + epsilon, guest, queue)
+            return
+
+        runner_up = min(
+            runner_up,
+            best_bucket_cost + second(best_in_bucket),
+            best_bucket_cost + slot_cost[best_slot] + second_seat(seat_prices[best_slot]),
+        )
+        assigned_slot[guest] = best_slot
+        guest_value[guest] = runner_up + epsilon
+        take_seat(best_slot, seat_prices[best_slot][0][0] + runner_up - best + epsilon, guest, queue)
+
+    def phantom_bid(phantom: int, epsilon: float, queue: list[int]) -> None:
+        slot_index = phantom_slot[phantom]
+        bidder = -2 - phantom
+        seats = seat_prices[slot_index]
+        seat_value = seats[0][0]
+        dummy_value, dummy = top_dummy()
+        if seat_value <= dummy_value:
+            runner_up = min(second_seat(seats), dummy_value)
+            phantom_value[phantom] = runner_up + epsilon
+            take_seat(slot_index, runner_up + epsilon, bidder, queue)
+        else:
+            runner_up = min(second_dummy(), seat_value)
+            phantom_value[phantom] = runner_up + epsilon
+            phantom_dummy[phantom] = dummy
+            take_dummy(dummy, runner_up + epsilon, bidder, queue)
+
+    def guest_best(guest: int) -> float:
+        best = unassigned_cost + dummy_price[guest]
+        for bucket_cost, bucket in guest_options[guest]:
+            if bucket_cost >= best:
+                break
+            entry = top(bucket)
+            if entry is not None:
+                best = min(best, bucket_cost + entry[0])
+        return best
+
+    def release(slot_index: int, owner: int) -> None:
+        # Лот остается со своей ценой: к концу фазы его все равно кто-то займет
+        if slot_index < 0:
+            dummy_owner[owner] = FREE
+            return
+        seat_prices[slot_index] = [
+            (price, FREE if holder == owner else holder) for price, holder in seat_prices[slot_index]
+        ]
+
+    def violators(epsilon: float) -> list[int]:
+        """Освобождает лоты участников, чей выбор хуже лучшего больше чем на ε."""
+
+        queue = []
+        for phantom, slot_index in enumerate(phantom_slot):
+            best = min(seat_prices[slot_index][0][0], top_dummy()[0])
+            if best < phantom_value[phantom] - epsilon:
+                bidder = -2 - phantom
+                if phantom_dummy[phantom] >= 0 and dummy_owner[phantom_dummy[phantom]] == bidder:
+                    release(-1, phantom_dummy[phantom])
+                else:
+                    release(slot_index, bidder)
+                queue.append(bidder)
+        for guest in range(len(guests) - 1, -1, -1):
+            if guest_best(guest) < guest_value[guest] - epsilon:
+                release(assigned_slot[guest], guest)
+                queue.append(guest)
+        return queue
+
+    # ε-масштабирование: грубые фазы быстро поднимают цены спорных мест,
+    # точные только уточняют их. В новой фазе торгуются лишь участники,
+    # нарушившие ε-условие для меньшего ε, остальные сохраняют лоты.
+    epsilon = max(unassigned_cost / 10, weights.epsilon)
+    # Гости торгуются первыми: фантомы лишь занимают оставшееся
+    queue = [-2 - phantom for phantom in range(len(phantom_slot))]
+    queue.extend(range(len(guests) - 1, -1, -1))
+    while True:
+        result.phases += 1
+        while queue:
+            bidder = queue.pop()
+            result.bids += 1
+            if bidder >= 0:
+                guest_bid(bidder, epsilon, queue)
+            else:
+                phantom_bid(-2 - bidder, epsilon, queue)
+        if epsilon <= weights.epsilon:
+            break
+        epsilon = max(epsilon / 5, weights.epsilon)
+        queue = violators(epsilon)
+
+    # --- итог: стоимость пары без цен аукциона ---
+    for guest_index, slot_index in enumerate(assigned_slot):
+        guest = guests[guest_index]
+        if slot_index < 0:
+            result.unassigned.append(guest.user_id)
+            continue
+        city_bucket, global_bucket = slot_buckets[slot_index]
+        bucket_cost = next(
+            cost for cost, bucket in guest_options[guest_index] if bucket in (city_bucket, global_bucket)
+        )
+        pair_cost = bucket_cost + slot_cost[slot_index]
+        result.assignments.append((guest.user_id, slots[slot_index].program_hotel_id, pair_cost))
+        result.total_cost += pair_cost
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def load_demand(db: Session) -> list[GuestDemand]:
+    """Принятые активные гости без черновика отчета — то есть без текущей проверки."""
+
+    has_draft = exists().where(Report.user_id == User.id, Report.status == "draft")
+    rows = db.execute(
+        select(User.id, User.cities, User.guests, User.rating)
+        .where(User.role == ACCEPTED_ROLE, User.is_active.is_(True), ~has_draft)
+        .order_by(User.id)
+    )
+    return [
+        GuestDemand(user_id=user_id, cities=tuple(cities or ()), guests=guests or 1, rating=float(rating or 0))
+        for user_id, cities, guests, rating in rows
+    ]
+
+
+def load_supply(db: Session) -> list[SlotSupply]:
+    """Свободные места опубликованных слотов с будущим заездом."""
+
+    rows = db.execute(
+        select(
+            ProgramHotel.id,
+            Hotel.city,
+            Hotel.rating,
+            Hotel.guests,
+            Hotel.cost,
+            ProgramHotel.slots_available,
+        )
+        .join(Hotel, Hotel.id == ProgramHotel.hotel_id)
+        .where(
+            ProgramHotel.slots_available > 0,
+            ProgramHotel.is_published.is_(True),
+            ProgramHotel.check_in_date >= datetime.now(timezone.utc),
+        )
+        .order_by(ProgramHotel.id)
+    )
+    return [
+        SlotSupply(program_hotel_id=slot_id, city=city, rating=rating, capacity=capacity, cost=cost, seats=seats)
+        for slot_id, city, rating, capacity, cost, seats in rows
+    ]
+
+
+def propose_assignments(db: Session, *, weights: AssignmentWeights | None = None) -> tuple[str, AssignmentResult]:
+    """Считает распределение и заменяет им непримененные предложения. Возвращает (batch_id, итог)."""
+
+    result = solve_assignment(load_demand(db), load_supply(db), weights)
+    batch_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+    db.execute(delete(AssignmentProposal).where(AssignmentProposal.status == "proposed"))
+    if result.assignments:
+        db.execute(
+            insert(AssignmentProposal),
+            [
+                {
+                    "batch_id": batch_id,
+                    "user_id": user_id,
+                    "program_hotel_id": program_hotel_id,
+                    "cost": round(cost, 4),
+                    "status": "proposed",
+                }
+                for user_id, program_hotel_id, cost in result.assignments
+            ],
+        )
+    db.commit()
+    return batch_id, result
+
+
+@job_service.register_job("propose_assignments", manual=True)
+def _propose_assignments_job(db: Session, payload: dict) -> None:
+    propose_assignments(db)
+
+
+def list_proposals(db: Session, *, status: str | None = "proposed", limit: int = 100, offset: int = 0):
+    stmt = select(AssignmentProposal).order_by(AssignmentProposal.id)
+    if status is not None:
+        stmt = stmt.where(AssignmentProposal.status == status)
+    return db.scalars(stmt.limit(limit).offset(offset)).all()
+
+
+def get_proposal(db: Session, proposal_id: int) -> AssignmentProposal | None:
+    return db.get(AssignmentProposal, proposal_id)
+
+
+def apply_proposal(db: Session, proposal: AssignmentProposal) -> Report:
+    """Бронирует предложенный слот за гостем: черновик отчета создается как при обычной брони.
+
+    Бронь и отметка `applied` коммитятся вместе. Гость, успевший после расчета
+    забронировать другой слот, предложение не получает.
+    """
+
+    if proposal.status != "proposed":
+        raise AssignmentError("Предложение уже обработано")
+    user = db.get(User, proposal.user_id)
+    if user is None:
+        raise AssignmentError("Гость не найден")
+    has_draft = db.scalar(
+        select(Report.id).where(Report.user_id == user.id, Report.status == "draft").limit(1)
+    )
+    if has_draft is not None:
+        raise AssignmentError("У гостя уже есть активная проверка")
+
+    report = reservation_service.stage_reservation(db, program_hotel_id=proposal.program_hotel_id, user=user)
+    proposal.status = "applied"
+    return reservation_service.commit_reservation(db, report)
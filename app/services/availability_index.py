@@ -0,0 +1,371 @@
+"""Индекс открытых слотов программы в памяти процесса.
+
+Отели с открытыми слотами разложены по корзинам (город, рейтинг) и внутри
+корзины упорядочены по самому свежему слоту, поэтому подбор для гостя —
+слияние нескольких готовых списков без обращения к БД. Источник истины —
+БД: индекс сверяет версию таблиц (число слотов, сумму свободных мест и
+максимальный `updated_at`) не чаще `availability_refresh_seconds` и догружает
+изменившиеся строки.
+Коммиты этого процесса, затронувшие слоты или отели, помечают индекс
+устаревшим сразу.
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.hotel import Hotel
+from app.models.program_hotel import ProgramHotel
+
+HOTEL_RATINGS = range(0, 6)
+_DIRTY_KEY = "availability_index_dirty"
+_ALL_CITIES = None
+_WATERMARK_MARGIN = timedelta(seconds=1)
+
+
+@dataclass(frozen=True, slots=True)
+class HotelSnapshot:
+    id: int
+    name: str
+    city: str
+    address: str
+    rating: int
+    cost: int
+    guests: int
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class SlotSnapshot:
+    id: int
+    hotel_id: int
+    check_in_date: datetime
+    check_out_date: datetime
+    slots_available: int
+    is_published: bool
+    created_at: datetime
+
+
+def _timestamp(value: datetime | None) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _slot_order(slot: SlotSnapshot) -> tuple[float, int]:
+    return -_timestamp(slot.created_at), -slot.id
+
+
+class AvailabilityIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Счетчик изменений инвентаря, закоммиченных этим процессом; переживает перестройку
+        self._generation = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._hotels: dict[int, HotelSnapshot] = {}
+        self._slots: dict[int, SlotSnapshot] = {}
+        self._open_slots: dict[int, list[SlotSnapshot]] = {}
+        # (город или None для всех городов, рейтинг) -> [(-время свежего слота, hotel_id)]
+        self._buckets: dict[tuple[str | None, int], list[tuple[float, int]]] = {}
+        self._bucket_keys: dict[int, tuple[str, int, tuple[float, int]]] = {}
+        # Куча (время заезда, slot_id) открытых слотов: прошедшие заезды выбывают из подбора
+        self._check_ins: list[tuple[float, int]] = []
+        self._version: tuple[Any, ...] | None = None
+        self._slot_watermark: datetime | None = None
+        self._hotel_watermark: datetime | None = None
+        self._checked_at = 0.0
+        self._stale = True
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._stale = True
+
+    def inventory_version(self, db: Session) -> tuple[Any, ...]:
+        """Версия инвентаря слотов: меняется при любом изменении слотов или отелей программы."""
+
+        with self._lock:
+            self.refresh(db)
+            return self._generation, self._version
+
+    # --- поддержка корзин ---
+
+    def _unlink(self, hotel_id: int) -> None:
+        entry = self._bucket_keys.pop(hotel_id, None)
+        if entry is None:
+            return
+        city, rating, key = entry
+        for bucket_key in ((city, rating), (_ALL_CITIES, rating)):
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                continue
+            position = bisect_left(bucket, key)
+            if position < len(bucket) and bucket[position] == key:
+                bucket.pop(position)
+
+    def _relink(self, hotel_id: int) -> None:
+        self._unlink(hotel_id)
+        hotel = self._hotels.get(hotel_id)
+        open_slots = self._open_slots.get(hotel_id)
+        if hotel is None or not open_slots:
+            return
+        key = (-max(_timestamp(slot.created_at) for slot in open_slots), hotel_id)
+        for bucket_key in ((hotel.city, hotel.rating), (_ALL_CITIES, hotel.rating)):
+            insort(self._buckets.setdefault(bucket_key, []), key)
+        self._bucket_keys[hotel_id] = (hotel.city, hotel.rating, key)
+
+    def _put_slot(self, slot: SlotSnapshot) -> set[int]:
+        touched = {slot.hotel_id}
+        previous = self._slots.get(slot.id)
+        if previous is not None:
+            touched.add(previous.hotel_id)
+            siblings = self._open_slots.get(previous.hotel_id)
+            if siblings is not None:
+                self._open_slots[previous.hotel_id] = [item for item in siblings if item.id != slot.id]
+        self._slots[slot.id] = slot
+        check_in = _timestamp(slot.check_in_date)
+        if slot.slots_available > 0 and slot.is_published and check_in >= time.time():
+            siblings = self._open_slots.setdefault(slot.hotel_id, [])
+            siblings.append(slot)
+            siblings.sort(key=_slot_order)
+            heapq.heappush(self._check_ins, (check_in, slot.id))
+            if len(self._check_ins) > 2 * len(self._slots) + 64:
+                # Устаревшие записи кучи удаляются лениво; при разрастании пересобираем ее
+                self._check_ins = [
+                    (_timestamp(item.check_in_date), item.id)
+                    for items in self._open_slots.values()
+                    for item in items
+                ]
+                heapq.heapify(self._check_ins)
+        return touched
+
+    def _expire(self, now: float) -> None:
+        touched: set[int] = set()
+        while self._check_ins and self._check_ins[0][0] < now:
+            _, slot_id = heapq.heappop(self._check_ins)
+            slot = self._slots.get(slot_id)
+            siblings = self._open_slots.get(slot.hotel_id) if slot is not None else None
+            if not siblings or _timestamp(slot.check_in_date) >= now:
+                continue
+            self._open_slots[slot.hotel_id] = [item for item in siblings if item.id != slot_id]
+            touched.add(slot.hotel_id)
+        for hotel_id in touched:
+            self._relink(hotel_id)
+
+    # --- синхронизация с БД ---
+
+    @staticmethod
+    def _read_version(db: Session) -> tuple[Any, ...]:
+        return tuple(
+            db.execute(
+                select(
+                    select(func.count(ProgramHotel.id)).scalar_subquery(),
+                    select(func.max(ProgramHotel.updated_at)).scalar_subquery(),
+                    select(func.sum(ProgramHotel.slots_available)).scalar_subquery(),
+                    select(func.max(Hotel.updated_at)).scalar_subquery(),
+                )
+            ).one()
+        )
+
+    def _load_hotels(self, db: Session, stmt) -> None:
+        for hotel in db.execute(stmt).scalars():
+            self._hotels[hotel.id] = HotelSnapshot(
+                id=hotel.id,
+                name=hotel.name,
+                city=hotel.city,
+                address=hotel.address,
+                rating=hotel.rating,
+                cost=hotel.cost,
+                guests=hotel.guests,
+                is_active=hotel.is_active,
+                created_at=hotel.created_at,
+                updated_at=hotel.updated_at,
+            )
+            if self._hotel_watermark is None or hotel.updated_at > self._hotel_watermark:
+                self._hotel_watermark = hotel.updated_at
+
+    def _rebuild(self, db: Session) -> None:
+        self._reset()
+        self._stale = False
+        self._apply_slots(db, select(ProgramHotel))
+
+    def _apply_slots(self, db: Session, stmt) -> None:
+        touched: set[int] = set()
+        for row in db.execute(stmt).scalars():
+            touched |= self._put_slot(
+                SlotSnapshot(
+                    id=row.id,
+                    hotel_id=row.hotel_id,
+                    check_in_date=row.check_in_date,
+                    check_out_date=row.check_out_date,
+                    slots_available=row.slots_available,
+                    is_published=row.is_published,
+                    created_at=row.created_at,
+                )
+            )
+            if self._slot_watermark is None or row.updated_at > self._slot_watermark:
+                self._slot_watermark = row.updated_at
+
+        missing = [hotel_id for hotel_id in touched if hotel_id not in self._hotels]
+        if missing:
+            self._load_hotels(db, select(Hotel).where(Hotel.id.in_(missing)))
+        for hotel_id in touched:
+            self._relink(hotel_id)
+
+    def refresh(self, db: Session, *, force: bool = False) -> None:
+        invalidated = force or self._stale
+        if not invalidated and time.monotonic() - self._checked_at < settings.availability_refresh_seconds:
+            return
+        self._stale = False
+        self._checked_at = time.monotonic()
+
+        version = self._read_version(db)
+        # updated_at может не различать изменения в пределах секунды, поэтому после
+        # своих коммитов догружаем изменения даже при совпавшей версии
+        if version == self._version and not invalidated:
+            return
+        if self._version is None:
+            self._rebuild(db)
+        else:
+            # Запас в секунду: строки с тем же updated_at могли закоммититься после прошлой
+            # загрузки, а SQLite хранит CURRENT_TIMESTAMP без долей секунды
+            self._apply_slots(
+                db, select(ProgramHotel).where(ProgramHotel.updated_at >= self._slot_watermark - _WATERMARK_MARGIN)
+            )
+            if self._hotel_watermark is not None:
+                known = list(self._hotels)
+                self._load_hotels(
+                    db,
+                    select(Hotel).where(
+                        Hotel.updated_at >= self._hotel_watermark - _WATERMARK_MARGIN, Hotel.id.in_(known)
+                    ),
+                )
+                for hotel_id in known:
+                    self._relink(hotel_id)
+            if len(self._slots) != version[0]:
+                # Слоты удалялись: догрузка изменений удаления не видит
+                self._rebuild(db)
+        self._version = version
+
+    # --- подбор ---
+
+    def match(
+        self,
+        db: Session,
+        *,
+        cities: list[str] | None,
+        guests_count: int,
+        max_rating: int | None,
+        rating_descending: bool,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """Отели с открытыми слотами в порядке выдачи и их даты, как в SQL-подборе.
+
+        Открытый слот — опубликованный, со свободными местами и еще не наступившей датой заезда.
+        """
+
+        with self._lock:
+            self.refresh(db)
+            self._expire(time.time())
+
+            ratings = [rating for rating in HOTEL_RATINGS if max_rating is None or rating <= max_rating]
+            if rating_descending:
+                ratings.reverse()
+            city_keys = list(dict.fromkeys(cities)) if cities else [_ALL_CITIES]
+
+            result: list[dict] = []
+            for rating in ratings:
+                buckets = [self._buckets.get((city, rating), []) for city in city_keys]
+                for _, hotel_id in heapq.merge(*buckets):
+                    hotel = self._hotels[hotel_id]
+                    # Как и в SQL-подборе, вместимость проверяется только вместе с фильтром городов
+                    if cities and hotel.guests < guests_count:
+                        continue
+                    result.append(
+                        {
+                            "hotel": hotel,
+                            "available_dates": [
+                                {
+                                    "check_in_date": slot.check_in_date,
+                                    "check_out_date": slot.check_out_date,
+                                    "slots_available": slot.slots_available,
+                                }
+                                for slot in self._open_slots[hotel_id]
+                            ],
+                        }
+                    )
+                    if limit is not None and len(result) >= limit:
+                        return result
+            return result
+
+
+    def available_hotel_ids(
+        self,
+        db: Session,
+        *,
+        hotel_ids: list[int],
+        cities: list[str] | None,
+        guests_count: int,
+        max_rating: int | None,
+    ) -> set[int]:
+        """Отели из `hotel_ids`, у которых есть открытый слот, подходящий гостю."""
+
+        with self._lock:
+            self.refresh(db)
+            self._expire(time.time())
+
+            city_filter = set(cities) if cities else None
+            available = set()
+            for hotel_id in hotel_ids:
+                hotel = self._hotels.get(hotel_id)
+                if hotel is None or not self._open_slots.get(hotel_id):
+                    continue
+                if city_filter is not None and (hotel.city not in city_filter or hotel.guests < guests_count):
+                    continue
+                if max_rating is not None and hotel.rating > max_rating:
+                    continue
+                available.add(hotel_id)
+            return available
+
+
+availability_index = AvailabilityIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context) -> None:
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, (ProgramHotel, Hotel)):
+            session.info[_DIRTY_KEY] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statements(orm_execute_state) -> None:
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in (ProgramHotel, Hotel):
+            orm_execute_state.session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        availability_index.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_dirty(session: Session, previous_transaction) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,87 @@
+"""Кэш собранного дашборда гостя с версией для условных запросов.
+
+Дашборд зависит от последнего отчета гостя, его профиля подбора и инвентаря
+слотов. Запись хранится по пользователю вместе с версией — кортежем, который
+собирает `user_service` из этих источников, — и отдается, пока версия
+совпадает и не истек `dashboard_cache_seconds`. ETag записи — хэш
+содержимого, поэтому пересчет с тем же результатом не сбрасывает ответы 304.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.schemas.user import UserDashboard
+
+
+@dataclass(frozen=True, slots=True)
+class CachedDashboard:
+    version: tuple[Hashable, ...]
+    stored_at: float
+    etag: str
+    dashboard: UserDashboard
+
+
+def _content_etag(dashboard: UserDashboard) -> str:
+    digest = hashlib.blake2b(dashboard.model_dump_json().encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+class DashboardCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, CachedDashboard] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, user_id: int, version: tuple[Any, ...]) -> CachedDashboard | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            fresh = (
+                entry is not None
+                and entry.version == version
+                and time.monotonic() - entry.stored_at < settings.dashboard_cache_seconds
+            )
+            if not fresh:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry
+
+    def _store(self, user_id: int, entry: CachedDashboard) -> None:
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.dashboard_cache_size:
+                self._entries.popitem(last=False)
+
+    def get_or_build(
+        self,
+        user_id: int,
+        version: tuple[Hashable, ...],
+        build: Callable[[], UserDashboard],
+    ) -> CachedDashboard:
+        cached = self._lookup(user_id, version)
+        if cached is None:
+            dashboard = build()
+            cached = CachedDashboard(
+                version=version,
+                stored_at=time.monotonic(),
+                etag=_content_etag(dashboard),
+                dashboard=dashboard,
+            )
+            self._store(user_id, cached)
+        return cached
+
+
+dashboard_cache = DashboardCache()
@@ -0,0 +1,165 @@
+"""Сохраненное состояние допуска кандидата к подаче заявки.
+
+Допуск зависит только от полей пользователя и срока его активной заявки
+(`User.active_application_until`), поэтому пересчитывается без запросов при
+любом изменении этих полей — обработчиком `before_flush`. Ограничения по
+времени (активная заявка, возраст) не требуют повторного пересчета: в
+`eligible_from` сразу пишется момент, когда они перестанут действовать.
+NULL в `eligible_from` — допуск невозможен без изменения данных пользователя.
+"""
+
+import datetime
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.schemas.admin import EligibleCandidateRow
+
+MIN_COMPLETED_BOOKINGS = 4
+MIN_AGE_YEARS = 21
+
+ELIGIBILITY_REASONS: dict[str, str] = {
+    "active_application": "дождаться завершения текущей заявки/участия",
+    "unverified_contacts": "подтвердить телефон и e-mail",
+    "not_enough_bookings": "иметь не менее 4 завершённых бронирований с отзывами за 12 месяцев",
+    "no_birth_date": "достичь 21 года",
+    "underage": "достичь 21 года",
+}
+
+# Поля пользователя, от которых зависит допуск
+ELIGIBILITY_FIELDS = (
+    "active_application_until",
+    "email_verified",
+    "phone_verified",
+    "completed_bookings_last_year",
+    "date_of_birth",
+)
+
+
+def _to_utc(value: datetime.datetime) -> datetime.datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.UTC)
+    return value.astimezone(datetime.UTC)
+
+
+def _adult_at(date_of_birth: datetime.date) -> datetime.datetime:
+    try:
+        birthday = date_of_birth.replace(year=date_of_birth.year + MIN_AGE_YEARS)
+    except ValueError:
+        # 29 февраля: совершеннолетие наступает 1 марта
+        birthday = datetime.date(date_of_birth.year + MIN_AGE_YEARS, 3, 1)
+    return datetime.datetime.combine(birthday, datetime.time.min, tzinfo=datetime.UTC)
+
+
+def evaluate_eligibility(
+    user: User, now: datetime.datetime | None = None
+) -> tuple[str | None, datetime.datetime | None]:
+    """Возвращает (код причины отказа, момент допуска).
+
+    Причина выбирается в том же порядке, в котором ее показывает анкета.
+    """
+
+    now = now or datetime.datetime.now(datetime.UTC)
+    reason: str | None = None
+    eligible_from: datetime.datetime | None = now
+    permanent = False
+
+    active_until = user.active_application_until
+    if active_until is not None and _to_utc(active_until) > now:
+        reason = "active_application"
+        eligible_from = _to_utc(active_until)
+
+    if not user.email_verified or not user.phone_verified:
+        reason = reason or "unverified_contacts"
+        permanent = True
+
+    if (user.completed_bookings_last_year or 0) < MIN_COMPLETED_BOOKINGS:
+        reason = reason or "not_enough_bookings"
+        permanent = True
+
+    if not user.date_of_birth:
+        reason = reason or "no_birth_date"
+        permanent = True
+    else:
+        adult_at = _adult_at(user.date_of_birth)
+        if adult_at > now:
+            reason = reason or "underage"
+            eligible_from = max(eligible_from, adult_at)
+
+    return reason, None if permanent else eligible_from
+
+
+def update_user_eligibility(user: User, now: datetime.datetime | None = None) -> None:
+    now = now or datetime.datetime.now(datetime.UTC)
+    reason, eligible_from = evaluate_eligibility(user, now)
+
+    previous = user.eligible_from
+    if (
+        reason is None
+        and user.eligibility_reason is None
+        and previous is not None
+        and _to_utc(previous) <= now
+    ):
+        # Уже допущенный пользователь сохраняет исходный момент допуска
+        return
+
+    user.eligibility_reason = reason
+    user.eligible_from = eligible_from
+
+
+def is_eligible(user: User, now: datetime.datetime | None = None) -> tuple[bool, str | None]:
+    now = now or datetime.datetime.now(datetime.UTC)
+    if user.eligible_from is not None and _to_utc(user.eligible_from) <= now:
+        return True, None
+    return False, ELIGIBILITY_REASONS.get(user.eligibility_reason or "", None)
+
+
+def eligibility_computed(user: User) -> bool:
+    return user.eligible_from is not None or user.eligibility_reason is not None
+
+
+@event.listens_for(Session, "before_flush")
+def _refresh_changed_users(session: Session, flush_context, instances) -> None:
+    now = datetime.datetime.now(datetime.UTC)
+    for instance in session.new:
+        if isinstance(instance, User):
+            update_user_eligibility(instance, now)
+    for instance in session.dirty:
+        if not isinstance(instance, User):
+            continue
+        state = inspect(instance)
+        if any(state.attrs[field].history.has_changes() for field in ELIGIBILITY_FIELDS):
+            update_user_eligibility(instance, now)
+
+
+def list_eligible_candidates(
+    db: Session,
+    *,
+    limit: int = 100,
+    offset: int = 0,
+    as_of: datetime.datetime | None = None,
+) -> list[EligibleCandidateRow]:
+    """Кандидаты, допущенные к подаче заявки на момент `as_of`, одним запросом по индексу."""
+
+    as_of = as_of or datetime.datetime.now(datetime.UTC)
+    stmt = (
+        select(User.id, User.first_name, User.last_name, User.email, User.eligible_from)
+        .where(
+            User.role == "candidate",
+            User.is_active.is_(True),
+            User.eligible_from <= as_of,
+        )
+        .order_by(User.eligible_from.asc(), User.id.asc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return [
+        EligibleCandidateRow(
+            user_id=row.id,
+            full_name=" ".join(part for part in (row.first_name, row.last_name) if part).strip() or row.email,
+            email=row.email,
+            eligible_from=row.eligible_from,
+        )
+        for row in db.execute(stmt)
+    ]
@@ -0,0 +1,306 @@
+"""Потоковая выгрузка данных для аналитиков в CSV или Parquet.
+
+Строки читаются серверным курсором (`yield_per`) и сразу пишутся в выходной
+поток: CSV — порциями строк, Parquet — row group'ами. В памяти одновременно
+находится не больше одной порции, поэтому размер выгрузки не ограничен
+памятью процесса. Для Parquet нужен необязательный пакет `pyarrow`.
+"""
+
+import csv
+import io
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.program_application import ProgramApplication
+from app.models.report import Photo, Report
+from app.schemas.application import ApplicationAnswers
+from app.schemas.report import ReportStep1Payload, ReportStep2Payload, ReportStep6Payload
+
+EXPORT_FORMATS = ("csv", "parquet")
+CHUNK_ROWS = 5000
+
+
+class ExportError(ValueError):
+    """Ошибка при подготовке выгрузки."""
+
+
+@dataclass(frozen=True, slots=True)
+class ExportColumn:
+    name: str
+    kind: str  # str | int | float | bool | datetime
+
+
+@dataclass(frozen=True, slots=True)
+class ExportDataset:
+    columns: tuple[ExportColumn, ...]
+    rows: Callable[[Session], Iterator[tuple]]
+
+
+def _step_columns(step: str, model) -> list[ExportColumn]:
+    columns = []
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if annotation is int:
+            kind = "int"
+        elif annotation is bool:
+            kind = "bool"
+        else:
+            kind = "str"
+        columns.append(ExportColumn(f"{step}_{name}", kind))
+    return columns
+
+
+_REPORT_STEPS = (
+    ("step1", ReportStep1Payload),
+    ("step2", ReportStep2Payload),
+    ("step6", ReportStep6Payload),
+)
+
+_REPORT_COLUMNS = (
+    ExportColumn("id", "str"),
+    ExportColumn("user_id", "int"),
+    ExportColumn("hotel_id", "int"),
+    ExportColumn("status", "str"),
+    ExportColumn("checkout_date", "datetime"),
+    ExportColumn("submitted_at", "datetime"),
+    ExportColumn("created_at", "datetime"),
+    ExportColumn("updated_at", "datetime"),
+    ExportColumn("overall_score", "float"),
+    *(column for step, model in _REPORT_STEPS for column in _step_columns(step, model)),
+)
+
+
+def _report_rows(db: Session) -> Iterator[tuple]:
+    stmt = (
+        select(
+            Report.id,
+            Report.user_id,
+            Report.hotel_id,
+            Report.status,
+            Report.checkout_date,
+            Report.submitted_at,
+            Report.created_at,
+            Report.updated_at,
+            Report.overall_score,
+            Report.answers,
+        )
+        .order_by(Report.created_at.asc())
+        .execution_options(yield_per=CHUNK_ROWS)
+    )
+    for row in db.execute(stmt):
+        answers = row.answers if isinstance(row.answers, dict) else {}
+        flattened: list[Any] = []
+        for step, model in _REPORT_STEPS:
+            step_data = answers.get(step)
+            step_data = step_data if isinstance(step_data, dict) else {}
+            flattened.extend(step_data.get(name) for name in model.model_fields)
+        yield (*row[:-1], *flattened)
+
+
+_PHOTO_COLUMNS = (
+    ExportColumn("id", "int"),
+    ExportColumn("report_id", "str"),
+    ExportColumn("section", "str"),
+    ExportColumn("filename", "str"),
+    ExportColumn("path", "str"),
+    ExportColumn("mime", "str"),
+    ExportColumn("size", "int"),
+    ExportColumn("created_at", "datetime"),
+)
+
+
+def _photo_rows(db: Session) -> Iterator[tuple]:
+    stmt = (
+        select(
+            Photo.id,
+            Photo.report_id,
+            Photo.section,
+            Photo.filename,
+            Photo.path,
+            Photo.mime,
+            Photo.size,
+            Photo.created_at,
+        )
+        .order_by(Photo.id.asc())
+        .execution_options(yield_per=CHUNK_ROWS)
+    )
+    for row in db.execute(stmt):
+        yield tuple(row)
+
+
+_APPLICATION_QUESTIONS = tuple(ApplicationAnswers.model_fields)
+
+_APPLICATION_COLUMNS = (
+    ExportColumn("id", "int"),
+    ExportColumn("user_id", "int"),
+    ExportColumn("status", "str"),
+    ExportColumn("travel_party", "str"),
+    ExportColumn("city_home", "str"),
+    ExportColumn("city_desired", "str"),
+    *(ExportColumn(question, "str") for question in _APPLICATION_QUESTIONS),
+    ExportColumn("photos_count", "int"),
+    ExportColumn("raw_score", "int"),
+    ExportColumn("user_bonus", "int"),
+    ExportColumn("total_score", "int"),
+    ExportColumn("created_at", "datetime"),
+    ExportColumn("updated_at", "datetime"),
+)
+
+
+def _application_rows(db: Session) -> Iterator[tuple]:
+    stmt = (
+        select(ProgramApplication)
+        .order_by(ProgramApplication.id.asc())
+        .execution_options(yield_per=CHUNK_ROWS)
+    )
+    for application in db.scalars(stmt):
+        answers = application.answers if isinstance(application.answers, dict) else {}
+        yield (
+            application.id,
+            application.user_id,
+            application.status.value if application.status else None,
+            application.travel_party,
+            application.city_home,
+            application.city_desired,
+            *(answers.get(question) for question in _APPLICATION_QUESTIONS),
+            len(application.photos or []),
+            application.raw_score,
+            application.user_bonus,
+            application.total_score,
+            application.created_at,
+            application.updated_at,
+        )
+
+
+DATASETS: dict[str, ExportDataset] = {
+    "reports": ExportDataset(_REPORT_COLUMNS, _report_rows),
+    "report_photos": ExportDataset(_PHOTO_COLUMNS, _photo_rows),
+    "program_applications": ExportDataset(_APPLICATION_COLUMNS, _application_rows),
+}
+
+
+def _chunks(rows: Iterator[tuple], size: int) -> Iterator[list[tuple]]:
+    chunk: list[tuple] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None:
+        return ""
+    return value
+
+
+def _write_csv(dataset: ExportDataset, rows: Iterator[tuple]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in dataset.columns])
+    for chunk in _chunks(rows, CHUNK_ROWS):
+        writer.writerows([_csv_value(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файл только на запись, отдающий накопленные байты по требованию."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _write_parquet(dataset: ExportDataset, rows: Iterator[tuple]) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ExportError("Для выгрузки в Parquet установите пакет pyarrow") from exc
+
+    arrow_types = {
+        "str": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "datetime": pa.timestamp("us", tz="UTC"),
+    }
+    schema = pa.schema([(column.name, arrow_types[column.kind]) for column in dataset.columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in _chunks(rows, CHUNK_ROWS):
+            arrays = [
+                pa.array([row[position] for row in chunk], type=arrow_types[column.kind])
+                for position, column in enumerate(dataset.columns)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+}
+
+
+def _validate(dataset_name: str, export_format: str) -> ExportDataset:
+    dataset = DATASETS.get(dataset_name)
+    if dataset is None:
+        raise ExportError(f"Неизвестный набор данных: {dataset_name}")
+    if export_format not in _WRITERS:
+        raise ExportError(f"Неизвестный формат выгрузки: {export_format}")
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as exc:
+            raise ExportError("Для выгрузки в Parquet установите пакет pyarrow") from exc
+    return dataset
+
+
+def stream_export(dataset_name: str, export_format: str) -> Iterator[bytes]:
+    """Проверяет параметры сразу и возвращает генератор байтов выгрузки со своей сессией БД."""
+
+    dataset = _validate(dataset_name, export_format)
+    writer = _WRITERS[export_format]
+
+    def generate() -> Iterator[bytes]:
+        with SessionLocal() as db:
+            yield from writer(dataset, dataset.rows(db))
+
+    return generate()
@@ -0,0 +1,358 @@
+"""Фоновые задачи в таблице `background_jobs`.
+
+Сервис ставит задачу в той же транзакции, что и основное изменение, и сразу
+отвечает клиенту; задачу выполняет пул потоков-воркеров — внутри процесса API
+(`job_workers`) или отдельной командой `python -m app.cli worker`. Воркер
+забирает задачу условным UPDATE с арендой, поэтому несколько процессов не
+выполнят одну задачу одновременно, а задача упавшего воркера вернется в
+работу после истечения аренды. Ошибки повторяются с экспоненциальной
+задержкой до `max_attempts`. Внешний брокер не нужен, достаточно SQLite.
+"""
+
+import logging
+import random
+import threading
+import time
+import traceback
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import and_, delete, event, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.background_job import BackgroundJob
+from app.schemas.job import JobKindMetrics, JobMetrics, JobWorkerMetrics
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, dict[str, Any]], None]
+
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 5.0
+BACKOFF_MAX_SECONDS = 3600.0
+_ERROR_MAX_LENGTH = 4000
+_WAKE_KEY = "background_jobs_enqueued"
+
+
+class JobError(ValueError):
+    """Ошибка постановки фоновой задачи."""
+
+
+@dataclass(frozen=True, slots=True)
+class _Registration:
+    handler: JobHandler
+    manual: bool
+
+
+_HANDLERS: dict[str, _Registration] = {}
+
+
+def register_job(kind: str, *, manual: bool = False) -> Callable[[JobHandler], JobHandler]:
+    """Регистрирует обработчик задачи. `manual` — задачу можно поставить через API администратора."""
+
+    def decorator(handler: JobHandler) -> JobHandler:
+        _HANDLERS[kind] = _Registration(handler=handler, manual=manual)
+        return handler
+
+    return decorator
+
+
+def manual_job_kinds() -> list[str]:
+    return sorted(kind for kind, registration in _HANDLERS.items() if registration.manual)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    idempotency_key: str | None = None,
+    delay_seconds: float = 0,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> BackgroundJob:
+    """Добавляет задачу в текущую транзакцию; воркеры увидят ее после коммита.
+
+    Повторная постановка с тем же `idempotency_key` возвращает уже существующую задачу.
+    """
+
+    if kind not in _HANDLERS:
+        raise JobError(f"Неизвестный тип задачи: {kind}")
+
+    if idempotency_key is not None:
+        existing = db.scalar(select(BackgroundJob).where(BackgroundJob.idempotency_key == idempotency_key))
+        if existing is not None:
+            return existing
+
+    job = BackgroundJob(
+        kind=kind,
+        payload=payload or {},
+        status="queued",
+        idempotency_key=idempotency_key,
+        attempts=0,
+        max_attempts=max_attempts,
+        run_after=_now() + timedelta(seconds=delay_seconds),
+    )
+    try:
+        with db.begin_nested():
+            db.add(job)
+    except IntegrityError:
+        existing = db.scalar(select(BackgroundJob).where(BackgroundJob.idempotency_key == idempotency_key))
+        if existing is None:
+            raise
+        return existing
+
+    db.info[_WAKE_KEY] = True
+    return job
+
+
+_wakeup = threading.Event()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session: Session) -> None:
+    if session.info.pop(_WAKE_KEY, False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_wakeup(session: Session, previous_transaction) -> None:
+    session.info.pop(_WAKE_KEY, None)
+
+
+@dataclass(frozen=True, slots=True)
+class ClaimedJob:
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(BackgroundJob.status == "queued", BackgroundJob.run_after <= now),
+        # Аренда истекла: воркер, взявший задачу, завершился аварийно
+        and_(BackgroundJob.status == "running", BackgroundJob.locked_until < now),
+    )
+
+
+def claim_job(db: Session, *, worker_id: str) -> ClaimedJob | None:
+    now = _now()
+    candidate = (
+        select(BackgroundJob.id)
+        .where(_claimable(now))
+        .order_by(BackgroundJob.run_after.asc(), BackgroundJob.id.asc())
+        .limit(1)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        candidate = candidate.with_for_update(skip_locked=True)
+
+    row = db.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.id == candidate.scalar_subquery(), _claimable(now))
+        .values(
+            status="running",
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=settings.job_lease_seconds),
+            attempts=BackgroundJob.attempts + 1,
+            started_at=now,
+        )
+        .returning(
+            BackgroundJob.id,
+            BackgroundJob.kind,
+            BackgroundJob.payload,
+            BackgroundJob.attempts,
+            BackgroundJob.max_attempts,
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.commit()
+    if row is None:
+        return None
+    return ClaimedJob(id=row.id, kind=row.kind, payload=row.payload or {}, attempts=row.attempts, max_attempts=row.max_attempts)
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class _WorkerStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.workers = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.total_duration = 0.0
+
+    def record(self, outcome: str, duration: float) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.total_duration += duration
+
+    def snapshot(self) -> JobWorkerMetrics:
+        with self._lock:
+            finished = self.succeeded + self.retried + self.failed
+            return JobWorkerMetrics(
+                workers=self.workers,
+                succeeded=self.succeeded,
+                retried=self.retried,
+                failed=self.failed,
+                average_duration_ms=round(self.total_duration / finished * 1000, 2) if finished else None,
+            )
+
+
+worker_stats = _WorkerStats()
+
+
+def _finish(job: ClaimedJob, worker_id: str, values: dict[str, Any]) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job.id, BackgroundJob.locked_by == worker_id)
+            .values(locked_by=None, locked_until=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+
+def run_job(job: ClaimedJob, *, worker_id: str) -> str:
+    """Выполняет задачу в отдельной сессии и фиксирует результат. Возвращает итог."""
+
+    started = time.monotonic()
+    try:
+        registration = _HANDLERS.get(job.kind)
+        if registration is None:
+            raise LookupError(f"Нет обработчика для задачи {job.kind}")
+        with SessionLocal() as db:
+            registration.handler(db, job.payload)
+            db.commit()
+    except Exception as exc:  # noqa: BLE001 — ошибка задачи не должна останавливать воркер
+        logger.exception("Фоновая задача %s (%s) завершилась ошибкой", job.id, job.kind)
+        error = "".join(traceback.format_exception_only(type(exc), exc)).strip()[:_ERROR_MAX_LENGTH]
+        now = _now()
+        if job.attempts >= job.max_attempts:
+            outcome = "failed"
+            _finish(job, worker_id, {"status": "failed", "last_error": error, "finished_at": now})
+        else:
+            outcome = "retried"
+            run_after = now + timedelta(seconds=backoff_seconds(job.attempts))
+            _finish(job, worker_id, {"status": "queued", "last_error": error, "run_after": run_after})
+    else:
+        outcome = "succeeded"
+        _finish(job, worker_id, {"status": "succeeded", "last_error": None, "finished_at": _now()})
+
+    worker_stats.record(outcome, time.monotonic() - started)
+    return outcome
+
+
+def run_pending(*, worker_id: str | None = None, limit: int | None = None) -> int:
+    """Выполняет готовые задачи в текущем потоке, пока они есть. Возвращает число выполненных."""
+
+    worker_id = worker_id or f"inline-{uuid.uuid4().hex[:8]}"
+    processed = 0
+    while limit is None or processed < limit:
+        with SessionLocal() as db:
+            job = claim_job(db, worker_id=worker_id)
+        if job is None:
+            break
+        run_job(job, worker_id=worker_id)
+        processed += 1
+    return processed
+
+
+class JobWorkerPool:
+    """Пул потоков, выполняющих фоновые задачи."""
+
+    def __init__(self, concurrency: int, *, poll_seconds: float | None = None) -> None:
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.job_poll_seconds
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._prefix = uuid.uuid4().hex[:8]
+
+    def start(self) -> None:
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._loop,
+                args=(f"{self._prefix}-{index}",),
+                name=f"job-worker-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        with worker_stats._lock:
+            worker_stats.workers += len(self._threads)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        with worker_stats._lock:
+            worker_stats.workers -= len(self._threads)
+        self._threads.clear()
+
+    def _loop(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                with SessionLocal() as db:
+                    job = claim_job(db, worker_id=worker_id)
+            except Exception:  # noqa: BLE001 — например, занятая база SQLite
+                logger.exception("Не удалось получить фоновую задачу")
+                job = None
+            if job is not None:
+                run_job(job, worker_id=worker_id)
+                continue
+            if _wakeup.wait(self.poll_seconds):
+                _wakeup.clear()
+
+
+def get_job(db: Session, job_id: int) -> BackgroundJob | None:
+    return db.get(BackgroundJob, job_id)
+
+
+def job_metrics(db: Session) -> JobMetrics:
+    counts: dict[str, JobKindMetrics] = {}
+    rows = db.execute(
+        select(BackgroundJob.kind, BackgroundJob.status, func.count(BackgroundJob.id)).group_by(
+            BackgroundJob.kind, BackgroundJob.status
+        )
+    )
+    for kind, job_status, count in rows:
+        metrics = counts.setdefault(kind, JobKindMetrics(kind=kind))
+        if job_status in ("queued", "running", "succeeded", "failed"):
+            setattr(metrics, job_status, int(count))
+
+    oldest = db.execute(
+        select(BackgroundJob.kind, func.min(BackgroundJob.run_after))
+        .where(BackgroundJob.status == "queued")
+        .group_by(BackgroundJob.kind)
+    )
+    for kind, run_after in oldest:
+        counts.setdefault(kind, JobKindMetrics(kind=kind)).oldest_queued_at = run_after
+
+    return JobMetrics(kinds=sorted(counts.values(), key=lambda item: item.kind), worker=worker_stats.snapshot())
+
+
+def prune_jobs(db: Session, *, older_than: timedelta) -> int:
+    threshold = _now() - older_than
+    result = db.execute(
+        delete(BackgroundJob).where(
+            BackgroundJob.status.in_(("succeeded", "failed")),
+            BackgroundJob.finished_at < threshold,
+        )
+    )
+    db.commit()
+    return int(result.rowcount or 0)
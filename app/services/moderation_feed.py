@@ -0,0 +1,206 @@
+"""Лента изменений очереди модерации отчетов.
+
+События пишутся в `moderation_events` в той же транзакции, что и смена
+статуса отчета, и после коммита рассылаются подписчикам текущего процесса.
+Id события служит токеном возобновления (SSE `Last-Event-ID`). Если задан
+`moderation_feed_poll_seconds`, подписчики дополнительно опрашивают журнал и
+получают события, записанные другими воркерами.
+"""
+
+import asyncio
+import json
+import threading
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from fastapi import Request
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.moderation_event import ModerationEvent
+
+KEEPALIVE_SECONDS = 15.0
+SUBSCRIBER_QUEUE_SIZE = 1000
+BACKLOG_LIMIT = 1000
+
+_PENDING_KEY = "moderation_feed_pending"
+
+
+class _Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue[list[dict[str, Any]]] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, events: list[dict[str, Any]]) -> None:
+        try:
+            self.queue.put_nowait(events)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ModerationFeedBroadcaster:
+    """Рассылает события подписчикам процесса; publish безопасно вызывать из любого потока."""
+
+    def __init__(self) -> None:
+        self._subscribers: set[_Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> _Subscription:
+        subscription = _Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: _Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, events)
+            except RuntimeError:
+                # Цикл подписчика уже закрыт
+                self.unsubscribe(subscription)
+
+
+broadcaster = ModerationFeedBroadcaster()
+
+
+def _serialize_event(moderation_event: ModerationEvent) -> dict[str, Any]:
+    return {
+        "id": moderation_event.id,
+        "type": moderation_event.event_type,
+        "report_id": moderation_event.report_id,
+        "payload": moderation_event.payload or {},
+    }
+
+
+def record_events(db: Session, events: list[tuple[str, str, dict[str, Any]]]) -> None:
+    """Добавляет события (report_id, тип, payload) в текущую транзакцию.
+
+    Подписчикам они уйдут только после успешного коммита сессии.
+    """
+
+    if not events:
+        return
+    rows = [
+        ModerationEvent(report_id=report_id, event_type=event_type, payload=payload)
+        for report_id, event_type, payload in events
+    ]
+    db.add_all(rows)
+    db.flush()
+    db.info.setdefault(_PENDING_KEY, []).extend(_serialize_event(row) for row in rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        broadcaster.publish(pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def head_event_id(db: Session) -> int:
+    return int(db.scalar(select(func.max(ModerationEvent.id))) or 0)
+
+
+def load_events_since(db: Session, after_id: int, *, limit: int = BACKLOG_LIMIT) -> list[dict[str, Any]] | None:
+    """Возвращает события после `after_id` или None, если часть из них уже удалена."""
+
+    oldest_id = db.scalar(select(func.min(ModerationEvent.id)))
+    if oldest_id is not None and after_id < oldest_id - 1:
+        return None
+
+    rows = db.scalars(
+        select(ModerationEvent)
+        .where(ModerationEvent.id > after_id)
+        .order_by(ModerationEvent.id.asc())
+        .limit(limit)
+    )
+    return [_serialize_event(row) for row in rows]
+
+
+def prune_events(db: Session, *, older_than: timedelta) -> int:
+    threshold = datetime.now(timezone.utc) - older_than
+    result = db.execute(delete(ModerationEvent).where(ModerationEvent.created_at < threshold))
+    db.commit()
+    return int(result.rowcount or 0)
+
+
+def _read_head() -> int:
+    with SessionLocal() as db:
+        return head_event_id(db)
+
+
+def _read_since(after_id: int) -> list[dict[str, Any]] | None:
+    with SessionLocal() as db:
+        return load_events_since(db, after_id)
+
+
+def _format_sse(moderation_event: dict[str, Any]) -> str:
+    data = json.dumps(
+        {"report_id": moderation_event["report_id"], **moderation_event["payload"]},
+        ensure_ascii=False,
+        default=str,
+    )
+    return f"id: {moderation_event['id']}\nevent: {moderation_event['type']}\ndata: {data}\n\n"
+
+
+_RESET_MESSAGE = "event: reset\ndata: {}\n\n"
+
+
+async def stream_events(request: Request, *, after_id: int | None) -> AsyncIterator[str]:
+    """SSE-поток изменений очереди начиная с `after_id` (по умолчанию — с текущего момента)."""
+
+    subscription = broadcaster.subscribe()
+    poll_seconds = settings.moderation_feed_poll_seconds
+    timeout = min(poll_seconds, KEEPALIVE_SECONDS) if poll_seconds > 0 else KEEPALIVE_SECONDS
+    try:
+        # Подписываемся до чтения журнала, чтобы не потерять события между запросами
+        last_id = after_id if after_id is not None else await run_in_threadpool(_read_head)
+        backlog: list[dict[str, Any]] | None = []
+        if after_id is not None:
+            backlog = await run_in_threadpool(_read_since, last_id)
+
+        while True:
+            if backlog is None or subscription.overflowed:
+                # Клиент отстал сильнее, чем хранит журнал: нужно перечитать очередь целиком
+                subscription.overflowed = False
+                last_id = await run_in_threadpool(_read_head)
+                yield f"id: {last_id}\n{_RESET_MESSAGE}"
+                backlog = []
+
+            for moderation_event in backlog:
+                if moderation_event["id"] > last_id:
+                    last_id = moderation_event["id"]
+                    yield _format_sse(moderation_event)
+
+            if len(backlog) >= BACKLOG_LIMIT:
+                backlog = await run_in_threadpool(_read_since, last_id)
+                continue
+
+            if await request.is_disconnected():
+                break
+
+            try:
+                backlog = await asyncio.wait_for(subscription.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                backlog = await run_in_threadpool(_read_since, last_id) if poll_seconds > 0 else []
+                if not backlog:
+                    yield ": keepalive\n\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
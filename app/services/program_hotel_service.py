@@ -1,12 +1,14 @@
-from datetime import datetime
-from collections import OrderedDict
-from collections.abc import Sequence
+from datetime import date, datetime, time, timedelta, timezone
+from collections.abc import Iterable, Sequence
 
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session, joinedload
 
+from app.core.config import settings
 from app.models.hotel import Hotel
 from app.models.program_hotel import ProgramHotel
 from app.models.user import User
+from app.services.availability_index import availability_index
 
 
 class ProgramHotelCreationError(ValueError):
@@ -19,16 +21,14 @@ class ProgramHotelUpdateError(ValueError):
     """Ошибка при обновлении параметров отеля программы."""
 
 
-def create_program_hotel(
-    db: Session,
-    *,
-    hotel_id: int,
+def _validate_new_slot(
     check_in_date: datetime,
     check_out_date: datetime,
-    slots_total: int = 1,
-    slots_available: int | None = None,
-    is_published: bool = True,
-) -> ProgramHotel:
+    slots_total: int,
+    slots_available: int | None,
+) -> int:
+    """Проверяет параметры нового слота и возвращает число свободных мест."""
+
     if check_in_date >= check_out_date:
         raise ProgramHotelCreationError("Дата выезда должна быть позже даты заезда")
 
@@ -44,6 +44,20 @@ def create_program_hotel(
         raise ProgramHotelCreationError(
             "Доступное количество слотов не может превышать общее количество слотов"
         )
+    return slots_available
+
+
+def create_program_hotel(
+    db: Session,
+    *,
+    hotel_id: int,
+    check_in_date: datetime,
+    check_out_date: datetime,
+    slots_total: int = 1,
+    slots_available: int | None = None,
+    is_published: bool = True,
+) -> ProgramHotel:
+    slots_available = _validate_new_slot(check_in_date, check_out_date, slots_total, slots_available)
 
     program_hotel = ProgramHotel(
         hotel_id=hotel_id,
@@ -58,6 +72,95 @@ def create_program_hotel(
     db.refresh(program_hotel)
     return program_hotel
 
+MAX_SCHEDULE_SLOTS = 200_000
+_SCHEDULE_CHUNK_SIZE = 500
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def schedule_program_hotels(
+    db: Session,
+    *,
+    hotel_ids: list[int],
+    start_date: date,
+    end_date: date,
+    stay_nights: int,
+    cadence_days: int,
+    slots_per_stay: int,
+    check_in_time: time,
+    check_out_time: time,
+    is_published: bool = True,
+) -> tuple[int, int]:
+    """Создает слоты по расписанию: заезд каждые `cadence_days` дней с `start_date`,
+    выезд через `stay_nights` ночей и не позже `end_date`.
+
+    Слоты, уже существующие у отеля с теми же датами заезда и выезда, пропускаются;
+    новые вставляются одним пакетом. Возвращает (создано, пропущено).
+    """
+
+    if stay_nights <= 0 or cadence_days <= 0:
+        raise ProgramHotelCreationError("Длительность проживания и шаг расписания должны быть положительными")
+    if start_date > end_date:
+        raise ProgramHotelCreationError("Начало расписания должно быть не позже его окончания")
+
+    stays = []
+    check_in_day = start_date
+    while check_in_day + timedelta(days=stay_nights) <= end_date:
+        check_in_date = datetime.combine(check_in_day, check_in_time, tzinfo=timezone.utc)
+        check_out_date = datetime.combine(check_in_day + timedelta(days=stay_nights), check_out_time, tzinfo=timezone.utc)
+        _validate_new_slot(check_in_date, check_out_date, slots_per_stay, None)
+        stays.append((check_in_date, check_out_date))
+        check_in_day += timedelta(days=cadence_days)
+
+    unique_hotel_ids = sorted(set(hotel_ids))
+    if len(stays) * len(unique_hotel_ids) > MAX_SCHEDULE_SLOTS:
+        raise ProgramHotelCreationError(f"Расписание создает больше {MAX_SCHEDULE_SLOTS} слотов, разбейте его")
+
+    existing: set[tuple[int, datetime, datetime]] = set()
+    known_hotels: set[int] = set()
+    for offset in range(0, len(unique_hotel_ids), _SCHEDULE_CHUNK_SIZE):
+        chunk = unique_hotel_ids[offset : offset + _SCHEDULE_CHUNK_SIZE]
+        known_hotels.update(db.scalars(select(Hotel.id).where(Hotel.id.in_(chunk))))
+        if stays:
+            rows = db.execute(
+                select(ProgramHotel.hotel_id, ProgramHotel.check_in_date, ProgramHotel.check_out_date).where(
+                    ProgramHotel.hotel_id.in_(chunk),
+                    ProgramHotel.check_in_date >= stays[0][0],
+                    ProgramHotel.check_in_date <= stays[-1][0],
+                )
+            )
+            existing.update(
+                (hotel_id, _utc_naive(check_in_date), _utc_naive(check_out_date))
+                for hotel_id, check_in_date, check_out_date in rows
+            )
+
+    missing = [hotel_id for hotel_id in unique_hotel_ids if hotel_id not in known_hotels]
+    if missing:
+        raise ProgramHotelCreationError(f"Отели не найдены: {', '.join(map(str, missing))}")
+
+    new_rows = [
+        {
+            "hotel_id": hotel_id,
+            "check_in_date": check_in_date,
+            "check_out_date": check_out_date,
+            "slots_total": slots_per_stay,
+            "slots_available": slots_per_stay,
+            "is_published": is_published,
+        }
+        for hotel_id in unique_hotel_ids
+        for check_in_date, check_out_date in stays
+        if (hotel_id, _utc_naive(check_in_date), _utc_naive(check_out_date)) not in existing
+    ]
+    if new_rows:
+        db.execute(insert(ProgramHotel), new_rows)
+    db.commit()
+    return len(new_rows), len(stays) * len(unique_hotel_ids) - len(new_rows)
+
+
 def get_program_hotel(db: Session, program_hotel_id: int) -> ProgramHotel | None:
     return (
         db.query(ProgramHotel)
@@ -142,6 +245,36 @@ def _normalize_user_rating(user_rating: float) -> float:
     return min(max(float(user_rating), 0.0), 10.0)
 
 
+def _rating_descending(normalized_rating: float) -> bool:
+    return normalized_rating >= MEDIUM_USER_RATING_THRESHOLD
+
+
+def _max_hotel_rating(normalized_rating: float) -> int | None:
+    if normalized_rating >= HIGH_USER_RATING_THRESHOLD:
+        return None
+    if normalized_rating >= MEDIUM_USER_RATING_THRESHOLD:
+        return MEDIUM_HOTEL_RATING
+    return LOW_HOTEL_RATING
+
+
+def max_hotel_rating_for(user_rating: float) -> int | None:
+    """Верхняя граница рейтинга отелей, доступных гостю с таким рейтингом; None — без ограничения."""
+
+    return _max_hotel_rating(_normalize_user_rating(user_rating))
+
+
+def _stay_window(date_from: date | None, date_to: date | None) -> tuple[datetime | None, datetime | None]:
+    """Переводит даты окна в полуинтервал [начало date_from, конец date_to) в UTC."""
+
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise ProgramHotelSelectionError("Начало периода должно быть не позже его окончания")
+    window_start = datetime.combine(date_from, time.min, tzinfo=timezone.utc) if date_from else None
+    window_end = (
+        datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=timezone.utc) if date_to else None
+    )
+    return window_start, window_end
+
+
 def _build_available_hotels_query(
     db: Session,
     *,
@@ -149,50 +282,81 @@ def _build_available_hotels_query(
     guests_count: int,
     normalized_rating: float,
     with_joinedload: bool,
+    window_start: datetime | None = None,
+    window_end: datetime | None = None,
 ):
+    # Только опубликованные слоты с будущим заездом: прошедшие не попадают в выборку
+    # и не раздувают рабочий набор, диапазон по check_in_date идет по индексу
     query = (
         db.query(ProgramHotel)
         .join(ProgramHotel.hotel)
         .filter(
             ProgramHotel.slots_available > 0,
+            ProgramHotel.is_published.is_(True),
+            ProgramHotel.check_in_date >= datetime.now(timezone.utc),
         )
     )
 
+    # Пересечение интервалов: заезд до конца окна и выезд после его начала
+    if window_end is not None:
+        query = query.filter(ProgramHotel.check_in_date < window_end)
+    if window_start is not None:
+        query = query.filter(ProgramHotel.check_out_date > window_start)
+
     if with_joinedload:
         query = query.options(joinedload(ProgramHotel.hotel))
 
     if cities:
         query = query.filter(Hotel.city.in_(cities), Hotel.guests >= guests_count)
 
-    if normalized_rating >= HIGH_USER_RATING_THRESHOLD:
-        rating_filter = None
-        ordering = Hotel.rating.desc()
-    elif normalized_rating >= MEDIUM_USER_RATING_THRESHOLD:
-        rating_filter = Hotel.rating <= MEDIUM_HOTEL_RATING
-        ordering = Hotel.rating.desc()
-    else:
-        rating_filter = Hotel.rating <= LOW_HOTEL_RATING
-        ordering = Hotel.rating.asc()
+    max_rating = _max_hotel_rating(normalized_rating)
+    ordering = Hotel.rating.desc() if _rating_descending(normalized_rating) else Hotel.rating.asc()
 
-    if rating_filter is not None:
-        query = query.filter(rating_filter)
+    if max_rating is not None:
+        query = query.filter(Hotel.rating <= max_rating)
 
     return query, ordering
 
+def available_slots_query(
+    db: Session,
+    *,
+    user: User,
+    date_from: date | None = None,
+    date_to: date | None = None,
+):
+    """Доступные гостю слоты (с присоединенным отелем) без сортировки — для своего порядка выдачи."""
+
+    window_start, window_end = _stay_window(date_from, date_to)
+    query, _ = _build_available_hotels_query(
+        db,
+        cities=user.cities,
+        guests_count=user.guests or 1,
+        normalized_rating=_normalize_user_rating(user.rating),
+        with_joinedload=False,
+        window_start=window_start,
+        window_end=window_end,
+    )
+    return query
+
 """Возвращает доступные отели программы по заданным критериям."""
 def list_available_program_hotels(
     db: Session,
     *,
-    user: User
+    user: User,
+    date_from: date | None = None,
+    date_to: date | None = None,
 ) -> Sequence[ProgramHotel]:
 
     normalized_rating = _normalize_user_rating(user.rating)
+    window_start, window_end = _stay_window(date_from, date_to)
     query, ordering = _build_available_hotels_query(
         db,
         cities=user.cities,
         guests_count=user.guests or 1,
         normalized_rating=normalized_rating,
         with_joinedload=True,
+        window_start=window_start,
+        window_end=window_end,
     )
 
     return query.order_by(ordering, ProgramHotel.created_at.desc()).all()
@@ -202,29 +366,76 @@ def list_available_program_hotels_with_dates(
     *,
     user: User,
     limit: int | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
 ) -> list[dict]:
-    """Группирует доступные отели программы по самим отелям и датам."""
+    """Группирует доступные отели программы по самим отелям и датам.
+
+    Без окна дат подбор идет по индексу открытых слотов в памяти
+    (`availability_index`). С окном или без индекса первые `limit` отелей
+    отбираются в БД: DENSE_RANK нумерует отели в порядке выдачи (рейтинг, затем
+    самый свежий слот отеля), и запрос возвращает только слоты отелей с рангом
+    не выше `limit`.
+    """
+
+    normalized_rating = _normalize_user_rating(user.rating)
+    window_start, window_end = _stay_window(date_from, date_to)
+    if settings.availability_index_enabled and window_start is None and window_end is None:
+        return availability_index.match(
+            db,
+            cities=user.cities,
+            guests_count=user.guests or 1,
+            max_rating=_max_hotel_rating(normalized_rating),
+            rating_descending=_rating_descending(normalized_rating),
+            limit=limit,
+        )
 
-    program_hotels = list_available_program_hotels(
+    query, _ = _build_available_hotels_query(
         db,
-        user=user,
+        cities=user.cities,
+        guests_count=user.guests or 1,
+        normalized_rating=normalized_rating,
+        with_joinedload=False,
+        window_start=window_start,
+        window_end=window_end,
     )
 
-    grouped_hotels: OrderedDict[int, dict] = OrderedDict()
-
-    for program_hotel in program_hotels:
-        hotel = program_hotel.hotel
-        if hotel is None:
-            continue
+    candidates = query.with_entities(
+        ProgramHotel.id.label("program_hotel_id"),
+        ProgramHotel.hotel_id.label("hotel_id"),
+        ProgramHotel.created_at.label("created_at"),
+        Hotel.rating.label("hotel_rating"),
+        func.max(ProgramHotel.created_at).over(partition_by=ProgramHotel.hotel_id).label("hotel_latest"),
+    ).subquery()
+
+    rating_order = (
+        candidates.c.hotel_rating.desc()
+        if _rating_descending(normalized_rating)
+        else candidates.c.hotel_rating.asc()
+    )
+    ranked = select(
+        candidates.c.program_hotel_id,
+        candidates.c.created_at,
+        func.dense_rank()
+        .over(order_by=(rating_order, candidates.c.hotel_latest.desc(), candidates.c.hotel_id.asc()))
+        .label("hotel_rank"),
+    ).subquery()
+
+    stmt = (
+        select(ProgramHotel)
+        .join(ranked, ranked.c.program_hotel_id == ProgramHotel.id)
+        .options(joinedload(ProgramHotel.hotel))
+        .order_by(ranked.c.hotel_rank.asc(), ranked.c.created_at.desc(), ProgramHotel.id.desc())
+    )
+    if limit is not None:
+        stmt = stmt.where(ranked.c.hotel_rank <= limit)
 
+    grouped_hotels: dict[int, dict] = {}
+    for program_hotel in db.scalars(stmt):
         hotel_entry = grouped_hotels.get(program_hotel.hotel_id)
-
         if hotel_entry is None:
-            if limit is not None and len(grouped_hotels) >= limit:
-                continue
-
             hotel_entry = {
-                "hotel": hotel,
+                "hotel": program_hotel.hotel,
                 "available_dates": [],
             }
             grouped_hotels[program_hotel.hotel_id] = hotel_entry
@@ -239,25 +450,57 @@ def list_available_program_hotels_with_dates(
 
     return list(grouped_hotels.values())
 
-def is_hotel_available_for_user(
+MAX_AVAILABILITY_BATCH = 200
+
+
+def hotels_available_for_user(
     db: Session,
     *,
-    hotel_id: int,
+    hotel_ids: Iterable[int],
     user: User,
-) -> bool:
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> dict[int, bool]:
+    """Доступность сразу нескольких отелей для гостя: {hotel_id: есть ли подходящий слот}.
+
+    Без окна дат ответ берется из индекса открытых слотов, иначе — одним
+    запросом по всем отелям.
+    """
+
+    requested = list(dict.fromkeys(hotel_ids))
+    if not requested:
+        return {}
 
     normalized_rating = _normalize_user_rating(user.rating)
-    query, _ = _build_available_hotels_query(
-        db,
-        cities=user.cities,
-        guests_count=user.guests,
-        normalized_rating=normalized_rating,
-        with_joinedload=False,
-    )
+    window_start, window_end = _stay_window(date_from, date_to)
+    if settings.availability_index_enabled and window_start is None and window_end is None:
+        available = availability_index.available_hotel_ids(
+            db,
+            hotel_ids=requested,
+            cities=user.cities,
+            guests_count=user.guests or 1,
+            max_rating=_max_hotel_rating(normalized_rating),
+        )
+    else:
+        query, _ = _build_available_hotels_query(
+            db,
+            cities=user.cities,
+            guests_count=user.guests or 1,
+            normalized_rating=normalized_rating,
+            with_joinedload=False,
+            window_start=window_start,
+            window_end=window_end,
+        )
+        rows = query.filter(ProgramHotel.hotel_id.in_(requested)).with_entities(ProgramHotel.hotel_id).distinct()
+        available = {hotel_id for (hotel_id,) in rows}
 
-    return (
-        query.filter(ProgramHotel.hotel_id == hotel_id)
-        .order_by(ProgramHotel.created_at.desc())
-        .first()
-        is not None
-    )
+    return {hotel_id: hotel_id in available for hotel_id in requested}
+
+
+def is_hotel_available_for_user(
+    db: Session,
+    *,
+    hotel_id: int,
+    user: User,
+) -> bool:
+    return hotels_available_for_user(db, hotel_ids=[hotel_id], user=user)[hotel_id]
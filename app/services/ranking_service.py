@@ -0,0 +1,217 @@
+"""Ранжирование слотов программы для рекомендаций гостю.
+
+Каждый доступный гостю слот получает оценку — взвешенную сумму признаков
+в диапазоне [0, 1]: соответствие рейтинга отеля уровню гостя, стоимость,
+близость даты заезда, дефицит мест и число уже собранных отчетов по отелю.
+Оценка отеля — лучшая оценка его слота. Кандидаты читаются из БД потоком,
+упорядоченным по отелю, а лучшие `k` отелей отбираются кучей размера `k`,
+без сортировки всего набора.
+
+Функцию оценки можно подменить (`score=`), веса задаются настройкой
+`recommendation_weights`.
+"""
+
+import heapq
+import operator
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import RECOMMENDATION_WEIGHT_NAMES, settings
+from app.models.hotel import Hotel
+from app.models.program_hotel import ProgramHotel
+from app.models.report import Report
+from app.models.user import User
+from app.services import program_hotel_service
+
+# Отчеты, которые уже закрывают отель: отправленные на модерацию и одобренные
+COVERED_REPORT_STATUSES = ("on_moderation", "approved")
+STREAM_BATCH_SIZE = 500
+
+
+class RankingError(ValueError):
+    """Ошибка настройки ранжирования."""
+
+
+@dataclass(frozen=True, slots=True)
+class RankingWeights:
+    rating_fit: float = 3.0
+    cost: float = 1.0
+    date_proximity: float = 2.0
+    scarcity: float = 0.5
+    report_coverage: float = 2.0
+
+    @classmethod
+    def from_overrides(cls, overrides: dict[str, float] | None) -> "RankingWeights":
+        overrides = overrides or {}
+        known = {field.name for field in fields(cls)}
+        unknown = sorted(set(overrides) - known)
+        if unknown:
+            raise RankingError(f"Неизвестные веса ранжирования: {', '.join(unknown)}")
+        return replace(cls(), **{name: float(value) for name, value in overrides.items()})
+
+
+@dataclass(frozen=True, slots=True)
+class RankingContext:
+    now: datetime
+    target_hotel_rating: float
+    cost_scale: float
+    horizon_days: float
+
+
+@dataclass(frozen=True, slots=True)
+class Candidate:
+    program_hotel_id: int
+    hotel: Any
+    check_in_date: datetime
+    check_out_date: datetime
+    slots_available: int
+    slots_total: int
+    report_count: int
+
+
+ScoringFunction = Callable[[Candidate, RankingContext], float]
+
+
+def _to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+FEATURES = tuple(field.name for field in fields(RankingWeights))
+if FEATURES != RECOMMENDATION_WEIGHT_NAMES:
+    raise RuntimeError("RECOMMENDATION_WEIGHT_NAMES расходится с полями RankingWeights")
+
+
+def feature_values(candidate: Candidate, context: RankingContext) -> tuple[float, ...]:
+    """Признаки кандидата в порядке `FEATURES`."""
+
+    hotel = candidate.hotel
+    days_ahead = max(0.0, (_to_utc(candidate.check_in_date) - context.now).total_seconds() / 86400)
+    return (
+        1.0 - min(abs(hotel.rating - context.target_hotel_rating), 5.0) / 5.0,
+        1.0 / (1.0 + max(hotel.cost, 0) / context.cost_scale),
+        1.0 / (1.0 + days_ahead / context.horizon_days),
+        1.0 - candidate.slots_available / max(candidate.slots_total, candidate.slots_available, 1),
+        1.0 / (1.0 + candidate.report_count),
+    )
+
+
+def weighted_score(weights: RankingWeights) -> ScoringFunction:
+    vector = tuple(getattr(weights, name) for name in FEATURES)
+
+    def score(candidate: Candidate, context: RankingContext) -> float:
+        return sum(map(operator.mul, vector, feature_values(candidate, context)))
+
+    return score
+
+
+def default_weights() -> RankingWeights:
+    # Имена весов из настроек проверены при запуске (Settings.validate_recommendation_weights)
+    return RankingWeights.from_overrides(settings.recommendation_weights)
+
+
+def build_context(user: User, *, now: datetime | None = None) -> RankingContext:
+    # Уровень гостя 0–10 переводится в шкалу рейтинга отелей 0–5
+    level = min(max(float(user.rating or 0), 0.0), 10.0)
+    return RankingContext(
+        now=now or datetime.now(timezone.utc),
+        target_hotel_rating=level / 2,
+        cost_scale=max(settings.recommendation_cost_scale, 1e-9),
+        horizon_days=max(settings.recommendation_horizon_days, 1e-9),
+    )
+
+
+def top_k_hotels(
+    candidates: Iterable[Candidate],
+    *,
+    k: int,
+    context: RankingContext,
+    score: ScoringFunction,
+) -> list[dict]:
+    """Лучшие `k` отелей из потока кандидатов, упорядоченного по отелю.
+
+    В памяти держатся только слоты текущего отеля и куча из `k` лучших.
+    Равные оценки упорядочиваются по id отеля. Оценку отелю дает лучший слот,
+    а даты в ответе идут по дате заезда.
+    """
+
+    if k <= 0:
+        return []
+
+    heap: list[tuple[float, int, dict]] = []
+    for hotel_id, group in groupby(candidates, key=lambda candidate: candidate.hotel.id):
+        scored = [(score(candidate, context), candidate) for candidate in group]
+        best = max(value for value, _ in scored)
+        # Минимум кучи — худший из отобранных; при равной оценке хуже больший id
+        heap_key = (best, -hotel_id)
+        if len(heap) == k and heap_key <= heap[0][:2]:
+            continue
+        scored.sort(key=lambda item: (item[1].check_in_date, item[1].program_hotel_id))
+        entry = {
+            "hotel": scored[0][1].hotel,
+            "score": best,
+            "available_dates": [
+                {
+                    "check_in_date": candidate.check_in_date,
+                    "check_out_date": candidate.check_out_date,
+                    "slots_available": candidate.slots_available,
+                }
+                for _, candidate in scored
+            ],
+        }
+        if len(heap) < k:
+            heapq.heappush(heap, (*heap_key, entry))
+        else:
+            heapq.heapreplace(heap, (*heap_key, entry))
+
+    return [entry for _, _, entry in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+
+
+def stream_candidates(db: Session, *, user: User) -> Iterator[Candidate]:
+    """Доступные гостю слоты потоком, сгруппированные по отелю."""
+
+    # Коррелированный подсчет по индексу reports.hotel_id: только для отелей-кандидатов,
+    # без группировки всех отчетов таблицы
+    report_count = (
+        select(func.count(Report.id))
+        .where(Report.hotel_id == ProgramHotel.hotel_id, Report.status.in_(COVERED_REPORT_STATUSES))
+        .correlate(ProgramHotel)
+        .scalar_subquery()
+    )
+    rows = (
+        program_hotel_service.available_slots_query(db, user=user)
+        .with_entities(
+            ProgramHotel.id,
+            Hotel,
+            ProgramHotel.check_in_date,
+            ProgramHotel.check_out_date,
+            ProgramHotel.slots_available,
+            ProgramHotel.slots_total,
+            report_count,
+        )
+        .order_by(ProgramHotel.hotel_id)
+        .yield_per(STREAM_BATCH_SIZE)
+    )
+    for row in rows:
+        yield Candidate(*row)
+
+
+def recommend(
+    db: Session,
+    *,
+    user: User,
+    limit: int,
+    weights: RankingWeights | None = None,
+    score: ScoringFunction | None = None,
+) -> list[dict]:
+    """Лучшие отели для гостя в формате `list_available_program_hotels_with_dates` и с оценкой."""
+
+    score = score or weighted_score(weights or default_weights())
+    return top_k_hotels(stream_candidates(db, user=user), k=limit, context=build_context(user), score=score)
@@ -0,0 +1,165 @@
+"""Кэш рекомендаций для дашборда и `/users/me/recommendations`.
+
+Рекомендации зависят только от профиля подбора гостя (города, число гостей,
+рейтинг) и инвентаря слотов, поэтому готовые списки хранятся по профилю и
+помечаются версией инвентаря (`availability_index.inventory_version`).
+Изменение профиля дает новый ключ, изменение слотов или отелей — новую
+версию, и устаревшая запись пересчитывается при следующем обращении. Срок
+жизни записи `recommendation_cache_seconds` ограничивает устаревание
+признаков, зависящих от времени и отчетов.
+
+При `recommendation_warm_seconds > 0` фоновый поток процесса API заранее
+пересчитывает рекомендации для профилей активных пользователей после
+каждого изменения инвентаря и по истечении срока жизни записей.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.user import User
+from app.schemas.user import UserDashboardRecommendation
+from app.services.availability_index import availability_index
+
+logger = logging.getLogger(__name__)
+
+Recommendations = tuple[UserDashboardRecommendation, ...]
+
+
+def profile_key(user: User, limit: int) -> tuple[Hashable, ...]:
+    cities = tuple(sorted(set(user.cities or ())))
+    return cities, user.guests or 1, min(max(float(user.rating or 0), 0.0), 10.0), limit
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    version: tuple[Any, ...]
+    stored_at: float
+    recommendations: Recommendations
+
+
+class RecommendationCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[Hashable, ...], _Entry] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: tuple[Hashable, ...], version: tuple[Any, ...]) -> Recommendations | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = (
+                entry is not None
+                and entry.version == version
+                and time.monotonic() - entry.stored_at < settings.recommendation_cache_seconds
+            )
+            if not fresh:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.recommendations
+
+    def _store(self, key: tuple[Hashable, ...], version: tuple[Any, ...], value: Recommendations) -> None:
+        with self._lock:
+            self._entries[key] = _Entry(version=version, stored_at=time.monotonic(), recommendations=value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.recommendation_cache_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self,
+        db: Session,
+        *,
+        user: User,
+        limit: int,
+        compute: Callable[[], list[UserDashboardRecommendation]],
+    ) -> list[UserDashboardRecommendation]:
+        key = profile_key(user, limit)
+        # Версия читается до расчета: изменение во время расчета не закрепится под новой версией
+        version = availability_index.inventory_version(db)
+        cached = self._lookup(key, version)
+        if cached is None:
+            cached = tuple(compute())
+            self._store(key, version, cached)
+        return list(cached)
+
+
+recommendation_cache = RecommendationCache()
+
+
+class RecommendationWarmer:
+    """Поток, пересчитывающий рекомендации активных пользователей после изменений инвентаря."""
+
+    def __init__(
+        self,
+        compute: Callable[[Session, User, int], list[UserDashboardRecommendation]],
+        *,
+        interval: float | None = None,
+        limit: int = 5,
+    ) -> None:
+        self._compute = compute
+        self.interval = interval if interval is not None else settings.recommendation_warm_seconds
+        self.limit = limit
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._warmed_version: tuple[Any, ...] | None = None
+        self._warmed_at = 0.0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="recommendation-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def warm_once(self) -> int:
+        """Пересчитывает рекомендации для профилей активных пользователей. Возвращает число профилей."""
+
+        with SessionLocal() as db:
+            version = availability_index.inventory_version(db)
+            if (
+                version == self._warmed_version
+                and time.monotonic() - self._warmed_at < settings.recommendation_cache_seconds
+            ):
+                return 0
+            users = db.scalars(
+                select(User)
+                .where(User.is_active.is_(True))
+                .order_by(User.id.desc())
+                .limit(settings.recommendation_warm_users)
+            ).all()
+            seen: set[tuple[Hashable, ...]] = set()
+            for user in users:
+                key = profile_key(user, self.limit)
+                if key in seen:
+                    continue
+                seen.add(key)
+                recommendation_cache.get_or_compute(
+                    db, user=user, limit=self.limit, compute=lambda user=user: self._compute(db, user, self.limit)
+                )
+            self._warmed_version = version
+            self._warmed_at = time.monotonic()
+            return len(seen)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.warm_once()
+            except Exception:  # noqa: BLE001 — прогрев не должен останавливать поток
+                logger.exception("Не удалось прогреть кэш рекомендаций")
@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Literal
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.hotel import Hotel
+from app.models.report import Report
+from app.models.report_answers import ReportStep1Answers, ReportStep2Answers
+from app.schemas.admin import HotelAnswerIssueRow
+from app.schemas.report import ReportStatus
+from app.services import job_service
+
+ANSWER_TABLES: dict[str, type[ReportStep1Answers] | type[ReportStep2Answers]] = {
+    "step1": ReportStep1Answers,
+    "step2": ReportStep2Answers,
+}
+
+# Поля-перечисления, по которым можно искать отели через list_hotels_by_answer
+FilterableField = Literal[
+    "photo_match",
+    "amenities_state",
+    "wait_time",
+    "wifi_quality",
+    "ac_state",
+    "plumbing_state",
+    "food_match",
+]
+
+FILTERABLE_FIELDS: dict[FilterableField, Any] = {
+    "photo_match": ReportStep1Answers.photo_match,
+    "amenities_state": ReportStep1Answers.amenities_state,
+    "wait_time": ReportStep2Answers.wait_time,
+    "wifi_quality": ReportStep2Answers.wifi_quality,
+    "ac_state": ReportStep2Answers.ac_state,
+    "plumbing_state": ReportStep2Answers.plumbing_state,
+    "food_match": ReportStep2Answers.food_match,
+}
+
+_BACKFILL_BATCH_SIZE = 500
+
+
+def _column_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _upsert(db: Session, model, values: dict[str, Any]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert = postgresql.insert
+    elif dialect == "sqlite":
+        insert = sqlite.insert
+    else:
+        db.merge(model(**values))
+        return
+
+    stmt = insert(model).values(**values)
+    update_columns = {name: stmt.excluded[name] for name in values if name != "report_id"}
+    db.execute(stmt.on_conflict_do_update(index_elements=["report_id"], set_=update_columns))
+
+
+def sync_step(db: Session, report_id: str, step: str, step_data: dict[str, Any] | None) -> None:
+    """Переносит ответы шага в типизированную таблицу в текущей транзакции."""
+
+    model = ANSWER_TABLES.get(step)
+    if model is None:
+        return
+
+    step_data = step_data if isinstance(step_data, dict) else {}
+    values: dict[str, Any] = {"report_id": report_id}
+    for column in model.__table__.columns:
+        if column.name != "report_id":
+            values[column.name] = _column_value(step_data.get(column.name))
+    _upsert(db, model, values)
+
+
+def sync_report(db: Session, report_id: str, answers: dict[str, Any] | None) -> None:
+    answers = answers if isinstance(answers, dict) else {}
+    for step in ANSWER_TABLES:
+        sync_step(db, report_id, step, answers.get(step))
+
+
+def backfill(db: Session) -> int:
+    """Заполняет типизированные таблицы для всех отчетов. Возвращает число отчетов."""
+
+    processed = 0
+    last_id: str | None = None
+    while True:
+        stmt = select(Report.id, Report.answers).order_by(Report.id.asc()).limit(_BACKFILL_BATCH_SIZE)
+        if last_id is not None:
+            stmt = stmt.where(Report.id > last_id)
+        rows = db.execute(stmt).all()
+        if not rows:
+            break
+        for report_id, answers in rows:
+            sync_report(db, report_id, answers)
+        db.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+    return processed
+
+
+def list_hotels_by_answer(
+    db: Session,
+    *,
+    field: FilterableField,
+    value: str,
+    days: int | None = 30,
+    status: ReportStatus = ReportStatus.APPROVED,
+) -> list[HotelAnswerIssueRow]:
+    """Отели, в отчетах которых поле ответа принимало значение `value` за последние `days` дней."""
+
+    column = FILTERABLE_FIELDS.get(field)
+    if column is None:
+        raise ValueError(f"Поле {field} недоступно для фильтрации")
+
+    answers_table = column.class_
+    query = (
+        select(
+            Hotel.id,
+            Hotel.name,
+            Hotel.city,
+            func.count(Report.id).label("reports_count"),
+            func.max(Report.submitted_at).label("last_submitted_at"),
+        )
+        .select_from(answers_table)
+        .join(Report, Report.id == answers_table.report_id)
+        .join(Hotel, Hotel.id == Report.hotel_id)
+        .where(column == value, Report.status == status.value)
+        .group_by(Hotel.id, Hotel.name, Hotel.city)
+        .order_by(func.count(Report.id).desc(), Hotel.id.asc())
+    )
+    if days is not None:
+        query = query.where(Report.submitted_at >= datetime.now(timezone.utc) - timedelta(days=days))
+
+    return [
+        HotelAnswerIssueRow(
+            hotel_id=row.id,
+            hotel_name=row.name,
+            city=row.city,
+            reports_count=row.reports_count,
+            last_submitted_at=row.last_submitted_at,
+        )
+        for row in db.execute(query)
+    ]
+
+
+@job_service.register_job("backfill_answer_tables", manual=True)
+def _backfill_job(db: Session, payload: dict) -> None:
+    backfill(db)
@@ -0,0 +1,173 @@
+import re
+from typing import Any
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.models.report import Report
+from app.models.report_search import REPORT_SEARCH_IDS_TABLE, REPORT_SEARCH_TABLE
+from app.schemas.admin import ReportSearchHit
+from app.schemas.report import ReportStatus
+from app.services import job_service
+
+# Текстовые поля ответов, попадающие в индекс
+SEARCHABLE_FIELDS: dict[str, tuple[str, ...]] = {
+    "step1": ("photo_mismatch_text", "amenities_details"),
+    "step6": ("liked", "to_improve", "advantages"),
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_SNIPPET_TOKENS = 16
+_REINDEX_BATCH_SIZE = 500
+
+
+def document_text(answers: dict[str, Any] | None) -> str:
+    if not isinstance(answers, dict):
+        return ""
+    parts: list[str] = []
+    for step, fields in SEARCHABLE_FIELDS.items():
+        step_data = answers.get(step)
+        if not isinstance(step_data, dict):
+            continue
+        for field in fields:
+            value = step_data.get(field)
+            if isinstance(value, str) and value.strip():
+                parts.append(value.strip())
+    return "\n".join(parts)
+
+
+def _fold_yo(value: str) -> str:
+    return value.replace("ё", "е").replace("Ё", "Е")
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def index_report(db: Session, report_id: str, answers: dict[str, Any] | None) -> None:
+    """Обновляет запись индекса в текущей транзакции; коммит остается за вызывающим."""
+
+    body = document_text(answers)
+
+    if _is_postgres(db):
+        if not body:
+            db.execute(text(f"DELETE FROM {REPORT_SEARCH_TABLE} WHERE report_id = :report_id"), {"report_id": report_id})
+            return
+        db.execute(
+            text(
+                f"INSERT INTO {REPORT_SEARCH_TABLE} (report_id, body, document) "
+                "VALUES (:report_id, :body, to_tsvector('russian', :body)) "
+                "ON CONFLICT (report_id) DO UPDATE "
+                "SET body = excluded.body, document = excluded.document"
+            ),
+            {"report_id": report_id, "body": body},
+        )
+        return
+
+    search_rowid = db.scalar(
+        text(f"SELECT search_rowid FROM {REPORT_SEARCH_IDS_TABLE} WHERE report_id = :report_id"),
+        {"report_id": report_id},
+    )
+    if search_rowid is not None:
+        db.execute(text(f"DELETE FROM {REPORT_SEARCH_TABLE} WHERE rowid = :rowid"), {"rowid": search_rowid})
+    if not body:
+        return
+    if search_rowid is None:
+        search_rowid = db.execute(
+            text(f"INSERT INTO {REPORT_SEARCH_IDS_TABLE} (report_id) VALUES (:report_id) RETURNING search_rowid"),
+            {"report_id": report_id},
+        ).scalar_one()
+    db.execute(
+        text(f"INSERT INTO {REPORT_SEARCH_TABLE} (rowid, body) VALUES (:rowid, :body)"),
+        {"rowid": search_rowid, "body": _fold_yo(body)},
+    )
+
+
+def _fts5_query(query: str) -> str:
+    # Регистр сводит токенизатор unicode61, ё/е — _fold_yo при индексации и поиске.
+    # Русского стеммера в FTS5 нет, поэтому каждое слово ищется как префикс: «шум» найдет «шума», «шумно»
+    tokens = _TOKEN_RE.findall(_fold_yo(query))
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_reports(
+    db: Session,
+    *,
+    query: str,
+    status: ReportStatus | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> list[ReportSearchHit]:
+    params: dict[str, Any] = {"limit": limit, "offset": offset}
+    status_filter = ""
+    if status is not None:
+        status_filter = "AND r.status = :status"
+        params["status"] = status.value
+
+    if _is_postgres(db):
+        params["query"] = query
+        stmt = text(
+            "SELECT r.id AS report_id, r.hotel_id, r.status, r.overall_score, "
+            "ts_rank(s.document, q.query) AS rank, "
+            f"ts_headline('russian', s.body, q.query, 'MaxWords={_SNIPPET_TOKENS}, MinWords=5') AS snippet "
+            f"FROM {REPORT_SEARCH_TABLE} AS s "
+            "CROSS JOIN websearch_to_tsquery('russian', :query) AS q(query) "
+            "JOIN reports AS r ON r.id = s.report_id "
+            f"WHERE s.document @@ q.query {status_filter} "
+            "ORDER BY rank DESC, r.submitted_at DESC NULLS LAST "
+            "LIMIT :limit OFFSET :offset"
+        )
+    else:
+        match = _fts5_query(query)
+        if not match:
+            return []
+        params["query"] = match
+        # bm25 возвращает меньшие значения для лучших совпадений
+        stmt = text(
+            "SELECT r.id AS report_id, r.hotel_id, r.status, r.overall_score, "
+            f"-bm25({REPORT_SEARCH_TABLE}) AS rank, "
+            f"snippet({REPORT_SEARCH_TABLE}, 0, '[', ']', '…', {_SNIPPET_TOKENS}) AS snippet "
+            f"FROM {REPORT_SEARCH_TABLE} "
+            f"JOIN {REPORT_SEARCH_IDS_TABLE} AS ids ON ids.search_rowid = {REPORT_SEARCH_TABLE}.rowid "
+            "JOIN reports AS r ON r.id = ids.report_id "
+            f"WHERE {REPORT_SEARCH_TABLE} MATCH :query {status_filter} "
+            f"ORDER BY bm25({REPORT_SEARCH_TABLE}) "
+            "LIMIT :limit OFFSET :offset"
+        )
+
+    return [
+        ReportSearchHit(
+            report_id=row.report_id,
+            hotel_id=row.hotel_id,
+            status=ReportStatus(row.status),
+            overall_score=row.overall_score,
+            rank=float(row.rank or 0.0),
+            snippet=row.snippet or "",
+        )
+        for row in db.execute(stmt, params)
+    ]
+
+
+def rebuild_index(db: Session) -> int:
+    """Переиндексирует все отчеты. Возвращает число обработанных отчетов."""
+
+    processed = 0
+    last_id: str | None = None
+    while True:
+        stmt = select(Report.id, Report.answers).order_by(Report.id.asc()).limit(_REINDEX_BATCH_SIZE)
+        if last_id is not None:
+            stmt = stmt.where(Report.id > last_id)
+        rows = db.execute(stmt).all()
+        if not rows:
+            break
+        for report_id, answers in rows:
+            index_report(db, report_id, answers)
+        db.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+    return processed
+
+
+@job_service.register_job("rebuild_search_index", manual=True)
+def _rebuild_index_job(db: Session, payload: dict) -> None:
+    rebuild_index(db)
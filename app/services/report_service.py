@@ -5,21 +5,25 @@ from pathlib import Path
 from typing import Any, Iterable
 
 from fastapi import HTTPException, status
-from pydantic import ValidationError
-from sqlalchemy import func, select
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.models.report import PHOTO_SECTIONS, Photo, Report
+from app.models.report import PHOTO_COUNT_COLUMNS, Photo, Report
 from app.schemas.report import (
     PhotoSection,
     ReportRead,
     ReportStatus,
+    ReportStep1Draft,
     ReportStep1Payload,
+    ReportStep2Draft,
     ReportStep2Payload,
+    ReportStep6Draft,
     ReportStep6Payload,
 )
 
+from app.services import admin_service, job_service, moderation_feed, report_answers_service, report_search_service
 from app.services.upload_utils import IncomingUpload
 
 
@@ -76,55 +80,183 @@ def ensure_report_editable(report: Report) -> None:
         )
 
 
-def save_step(db: Session, report: Report, step: str, payload: dict[str, Any]) -> Report:
-    answers = dict(report.answers or {})
-    answers[step] = payload
-    report.answers = answers
+_STEP_MODELS: dict[str, type[BaseModel]] = {
+    "step1": ReportStep1Payload,
+    "step2": ReportStep2Payload,
+    "step6": ReportStep6Payload,
+}
 
-    overall_score: float | None = None
-    if "step1" in answers and "step2" in answers:
-        try:
-            step1 = ReportStep1Payload.model_validate(answers.get("step1"))
-        except ValidationError as exc:  # pragma: no cover - pydantic formatting
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail={
-                    "message": "Ошибки валидации шага 1",
-                    "errors": exc.errors(),
-                },
-            ) from exc
-
-        try:
-            step2 = ReportStep2Payload.model_validate(answers.get("step2"))
-        except ValidationError as exc:  # pragma: no cover - pydantic formatting
+# Поля, из которых складывается overall_score; шаг 6 на оценку не влияет
+_SCORE_FIELDS: dict[str, tuple[str, ...]] = {
+    "step1": ("room_cleanliness", "bathroom_sanitation", "linen_freshness", "public_area_cleanliness"),
+    "step2": ("politeness", "response_speed", "food_quality"),
+}
+
+_SAVE_STEP_ATTEMPTS = 3
+
+
+def _calculate_overall_score(step1: ReportStep1Payload, step2: ReportStep2Payload) -> float:
+    scores = [
+        step1.room_cleanliness,
+        step1.bathroom_sanitation,
+        step1.linen_freshness,
+        step1.public_area_cleanliness,
+        step2.politeness,
+        step2.response_speed,
+        step2.food_quality,
+    ]
+    return round(sum(scores) / len(scores), 1)
+
+
+def _score_from_answers(answers: dict[str, Any]) -> float | None:
+    try:
+        step1 = ReportStep1Payload.model_validate(answers.get("step1"))
+        step2 = ReportStep2Payload.model_validate(answers.get("step2"))
+    except ValidationError:
+        return None
+    return _calculate_overall_score(step1, step2)
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """Применяет JSON Merge Patch (RFC 7386): null удаляет ключ, объекты сливаются рекурсивно."""
+
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+_STEP_DRAFT_MODELS: dict[str, type[BaseModel]] = {
+    "step1": ReportStep1Draft,
+    "step2": ReportStep2Draft,
+    "step6": ReportStep6Draft,
+}
+
+
+def _step_validation_error(step: str, exc: ValidationError, *, skip_missing: bool = False) -> HTTPException | None:
+    errors = [
+        error
+        for error in exc.errors(include_url=False, include_context=False)
+        if not (skip_missing and error["type"] == "missing")
+    ]
+    if not errors:
+        return None
+    return HTTPException(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        detail={
+            "message": f"Ошибки валидации шага {step.removeprefix('step')}",
+            "errors": errors,
+        },
+    )
+
+
+def _validate_step_draft(step: str, data: dict[str, Any]) -> dict[str, Any]:
+    """Проверяет заполненные поля шага; незаполненные допустимы до отправки отчета.
+
+    Сохраняются только приведенные к типам известные поля: незаполненный шаг
+    проходит через черновую модель, а не записывается как есть.
+    """
+
+    try:
+        return _STEP_MODELS[step].model_validate(data).model_dump()
+    except ValidationError as exc:
+        error = _step_validation_error(step, exc, skip_missing=True)
+        if error is not None:
+            raise error from exc
+
+    try:
+        return _STEP_DRAFT_MODELS[step].model_validate(data).model_dump(exclude_unset=True)
+    except ValidationError as exc:
+        raise _step_validation_error(step, exc) from exc
+
+
+def _score_inputs_changed(step: str, before: dict[str, Any], after: dict[str, Any]) -> bool:
+    return any(before.get(field) != after.get(field) for field in _SCORE_FIELDS.get(step, ()))
+
+
+def save_step(
+    db: Session,
+    report: Report,
+    step: str,
+    patch: dict[str, Any],
+    *,
+    expected_version: int | None = None,
+) -> Report:
+    """Сохраняет шаг отчета как merge patch одним условным UPDATE.
+
+    Если передан `expected_version` (заголовок If-Match), запись меняется только
+    при совпадении версии, иначе 412. Без него конкурирующее сохранение
+    перечитывает отчет и применяет патч поверх свежих ответов.
+
+    В той же транзакции обновляются строка поискового индекса (шаги 1 и 6)
+    и таблица ответов шага — несколько небольших запросов по ключу. Так поиск
+    и аналитика не отстают от отчета; расхождения исправляют команды
+    rebuild-search-index и backfill-answer-tables.
+    """
+
+    for _ in range(_SAVE_STEP_ATTEMPTS):
+        if expected_version is not None and report.version != expected_version:
             raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail={
-                    "message": "Ошибки валидации шага 2",
-                    "errors": exc.errors(),
-                },
-            ) from exc
-
-        answers["step1"] = step1.model_dump()
-        answers["step2"] = step2.model_dump()
-
-        scores = [
-            step1.room_cleanliness,
-            step1.bathroom_sanitation,
-            step1.linen_freshness,
-            step1.public_area_cleanliness,
-            step2.politeness,
-            step2.response_speed,
-            step2.food_quality,
-        ]
-        overall_score = round(sum(scores) / len(scores), 1)
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Отчет был изменен, обновите данные",
+            )
+
+        answers = report.answers or {}
+        current_step = answers.get(step) or {}
+        updated_step = _validate_step_draft(step, merge_patch(current_step, patch))
+
+        values: dict[str, Any] = {
+            "answers": {**answers, step: updated_step},
+            "version": Report.version + 1,
+            "updated_at": func.now(),
+        }
+        if _score_inputs_changed(step, current_step, updated_step):
+            values["overall_score"] = _score_from_answers(values["answers"])
+
+        stmt = (
+            update(Report)
+            .where(
+                Report.id == report.id,
+                Report.version == report.version,
+                Report.status == ReportStatus.DRAFT.value,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(stmt).rowcount:
+            if step in report_search_service.SEARCHABLE_FIELDS:
+                report_search_service.index_report(db, report.id, values["answers"])
+            report_answers_service.sync_step(db, report.id, step, values["answers"].get(step))
+            db.commit()
+            return report
+
+        db.rollback()
+        db.refresh(report)
+        ensure_report_editable(report)
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Не удалось сохранить шаг из-за параллельных изменений",
+    )
 
-    report.answers = answers
-    report.overall_score = overall_score
-    db.add(report)
-    db.commit()
-    db.refresh(report)
-    return report
+
+def photo_counts(report: Report) -> dict[str, int]:
+    return {
+        section: int(getattr(report, column) or 0)
+        for section, column in PHOTO_COUNT_COLUMNS.items()
+    }
+
+
+def _shift_photo_count(report: Report, section: str, delta: int) -> None:
+    column_name = PHOTO_COUNT_COLUMNS[section]
+    column = getattr(Report, column_name)
+    # Инкремент выражением, чтобы параллельные загрузки не затирали друг друга
+    setattr(report, column_name, column + delta)
 
 
 def serialize_report(report: Report) -> ReportRead:
@@ -133,6 +265,7 @@ def serialize_report(report: Report) -> ReportRead:
             "id": report.id,
             "user_id": report.user_id,
             "hotel_id": report.hotel_id,
+            "program_hotel_id": report.program_hotel_id,
             "checkout_date": _to_utc(report.checkout_date),
             "status": report.status,
             "answers": report.answers or {},
@@ -141,6 +274,8 @@ def serialize_report(report: Report) -> ReportRead:
             "updated_at": report.updated_at,
             "submitted_at": report.submitted_at,
             "editing_enabled": editing_enabled(report),
+            "version": report.version,
+            "photo_counts": photo_counts(report),
         }
     )
 
@@ -196,12 +331,56 @@ def add_photos(
     if not stored:
         return []
 
+    _shift_photo_count(report, section.value, len(stored))
+    db.add(report)
     db.commit()
     for photo in stored:
         db.refresh(photo)
+    db.refresh(report)
     return stored
 
 
+def get_photo(db: Session, *, report: Report, photo_id: int) -> Photo | None:
+    return db.scalar(select(Photo).where(Photo.id == photo_id, Photo.report_id == report.id))
+
+
+def delete_photo(db: Session, *, report: Report, photo: Photo) -> None:
+    file_path = Path(settings.static_root) / photo.path
+
+    _shift_photo_count(report, photo.section, -1)
+    db.add(report)
+    db.delete(photo)
+    db.commit()
+    db.refresh(report)
+
+    file_path.unlink(missing_ok=True)
+
+
+def recount_photo_counts(db: Session) -> int:
+    """Пересчитывает счетчики фотографий по таблице report_photos. Возвращает число отчетов."""
+
+    rows = db.execute(
+        select(Photo.report_id, Photo.section, func.count()).group_by(Photo.report_id, Photo.section)
+    ).all()
+    counts: dict[str, dict[str, int]] = {}
+    for report_id, section, count in rows:
+        counts.setdefault(report_id, {})[section] = int(count)
+
+    updated = 0
+    for report in db.scalars(select(Report)):
+        actual = counts.get(report.id, {})
+        for section, column_name in PHOTO_COUNT_COLUMNS.items():
+            setattr(report, column_name, actual.get(section, 0))
+        updated += 1
+    db.commit()
+    return updated
+
+
+@job_service.register_job("recount_photo_counts", manual=True)
+def _recount_photo_counts_job(db: Session, payload: dict) -> None:
+    recount_photo_counts(db)
+
+
 def list_photos(db: Session, *, report: Report, section: PhotoSection | None = None) -> list[Photo]:
     stmt = select(Photo).where(Photo.report_id == report.id)
     if section is not None:
@@ -233,12 +412,7 @@ def submit_report(db: Session, report: Report) -> Report:
     step6 = _validated_step(report.answers.get("step6"), ReportStep6Payload, "6")
 
     required_photo_counts = {"photos_match": 5, "cleanliness": 5}
-    section_counts: dict[str, int] = {}
-    for section_name in PHOTO_SECTIONS:
-        count = db.scalar(
-            select(func.count()).where(Photo.report_id == report.id, Photo.section == section_name)
-        )
-        section_counts[section_name] = int(count or 0)
+    section_counts = photo_counts(report)
 
     missing_sections = {
         section: {
@@ -257,16 +431,7 @@ def submit_report(db: Session, report: Report) -> Report:
             },
         )
 
-    scores = [
-        step1.room_cleanliness,
-        step1.bathroom_sanitation,
-        step1.linen_freshness,
-        step1.public_area_cleanliness,
-        step2.politeness,
-        step2.response_speed,
-        step2.food_quality,
-    ]
-    overall = round(sum(scores) / len(scores), 1)
+    overall = _calculate_overall_score(step1, step2)
 
     answers = dict(report.answers or {})
     answers["step1"] = step1.model_dump()
@@ -277,6 +442,13 @@ def submit_report(db: Session, report: Report) -> Report:
     report.overall_score = overall
     report.status = ReportStatus.ON_MODERATION.value
     report.submitted_at = _now_utc()
+    report.version = Report.version + 1
+
+    report_search_service.index_report(db, report.id, answers)
+    report_answers_service.sync_report(db, report.id, answers)
+
+    row = admin_service.serialize_moderation_row(report)
+    moderation_feed.record_events(db, [(report.id, "enqueued", row.model_dump(mode="json"))])
 
     db.add(report)
     db.commit()
@@ -0,0 +1,263 @@
+"""Бронирование слотов программы гостями.
+
+Слот списывается одним условным UPDATE (`slots_available > 0` в WHERE), а
+черновик отчета создается в той же транзакции. Параллельные брони одного
+слота сериализуются блокировкой строки, и продать больше мест, чем есть,
+нельзя: проигравший UPDATE просто не находит строку.
+
+Гость может сначала удержать место на `slot_hold_seconds`. Удержание сразу
+списывает место из `slots_available`, поэтому подбор отелей учитывает его без
+дополнительных запросов. Место возвращается при отмене удержания или фоновой
+задачей `release_expired_holds`; бронь с удержанием место повторно не
+списывает. Кто первым удалит строку удержания — бронь или
+уборщик, — тот и распоряжается местом.
+"""
+
+import math
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.program_hotel import ProgramHotel
+from app.models.report import Report
+from app.models.slot_hold import SlotHold
+from app.models.user import User
+from app.services import job_service
+
+
+class ReservationError(ValueError):
+    """Ошибка бронирования слота программы."""
+
+
+class SlotNotFoundError(ReservationError):
+    """Слот не существует или не опубликован."""
+
+
+class SlotSoldOutError(ReservationError):
+    """Свободных мест в слоте не осталось."""
+
+
+class DuplicateReservationError(ReservationError):
+    """Гость уже забронировал этот слот."""
+
+
+class SlotHoldNotFoundError(ReservationError):
+    """У гостя нет действующего удержания слота."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _open_slot(program_hotel_id: int):
+    """Условие слота, в котором можно занять место: опубликован и заезд еще не наступил."""
+
+    return (
+        (ProgramHotel.id == program_hotel_id)
+        & ProgramHotel.is_published.is_(True)
+        & (ProgramHotel.check_in_date >= _now())
+    )
+
+
+def _take_seat(db: Session, program_hotel_id: int):
+    """Списывает место условным UPDATE. Возвращает (hotel_id, check_out_date) или ошибку."""
+
+    claimed = db.execute(
+        update(ProgramHotel)
+        .where(_open_slot(program_hotel_id), ProgramHotel.slots_available > 0)
+        .values(slots_available=ProgramHotel.slots_available - 1)
+        .returning(ProgramHotel.hotel_id, ProgramHotel.check_out_date)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if claimed is not None:
+        return claimed
+
+    db.rollback()
+    exists = db.scalar(select(ProgramHotel.id).where(_open_slot(program_hotel_id)))
+    if exists is None:
+        raise SlotNotFoundError("Отель программы не найден")
+    raise SlotSoldOutError("Свободных мест на эти даты не осталось")
+
+
+def _ensure_not_reserved(db: Session, program_hotel_id: int, user: User) -> None:
+    already_reserved = db.scalar(
+        select(Report.id)
+        .where(
+            Report.program_hotel_id == program_hotel_id,
+            Report.user_id == user.id,
+            Report.status == "draft",
+        )
+        .limit(1)
+    )
+    if already_reserved is not None:
+        raise DuplicateReservationError("Вы уже забронировали этот слот")
+
+
+def _release_holds(db: Session, condition) -> int:
+    """Удаляет удержания по условию и возвращает их места в слоты, не выше slots_total."""
+
+    released = db.execute(
+        delete(SlotHold)
+        .where(condition)
+        .returning(SlotHold.program_hotel_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    for program_hotel_id, seats in Counter(released).items():
+        restored = ProgramHotel.slots_available + seats
+        db.execute(
+            update(ProgramHotel)
+            .where(ProgramHotel.id == program_hotel_id)
+            .values(
+                slots_available=case(
+                    (restored > ProgramHotel.slots_total, ProgramHotel.slots_total),
+                    else_=restored,
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return len(released)
+
+
+def _schedule_sweep(db: Session, expires_at: datetime) -> None:
+    # Одна задача уборки на интервал: удержания, истекающие в нем, снимаются вместе
+    interval = max(1, settings.slot_hold_sweep_seconds)
+    bucket = math.ceil(expires_at.timestamp() / interval) * interval
+    job_service.enqueue(
+        db,
+        "release_expired_holds",
+        idempotency_key=f"release_expired_holds:{bucket}",
+        delay_seconds=max(0.0, bucket - _now().timestamp()),
+    )
+
+
+def hold_slot(db: Session, *, program_hotel_id: int, user: User) -> SlotHold:
+    """Удерживает место в слоте за гостем. Повторный вызов продлевает действующее удержание."""
+
+    _ensure_not_reserved(db, program_hotel_id, user)
+    expires_at = _now() + timedelta(seconds=settings.slot_hold_seconds)
+    own_hold = (SlotHold.program_hotel_id == program_hotel_id) & (SlotHold.user_id == user.id)
+
+    # Просроченное, но еще не снятое удержание тоже продлеваем: его место не возвращалось
+    extended_id = db.execute(
+        update(SlotHold)
+        .where(own_hold, SlotHold.program_hotel_id.in_(select(ProgramHotel.id).where(_open_slot(program_hotel_id))))
+        .values(expires_at=expires_at)
+        .returning(SlotHold.id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+    if extended_id is None:
+        _take_seat(db, program_hotel_id)
+        db.add(SlotHold(program_hotel_id=program_hotel_id, user_id=user.id, expires_at=expires_at))
+
+    _schedule_sweep(db, expires_at)
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        # Параллельный запрос того же гостя успел создать удержание; наше списание откатилось
+        db.rollback()
+        raise DuplicateReservationError("Место в этом слоте уже удерживается за вами") from exc
+
+    return db.scalar(select(SlotHold).where(own_hold))
+
+
+def release_hold(db: Session, *, program_hotel_id: int, user: User) -> None:
+    released = _release_holds(
+        db, (SlotHold.program_hotel_id == program_hotel_id) & (SlotHold.user_id == user.id)
+    )
+    db.commit()
+    if not released:
+        raise SlotHoldNotFoundError("Удержание слота не найдено")
+
+
+def release_expired_holds(db: Session, *, batch_size: int | None = None) -> int:
+    """Снимает просроченные удержания пачками, коммитя каждую. Возвращает число снятых."""
+
+    batch_size = batch_size or settings.slot_hold_sweep_batch
+    now = _now()
+    expired = (
+        select(SlotHold.id)
+        .where(SlotHold.expires_at <= now)
+        .order_by(SlotHold.expires_at.asc())
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        expired = expired.with_for_update(skip_locked=True)
+
+    total = 0
+    while True:
+        hold_ids = db.scalars(expired).all()
+        if not hold_ids:
+            break
+        # Повторная проверка срока: удержание могли продлить после выборки
+        total += _release_holds(db, SlotHold.id.in_(hold_ids) & (SlotHold.expires_at <= now))
+        db.commit()
+        if len(hold_ids) < batch_size:
+            break
+    return total
+
+
+@job_service.register_job("release_expired_holds", manual=True)
+def _release_expired_holds_job(db: Session, payload: dict) -> None:
+    release_expired_holds(db)
+
+
+def stage_reservation(db: Session, *, program_hotel_id: int, user: User) -> Report:
+    """Списывает место (или забирает удержание гостя) и добавляет черновик отчета, не коммитя.
+
+    Коммит — через `commit_reservation`, чтобы вызывающий мог изменить в той же
+    транзакции свои данные. При отказе транзакция откатывается.
+    """
+
+    _ensure_not_reserved(db, program_hotel_id, user)
+
+    # Место удержания гостя, даже просроченного, но еще не снятого уборщиком, переходит в бронь
+    consumed_hold = db.execute(
+        delete(SlotHold)
+        .where(SlotHold.program_hotel_id == program_hotel_id, SlotHold.user_id == user.id)
+        .returning(SlotHold.id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+    if consumed_hold is not None:
+        claimed = db.execute(
+            select(ProgramHotel.hotel_id, ProgramHotel.check_out_date).where(_open_slot(program_hotel_id))
+        ).one_or_none()
+        if claimed is None:
+            # Заезд уже наступил: удержание остается до уборщика, бронь не создается
+            db.rollback()
+            raise SlotNotFoundError("Отель программы не найден")
+    else:
+        claimed = _take_seat(db, program_hotel_id)
+
+    report = Report(
+        hotel_id=claimed.hotel_id,
+        program_hotel_id=program_hotel_id,
+        checkout_date=claimed.check_out_date,
+        user_id=user.id,
+    )
+    db.add(report)
+    return report
+
+
+def commit_reservation(db: Session, report: Report) -> Report:
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        # Параллельный запрос того же гостя успел создать черновик; наше списание откатилось
+        db.rollback()
+        raise DuplicateReservationError("Вы уже забронировали этот слот") from exc
+    db.refresh(report)
+    return report
+
+
+def reserve_slot(db: Session, *, program_hotel_id: int, user: User) -> Report:
+    """Списывает место в слоте (или забирает удержание гостя) и создает черновик отчета."""
+
+    report = stage_reservation(db, program_hotel_id=program_hotel_id, user=user)
+    return commit_reservation(db, report)
@@ -0,0 +1,122 @@
+"""Очередь рассмотрения заявок с арендой.
+
+Проверяющий забирает следующую заявку `in_review` одним условным UPDATE с
+RETURNING: строка достается только тому, чей UPDATE застал аренду пустой или
+истекшей, поэтому двое проверяющих не получают одну заявку. Порядок выдачи —
+по сохраненному итоговому баллу, затем по возрасту заявки.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.program_application import ProgramApplication, ProgramApplicationStatus
+
+_CLAIM_ATTEMPTS = 3
+
+
+class ReviewLeaseError(ValueError):
+    """Аренда заявки недоступна текущему проверяющему."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_free(now: datetime):
+    return or_(ProgramApplication.lease_expires_at.is_(None), ProgramApplication.lease_expires_at < now)
+
+
+def _lease_held_by(reviewer_id: int, now: datetime):
+    return (ProgramApplication.lease_owner_id == reviewer_id) & (ProgramApplication.lease_expires_at >= now)
+
+
+def _reload(db: Session, application_id: int) -> ProgramApplication | None:
+    return db.get(ProgramApplication, application_id, populate_existing=True)
+
+
+def _lease_expiry(now: datetime, lease_seconds: int | None) -> datetime:
+    return now + timedelta(seconds=lease_seconds or settings.review_lease_seconds)
+
+
+def claim_next(db: Session, *, reviewer_id: int, lease_seconds: int | None = None) -> ProgramApplication | None:
+    """Арендует следующую свободную заявку. Уже арендованная проверяющим заявка продлевается."""
+
+    now = _now()
+    held_id = db.scalar(
+        select(ProgramApplication.id)
+        .where(
+            ProgramApplication.status == ProgramApplicationStatus.in_review,
+            _lease_held_by(reviewer_id, now),
+        )
+        .limit(1)
+    )
+    if held_id is not None:
+        return renew_lease(db, application_id=held_id, reviewer_id=reviewer_id, lease_seconds=lease_seconds)
+
+    candidate = (
+        select(ProgramApplication.id)
+        .where(ProgramApplication.status == ProgramApplicationStatus.in_review, _lease_free(now))
+        .order_by(
+            ProgramApplication.total_score.desc().nullslast(),
+            ProgramApplication.created_at.asc(),
+            ProgramApplication.id.asc(),
+        )
+        .limit(1)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        candidate = candidate.with_for_update(skip_locked=True)
+
+    for _ in range(_CLAIM_ATTEMPTS):
+        claimed_id = db.execute(
+            update(ProgramApplication)
+            .where(ProgramApplication.id == candidate.scalar_subquery(), _lease_free(now))
+            .values(lease_owner_id=reviewer_id, lease_expires_at=_lease_expiry(now, lease_seconds))
+            .returning(ProgramApplication.id)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        db.commit()
+        if claimed_id is not None:
+            return _reload(db, claimed_id)
+        # Очередь пуста или заявку перехватили между подзапросом и проверкой аренды
+        if db.scalar(candidate) is None:
+            db.commit()
+            return None
+    return None
+
+
+def renew_lease(
+    db: Session,
+    *,
+    application_id: int,
+    reviewer_id: int,
+    lease_seconds: int | None = None,
+) -> ProgramApplication:
+    now = _now()
+    renewed_id = db.execute(
+        update(ProgramApplication)
+        .where(
+            ProgramApplication.id == application_id,
+            ProgramApplication.status == ProgramApplicationStatus.in_review,
+            _lease_held_by(reviewer_id, now),
+        )
+        .values(lease_expires_at=_lease_expiry(now, lease_seconds))
+        .returning(ProgramApplication.id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    db.commit()
+    if renewed_id is None:
+        raise ReviewLeaseError("Аренда заявки истекла или принадлежит другому проверяющему")
+    return _reload(db, renewed_id)
+
+
+def release_lease(db: Session, *, application_id: int, reviewer_id: int) -> None:
+    db.execute(
+        update(ProgramApplication)
+        .where(ProgramApplication.id == application_id, ProgramApplication.lease_owner_id == reviewer_id)
+        .values(lease_owner_id=None, lease_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
@@ -0,0 +1,217 @@
+"""Версии правил подсчета баллов анкеты кандидата.
+
+Набор правил хранится в `scoring_rule_sets` и компилируется в таблицы
+поиска: для каждого вопроса — `array` баллов, индексированный кодом ответа.
+Пакетный пересчет кодирует ответы порции заявок в колонки кодов и считает
+баллы проходом по колонкам без разбора словарей правил на каждую заявку.
+"""
+
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+from operator import add, or_
+from typing import Any
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.program_application import ProgramApplicationStatus
+from app.models.scoring_rule_set import ScoringRuleSet
+from app.schemas.application import ApplicationAnswers
+
+ANSWER_OPTIONS: tuple[str, ...] = ("a", "b", "c")
+QUESTIONS: tuple[str, ...] = tuple(ApplicationAnswers.model_fields)
+
+DEFAULT_RAW_SCORE_RULES: dict[str, dict[str, int]] = {
+    "q4": {"a": -1, "b": 1, "c": 0},
+    "q5": {"a": -1, "b": 1, "c": 0},
+    "q6": {"a": 0, "b": 1, "c": -1},
+    "q7": {"a": 0, "b": 1, "c": -1},
+    "q8": {"a": 1, "b": -1, "c": 0},
+}
+DEFAULT_REJECT_MAX_SCORE = 4
+DEFAULT_REVIEW_MAX_SCORE = 8
+
+_ANSWER_CODES = {option: code for code, option in enumerate(ANSWER_OPTIONS)}
+_INVALID_CODE = len(ANSWER_OPTIONS)
+
+
+class ScoringRulesError(ValueError):
+    """Некорректный набор правил подсчета баллов."""
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRuleSet:
+    id: int | None
+    version: int | None
+    points: tuple[array, ...]  # по вопросу из QUESTIONS: баллы по коду ответа
+    reject_max_score: int
+    review_max_score: int
+
+    def raw_score(self, answers: dict[str, Any]) -> int:
+        score = 0
+        for question, table in zip(QUESTIONS, self.points):
+            answer = answers.get(question)
+            if answer is None:
+                raise ValueError(f"Отсутствует ответ на вопрос {question}")
+            code = _ANSWER_CODES.get(answer)
+            if code is None:
+                raise ValueError(f"Недопустимый ответ '{answer}' для вопроса {question}")
+            score += table[code]
+        return score
+
+    def raw_scores(self, answers_batch: Sequence[Any]) -> tuple[list[int], list[bool]]:
+        """Баллы порции анкет и признак некорректной анкеты для каждой из них."""
+
+        size = len(answers_batch)
+        rows = [answers if isinstance(answers, dict) else {} for answers in answers_batch]
+        scores = [0] * size
+        invalid = [False] * size
+        for question, table in zip(QUESTIONS, self.points):
+            codes = array("B", (_ANSWER_CODES.get(row.get(question), _INVALID_CODE) for row in rows))
+            scores = list(map(add, scores, map(table.__getitem__, codes)))
+            invalid = list(map(or_, invalid, map(_INVALID_CODE.__eq__, codes)))
+        return scores, invalid
+
+    def status_for(self, score: int) -> ProgramApplicationStatus:
+        if score <= self.reject_max_score:
+            return ProgramApplicationStatus.rejected
+        if score <= self.review_max_score:
+            return ProgramApplicationStatus.in_review
+        return ProgramApplicationStatus.accepted
+
+
+def validate_rules(rules: dict[str, dict[str, int]], *, reject_max_score: int, review_max_score: int) -> None:
+    if set(rules) != set(QUESTIONS):
+        raise ScoringRulesError(f"Правила должны описывать вопросы {', '.join(QUESTIONS)}")
+    for question in QUESTIONS:
+        if set(rules[question]) != set(ANSWER_OPTIONS):
+            raise ScoringRulesError(
+                f"Для вопроса {question} нужны баллы за ответы {', '.join(ANSWER_OPTIONS)}"
+            )
+    if reject_max_score >= review_max_score:
+        raise ScoringRulesError("Порог отклонения должен быть меньше порога ручной проверки")
+
+
+def compile_rules(
+    rules: dict[str, dict[str, int]],
+    *,
+    reject_max_score: int,
+    review_max_score: int,
+    rule_set_id: int | None = None,
+    version: int | None = None,
+) -> CompiledRuleSet:
+    # Последняя ячейка — для некорректного ответа, чтобы поиск по коду не выходил за границы
+    points = tuple(
+        array("l", [rules[question][option] for option in ANSWER_OPTIONS] + [0]) for question in QUESTIONS
+    )
+    return CompiledRuleSet(
+        id=rule_set_id,
+        version=version,
+        points=points,
+        reject_max_score=reject_max_score,
+        review_max_score=review_max_score,
+    )
+
+
+def compile_rule_set(rule_set: ScoringRuleSet) -> CompiledRuleSet:
+    return compile_rules(
+        rule_set.rules,
+        reject_max_score=rule_set.reject_max_score,
+        review_max_score=rule_set.review_max_score,
+        rule_set_id=rule_set.id,
+        version=rule_set.version,
+    )
+
+
+DEFAULT_RULE_SET = compile_rules(
+    DEFAULT_RAW_SCORE_RULES,
+    reject_max_score=DEFAULT_REJECT_MAX_SCORE,
+    review_max_score=DEFAULT_REVIEW_MAX_SCORE,
+)
+
+
+def list_rule_sets(db: Session) -> list[ScoringRuleSet]:
+    return list(db.scalars(select(ScoringRuleSet).order_by(ScoringRuleSet.version.desc())))
+
+
+def get_rule_set(db: Session, rule_set_id: int) -> ScoringRuleSet | None:
+    return db.get(ScoringRuleSet, rule_set_id)
+
+
+def get_rule_set_by_version(db: Session, version: int) -> ScoringRuleSet | None:
+    return db.scalar(select(ScoringRuleSet).where(ScoringRuleSet.version == version))
+
+
+def _next_version(db: Session) -> int:
+    return int(db.scalar(select(func.max(ScoringRuleSet.version))) or 0) + 1
+
+
+def create_rule_set(
+    db: Session,
+    *,
+    rules: dict[str, dict[str, int]],
+    reject_max_score: int,
+    review_max_score: int,
+    comment: str | None = None,
+) -> ScoringRuleSet:
+    """Сохраняет новую неактивную версию правил."""
+
+    validate_rules(rules, reject_max_score=reject_max_score, review_max_score=review_max_score)
+    rule_set = ScoringRuleSet(
+        version=_next_version(db),
+        rules={question: dict(rules[question]) for question in QUESTIONS},
+        reject_max_score=reject_max_score,
+        review_max_score=review_max_score,
+        comment=comment,
+        is_active=False,
+    )
+    db.add(rule_set)
+    db.commit()
+    db.refresh(rule_set)
+    return rule_set
+
+
+def activate_rule_set(db: Session, rule_set: ScoringRuleSet) -> ScoringRuleSet:
+    db.execute(
+        update(ScoringRuleSet)
+        .where(ScoringRuleSet.id != rule_set.id, ScoringRuleSet.is_active.is_(True))
+        .values(is_active=False)
+    )
+    rule_set.is_active = True
+    db.add(rule_set)
+    db.commit()
+    db.refresh(rule_set)
+    return rule_set
+
+
+def seed_default_rule_set(db: Session) -> None:
+    """Сохраняет встроенные правила как действующую версию 1, если версий еще нет."""
+
+    if db.scalar(select(func.count(ScoringRuleSet.id))):
+        return
+    db.add(
+        ScoringRuleSet(
+            version=1,
+            rules=DEFAULT_RAW_SCORE_RULES,
+            reject_max_score=DEFAULT_REJECT_MAX_SCORE,
+            review_max_score=DEFAULT_REVIEW_MAX_SCORE,
+            comment="Встроенные правила",
+            is_active=True,
+        )
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        # Версию 1 параллельно создал другой процесс
+        db.rollback()
+
+
+def get_active_rule_set(db: Session) -> CompiledRuleSet:
+    """Действующие правила; без активной версии — встроенные. Только читает базу."""
+
+    active = db.scalar(select(ScoringRuleSet).where(ScoringRuleSet.is_active.is_(True)))
+    if active is None:
+        return DEFAULT_RULE_SET
+    return compile_rule_set(active)
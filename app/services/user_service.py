@@ -1,8 +1,11 @@
 import hashlib
-from collections.abc import Iterable
+from collections.abc import Hashable, Iterable
+from functools import lru_cache
 
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only
 
+from app.models.hotel import Hotel
 from app.models.report import Report
 from app.models.user import User
 from app.schemas.report import ReportStatus
@@ -12,7 +15,12 @@ from app.schemas.user import (
     UserDashboardRecommendation,
     UserDashboardRecommendationDate,
 )
-from app.services import program_hotel_service, report_service
+from app.services import ranking_service, report_service
+from app.services.availability_index import availability_index
+from app.services.dashboard_cache import CachedDashboard, dashboard_cache
+from app.services.recommendation_cache import profile_key, recommendation_cache
+
+DASHBOARD_RECOMMENDATIONS = 5
 
 
 def get_user(db: Session, user_id: int) -> User | None:
@@ -43,7 +51,13 @@ def update_user_profile(
 
 
 def _generate_promo_code(user: User) -> str:
-    payload = f"{user.id}:{user.email}:{user.created_at.isoformat() if user.created_at else ''}"
+    created_at = user.created_at.isoformat() if user.created_at else ""
+    return _promo_code(user.id, user.email, created_at)
+
+
+@lru_cache(maxsize=10000)
+def _promo_code(user_id: int, email: str, created_at: str) -> str:
+    payload = f"{user_id}:{email}:{created_at}"
     digest = hashlib.sha1(payload.encode("utf-8")).digest()
     letters_part = ''.join(chr(65 + byte % 26) for byte in digest[:5])
     middle_letters = ''.join(chr(65 + byte % 26) for byte in digest[5:7])
@@ -81,37 +95,70 @@ def _serialize_recommendations(raw: Iterable[dict]) -> list[UserDashboardRecomme
                 rating=hotel.rating,
                 cost=hotel.cost,
                 guests=hotel.guests,
+                score=item.get("score"),
                 available_dates=dates,
             )
         )
     return recommendations
 
 
+def compute_user_recommendations(
+    db: Session,
+    *,
+    user: User,
+    limit: int = 5,
+) -> list[UserDashboardRecommendation]:
+    raw = ranking_service.recommend(db, user=user, limit=limit)
+    return _serialize_recommendations(raw)
+
+
 def get_user_recommendations(
     db: Session,
     *,
     user: User,
     limit: int = 5,
 ) -> list[UserDashboardRecommendation]:
-    raw = program_hotel_service.list_available_program_hotels_with_dates(
+    return recommendation_cache.get_or_compute(
         db,
         user=user,
         limit=limit,
+        compute=lambda: compute_user_recommendations(db, user=user, limit=limit),
     )
-    return _serialize_recommendations(raw)
 
 
-def get_user_dashboard(db: Session, *, user: User) -> UserDashboard:
-    promo_code = _generate_promo_code(user)
-
-    report: Report | None = (
-        db.query(Report)
-        .options(joinedload(Report.hotel))
-        .filter(Report.user_id == user.id)
+def _latest_report(db: Session, *, user: User) -> tuple[Report | None, str | None]:
+    # Один запрос отдает и версию дашборда, и данные для него: только нужные
+    # колонки отчета и название отеля вместо полной загрузки связей.
+    row = db.execute(
+        select(Report, Hotel.name)
+        .outerjoin(Hotel, Hotel.id == Report.hotel_id)
+        .options(
+            load_only(
+                Report.id,
+                Report.hotel_id,
+                Report.status,
+                Report.checkout_date,
+                Report.version,
+                Report.updated_at,
+            )
+        )
+        .where(Report.user_id == user.id)
         .order_by(Report.updated_at.desc(), Report.created_at.desc())
-        .first()
-    )
+        .limit(1)
+    ).first()
+    if row is None:
+        return None, None
+    return row[0], row[1]
+
 
+def _build_dashboard(
+    db: Session,
+    *,
+    user: User,
+    report: Report | None,
+    hotel_name: str | None,
+    can_edit: bool,
+) -> UserDashboard:
     participation_status = "Нет активной проверки"
     can_submit_report = False
     assigned_hotel: UserDashboardAssignedHotel | None = None
@@ -119,14 +166,13 @@ def get_user_dashboard(db: Session, *, user: User) -> UserDashboard:
     if report:
         status_enum = ReportStatus(report.status)
         participation_status = _STATUS_LABELS.get(status_enum, status_enum.value)
-        can_submit_report = report_service.editing_enabled(report)
+        can_submit_report = can_edit
 
-        hotel = report.hotel
-        if hotel:
+        if hotel_name is not None:
             assigned_hotel = UserDashboardAssignedHotel(
                 report_id=report.id,
-                hotel_id=hotel.id,
-                hotel_name=hotel.name,
+                hotel_id=report.hotel_id,
+                hotel_name=hotel_name,
                 status=status_enum,
                 checkout_date=report.checkout_date,
                 can_submit=can_submit_report,
@@ -136,12 +182,46 @@ def get_user_dashboard(db: Session, *, user: User) -> UserDashboard:
             can_submit_report = False
 
     show_recommendations = assigned_hotel is None or not can_submit_report
-    recommendations = get_user_recommendations(db, user=user, limit=5) if show_recommendations else []
+    recommendations = (
+        get_user_recommendations(db, user=user, limit=DASHBOARD_RECOMMENDATIONS)
+        if show_recommendations
+        else []
+    )
 
     return UserDashboard(
-        promo_code=promo_code,
+        promo_code=_generate_promo_code(user),
         participation_status=participation_status,
         can_submit_report=can_submit_report,
         assigned_hotel=assigned_hotel,
         recommendations=recommendations,
     )
+
+
+def get_cached_user_dashboard(db: Session, *, user: User) -> CachedDashboard:
+    """Дашборд гостя из кэша вместе с ETag.
+
+    Версия записи складывается из последнего отчета (id, версия, статус,
+    updated_at), открыто ли его редактирование — оно зависит от времени, —
+    профиля подбора, email и версии инвентаря слотов.
+    """
+    report, hotel_name = _latest_report(db, user=user)
+    can_edit = report is not None and report_service.editing_enabled(report)
+    report_stamp: tuple[Hashable, ...] = ()
+    if report is not None:
+        report_stamp = (report.id, report.version, report.status, report.updated_at, hotel_name)
+    version = (
+        report_stamp,
+        can_edit,
+        user.email,
+        profile_key(user, DASHBOARD_RECOMMENDATIONS),
+        availability_index.inventory_version(db),
+    )
+    return dashboard_cache.get_or_build(
+        user.id,
+        version,
+        lambda: _build_dashboard(db, user=user, report=report, hotel_name=hotel_name, can_edit=can_edit),
+    )
+
+
+def get_user_dashboard(db: Session, *, user: User) -> UserDashboard:
+    return get_cached_user_dashboard(db, user=user).dashboard